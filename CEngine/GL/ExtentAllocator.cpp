@@ -0,0 +1,153 @@
+/**********************************************************************
+File name: ExtentAllocator.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include "ExtentAllocator.hpp"
+
+#include <cassert>
+
+namespace PyEngine {
+namespace GL {
+
+/* PyEngine::GL::ExtentAllocator */
+
+ExtentAllocator::ExtentAllocator():
+    _free(),
+    _freeCount(0)
+{
+
+}
+
+bool ExtentAllocator::allocate(const GLsizei count, IndexRangeList &ranges)
+{
+    if (count > _freeCount)
+    {
+        return false;
+    }
+    if (count <= 0)
+    {
+        return true;
+    }
+
+    auto it = _free.begin();
+    for (/**/; it != _free.end(); it++)
+    {
+        if ((*it).second >= count)
+        {
+            break;
+        }
+    }
+
+    if (it == _free.end())
+    {
+        // no extent is large enough, take whole extents from the start
+        GLsizei remaining = count;
+        it = _free.begin();
+        while ((*it).second <= remaining)
+        {
+            ranges.push_back(IndexRange((*it).first, (*it).second));
+            remaining -= (*it).second;
+            it = _free.erase(it);
+            if (remaining == 0)
+            {
+                _freeCount -= count;
+                return true;
+            }
+        }
+        const GLsizei first = (*it).first, available = (*it).second;
+        ranges.push_back(IndexRange(first, remaining));
+        _free.erase(it);
+        _free[first + remaining] = available - remaining;
+        _freeCount -= count;
+        return true;
+    }
+
+    const GLsizei first = (*it).first, available = (*it).second;
+    ranges.push_back(IndexRange(first, count));
+    it = _free.erase(it);
+    if (available > count)
+    {
+        _free.insert(it, std::make_pair(first + count, available - count));
+    }
+    _freeCount -= count;
+    return true;
+}
+
+void ExtentAllocator::release(const GLsizei first, const GLsizei count)
+{
+    if (count <= 0)
+    {
+        return;
+    }
+    GLsizei newCount = count;
+
+    auto next = _free.lower_bound(first);
+    assert(next == _free.end() || (*next).first >= first + count);
+    if (next != _free.end() && (*next).first == first + count)
+    {
+        newCount += (*next).second;
+        next = _free.erase(next);
+    }
+
+    if (next != _free.begin())
+    {
+        auto prev = next;
+        prev--;
+        assert((*prev).first + (*prev).second <= first);
+        if ((*prev).first + (*prev).second == first)
+        {
+            (*prev).second += newCount;
+            _freeCount += count;
+            return;
+        }
+    }
+
+    _free.insert(next, std::make_pair(first, newCount));
+    _freeCount += count;
+}
+
+GLsizei ExtentAllocator::getLargestExtent() const
+{
+    GLsizei largest = 0;
+    for (auto it = _free.begin(); it != _free.end(); it++)
+    {
+        if ((*it).second > largest)
+        {
+            largest = (*it).second;
+        }
+    }
+    return largest;
+}
+
+double ExtentAllocator::getFragmentation() const
+{
+    if (_freeCount == 0)
+    {
+        return 0;
+    }
+    return 1.0 - (double)getLargestExtent() / _freeCount;
+}
+
+}
+}
@@ -0,0 +1,78 @@
+/**********************************************************************
+File name: ExtentAllocator.hpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#ifndef _PYE_GL_EXTENT_ALLOCATOR_H
+#define _PYE_GL_EXTENT_ALLOCATOR_H
+
+#include <map>
+
+#include "IndexRanges.hpp"
+
+namespace PyEngine {
+namespace GL {
+
+/**
+ * First-fit allocator over item indices, which keeps the free space as
+ * a sorted map of disjoint extents (first index -> count). Adjacent
+ * extents are merged on release.
+ */
+class ExtentAllocator {
+public:
+    ExtentAllocator();
+
+protected:
+    std::map<GLsizei, GLsizei> _free;
+    GLsizei _freeCount;
+
+public:
+    /**
+     * Allocate count items and append them to ranges. The first extent
+     * large enough is used, so the result is contiguous if possible;
+     * otherwise, extents are used in index order. Return false and
+     * leave everything unchanged if there are not enough free items.
+     */
+    bool allocate(const GLsizei count, IndexRangeList &ranges);
+
+    /**
+     * Mark the items from first to first+count-1 as free. They must
+     * not be free already.
+     */
+    void release(const GLsizei first, const GLsizei count);
+
+public:
+    GLsizei getFreeCount() const { return _freeCount; };
+    GLsizei getExtentCount() const { return _free.size(); };
+    GLsizei getLargestExtent() const;
+    /**
+     * Share of the free items which is not part of the largest free
+     * extent, from 0 (no fragmentation) to almost 1.
+     */
+    double getFragmentation() const;
+};
+
+}
+}
+
+#endif
@@ -26,10 +26,13 @@ authors named in the AUTHORS file.
 #include "GenericBuffer.hpp"
 
 #include <cstddef>
+#include <cstring>
 #include <exception>
 #include <stdexcept>
 #include <iostream>
 
+#include "StateManagement.hpp"
+
 namespace PyEngine {
 namespace GL {
 
@@ -41,7 +44,9 @@ GenericBuffer::GenericBuffer(const GLsizei aItemSize, const GLenum aKind, const
     data(0),
     bufferPurpose(aPurpose),
     bufferKind(aKind),
-    itemSize(aItemSize)
+    itemSize(aItemSize),
+    _bytesUploaded(0),
+    _uploadCalls(0)
 {
 
 }
@@ -66,12 +71,16 @@ void GenericBuffer::doExpand(const GLsizei, const GLsizei) {
 void GenericBuffer::doFlushAll() {
     glBufferSubData(bufferKind, 0, capacity * itemSize, data);
     raiseLastGLError();
+    _bytesUploaded += capacity * itemSize;
+    _uploadCalls++;
 }
 
 void GenericBuffer::doFlushRange(const GLsizei minItem, const GLsizei count) {
     // std::cerr << minItem << " " << count << " " << itemSize << std::endl;
     glBufferSubData(bufferKind, minItem * itemSize, count * itemSize, &data[minItem * itemSize]);
     raiseLastGLError();
+    _bytesUploaded += count * itemSize;
+    _uploadCalls++;
 }
 
 void GenericBuffer::expand() {
@@ -82,7 +91,7 @@ void GenericBuffer::expand() {
     data = (unsigned char*)realloc(data, newSize);
 
     if (_glid != 0) {
-        glBindBuffer(bufferKind, _glid);
+        stateCache->bindBuffer(bufferKind, _glid);
         glBufferData(bufferKind, newSize, 0, bufferPurpose);
         glBufferSubData(bufferKind, 0, oldSize, data);
     }
@@ -93,7 +102,7 @@ void GenericBuffer::expand() {
 }
 
 void GenericBuffer::freeBuffer() {
-    glDeleteBuffers(1, &_glid);
+    stateCache->deleteBuffers(1, &_glid);
     _glid = 0;
 }
 
@@ -102,7 +111,7 @@ void GenericBuffer::initBuffer() {
     // std::cout << "initialized buffer " << _glid << " capacity is currently " << capacity << std::endl;
     raiseLastGLError();
     if (capacity > 0) {
-        glBindBuffer(bufferKind, _glid);
+        stateCache->bindBuffer(bufferKind, _glid);
         // std::cout << "writing " << capacity * itemSize << " bytes ( = " << capacity << " items) to the buffer as initalization" << std::endl;
         raiseLastGLError();
         glBufferData(bufferKind, capacity * itemSize, data, bufferPurpose);
@@ -129,7 +138,7 @@ void GenericBuffer::requireBuffer() {
 
 void GenericBuffer::bind() {
     requireBuffer();
-    glBindBuffer(bufferKind, _glid);
+    stateCache->bindBuffer(bufferKind, _glid);
     if (needsFlush()) {
         autoFlush();
     }
@@ -150,11 +159,42 @@ void GenericBuffer::readBack() {
     }
     bind();
     // std::cout << "reading back " << capacity * itemSize << " bytes from GPU buffer #" << _glid << std::endl;
-    glGetBufferSubData(bufferKind, 0, capacity * itemSize, data);
+    readBackRange(0, capacity, data);
+}
+
+void GenericBuffer::readBackRange(
+    const GLsizei minItem,
+    const GLsizei count,
+    void *dest)
+{
+    glGetBufferSubData(bufferKind, minItem * itemSize, count * itemSize, dest);
+    raiseLastGLError();
+}
+
+GLsizei GenericBuffer::verifyRange(const GLsizei minItem, const GLsizei count) {
+    if ((_glid == 0) || (count <= 0)) {
+        return -1;
+    }
+    // bind without flushing, the point is to see what the GPU has
+    stateCache->bindBuffer(bufferKind, _glid);
+    std::vector<unsigned char> gpu(count * itemSize);
+    readBackRange(minItem, count, &gpu[0]);
+    const unsigned char *local = &data[minItem * itemSize];
+    for (GLsizei i = 0; i < count; i++) {
+        if (memcmp(&gpu[i * itemSize], &local[i * itemSize], itemSize) != 0) {
+            return minItem + i;
+        }
+    }
+    return -1;
 }
 
 void GenericBuffer::unbind() {
-    glBindBuffer(bufferKind, 0);
+    stateCache->bindBuffer(bufferKind, 0);
+}
+
+void GenericBuffer::resetUploadCounters() {
+    _bytesUploaded = 0;
+    _uploadCalls = 0;
 }
 
 
@@ -58,6 +58,9 @@ protected:
     const GLenum bufferKind;
     const GLsizei itemSize;
 
+    size_t _bytesUploaded;
+    unsigned int _uploadCalls;
+
 protected:
     virtual void autoFlush();
     virtual void doExpand(const GLsizei oldCapacity, const GLsizei newCapacity);
@@ -74,12 +77,34 @@ public:
     virtual void bind();
     void flush();
     void readBack();
+    /**
+     * Copy count items starting at minItem from the buffer object to
+     * dest. The buffer object must exist and be bound.
+     */
+    void readBackRange(
+        const GLsizei minItem,
+        const GLsizei count,
+        void *dest);
+    /**
+     * Compare count items starting at minItem of the buffer object with
+     * the local copy. Return the first item which differs or -1 if all
+     * match (or there is no buffer object yet).
+     */
+    GLsizei verifyRange(const GLsizei minItem, const GLsizei count);
     virtual void unbind();
 
 public:
     GLsizei getCapacity() const { return capacity; }
     GLsizei getItemSize() const { return itemSize; }
 
+    /**
+     * Number of bytes and glBufferSubData calls used to transfer data
+     * to the GPU since the last call to resetUploadCounters.
+     */
+    size_t getBytesUploaded() const { return _bytesUploaded; }
+    unsigned int getUploadCalls() const { return _uploadCalls; }
+    void resetUploadCounters();
+
 };
 
 
@@ -25,13 +25,29 @@ authors named in the AUTHORS file.
 **********************************************************************/
 #include "GeometryBuffer.hpp"
 
+#include <algorithm>
 #include <cassert>
 
+#include "IndexBuffer.hpp"
+#include "StateManagement.hpp"
+
 namespace PyEngine {
 namespace GL {
 
 /* PyEngine::GL::VertexFormat */
 
+static inline VertexAttribType typeOf(const VertexAttribType *types,
+    const VertexAttribSlot slot)
+{
+    return (types ? types[slot] : AttribFloat32);
+}
+
+static inline size_t slotSize(const VertexAttribType *types,
+    const VertexAttribSlot slot, const unsigned int n)
+{
+    return attribSize(typeOf(types, slot), n);
+}
+
 VertexFormat::VertexFormat(const unsigned int aNPosition,
         const unsigned int aNColour,
         const unsigned int aNTexCoord0, 
@@ -42,7 +58,8 @@ VertexFormat::VertexFormat(const unsigned int aNPosition,
         const unsigned int aNVertexAttrib0, 
         const unsigned int aNVertexAttrib1, 
         const unsigned int aNVertexAttrib2, 
-        const unsigned int aNVertexAttrib3):        
+        const unsigned int aNVertexAttrib3,
+        const VertexAttribType *aTypes):
         nPosition(aNPosition),
         nColour(aNColour),
         nTexCoord0(aNTexCoord0),
@@ -55,21 +72,24 @@ VertexFormat::VertexFormat(const unsigned int aNPosition,
         nVertexAttrib3(aNVertexAttrib3),
         normal(aNormal),
         posOffset(0),
-        colourOffset(posOffset + nPosition * glTypeSize),
-        texCoord0Offset(colourOffset + nColour * glTypeSize),
-        texCoord1Offset(texCoord0Offset + nTexCoord0 * glTypeSize),
-        texCoord2Offset(texCoord1Offset + nTexCoord1 * glTypeSize),
-        texCoord3Offset(texCoord2Offset + nTexCoord2 * glTypeSize),
-        normalOffset(texCoord3Offset + nTexCoord3 * glTypeSize),
-        vertexAttrib0Offset(normalOffset + (normal?3:0) * glTypeSize),
-        vertexAttrib1Offset(vertexAttrib0Offset + nVertexAttrib0 * glTypeSize),
-        vertexAttrib2Offset(vertexAttrib1Offset + nVertexAttrib1 * glTypeSize),
-        vertexAttrib3Offset(vertexAttrib2Offset + nVertexAttrib2 * glTypeSize),
-        vertexSize(vertexAttrib3Offset + nVertexAttrib3 * glTypeSize),
+        colourOffset(posOffset + slotSize(aTypes, SlotPosition, nPosition)),
+        texCoord0Offset(colourOffset + slotSize(aTypes, SlotColour, nColour)),
+        texCoord1Offset(texCoord0Offset + slotSize(aTypes, SlotTexCoord0, nTexCoord0)),
+        texCoord2Offset(texCoord1Offset + slotSize(aTypes, SlotTexCoord1, nTexCoord1)),
+        texCoord3Offset(texCoord2Offset + slotSize(aTypes, SlotTexCoord2, nTexCoord2)),
+        normalOffset(texCoord3Offset + slotSize(aTypes, SlotTexCoord3, nTexCoord3)),
+        vertexAttrib0Offset(normalOffset + slotSize(aTypes, SlotNormal, (normal?3:0))),
+        vertexAttrib1Offset(vertexAttrib0Offset + slotSize(aTypes, SlotVertexAttrib0, nVertexAttrib0)),
+        vertexAttrib2Offset(vertexAttrib1Offset + slotSize(aTypes, SlotVertexAttrib1, nVertexAttrib1)),
+        vertexAttrib3Offset(vertexAttrib2Offset + slotSize(aTypes, SlotVertexAttrib2, nVertexAttrib2)),
+        vertexSize(vertexAttrib3Offset + slotSize(aTypes, SlotVertexAttrib3, nVertexAttrib3)),
         vertexLength(nPosition + nColour + nTexCoord0 + nTexCoord1 +
             nTexCoord2 + nTexCoord3 + nVertexAttrib0 + nVertexAttrib1 +
             nVertexAttrib2 + nVertexAttrib3 + (normal?3:0))
 {
+    for (unsigned int i = 0; i < VERTEX_ATTRIB_SLOT_COUNT; i++) {
+        types[i] = typeOf(aTypes, (VertexAttribSlot)i);
+    }
     assert((nPosition >= 2) && (nPosition <= 4));
     assert((nColour >= 3 || nColour == 0) && (nColour <= 4));
     assert((nTexCoord0 <= 4));
@@ -81,6 +101,58 @@ VertexFormat::VertexFormat(const unsigned int aNPosition,
     assert((nVertexAttrib2 <= 4));
     assert((nVertexAttrib3 <= 4));
     assert(vertexSize > 0); // this is a true assertion; with the first assert, this should never throw.
+    // the fixed function pointers do not take every type
+    assert((types[SlotPosition] == AttribFloat32)
+        || (types[SlotPosition] == AttribFloat16));
+    assert(types[SlotColour] != AttribSNorm10_10_10_2);
+    // packed types need a size of four, which glNormalPointer does not
+    // have
+    assert((types[SlotNormal] == AttribFloat32)
+        || (types[SlotNormal] == AttribFloat16));
+    for (unsigned int i = 0; i < BUFFER_TEX_COORD_COUNT; i++) {
+        assert((types[SlotTexCoord0+i] == AttribFloat32)
+            || (types[SlotTexCoord0+i] == AttribFloat16));
+    }
+    for (unsigned int i = 0; i < BUFFER_VERTEX_ATTRIB_COUNT; i++) {
+        assert((types[SlotVertexAttrib0+i] != AttribSNorm10_10_10_2)
+            || (getCount((VertexAttribSlot)(SlotVertexAttrib0+i)) == 4));
+    }
+}
+
+unsigned int VertexFormat::getCount(const VertexAttribSlot slot) const
+{
+    switch (slot) {
+    case SlotPosition: return nPosition;
+    case SlotColour: return nColour;
+    case SlotTexCoord0: return nTexCoord0;
+    case SlotTexCoord1: return nTexCoord1;
+    case SlotTexCoord2: return nTexCoord2;
+    case SlotTexCoord3: return nTexCoord3;
+    case SlotNormal: return (normal?3:0);
+    case SlotVertexAttrib0: return nVertexAttrib0;
+    case SlotVertexAttrib1: return nVertexAttrib1;
+    case SlotVertexAttrib2: return nVertexAttrib2;
+    case SlotVertexAttrib3: return nVertexAttrib3;
+    }
+    return 0;
+}
+
+size_t VertexFormat::getOffset(const VertexAttribSlot slot) const
+{
+    switch (slot) {
+    case SlotPosition: return posOffset;
+    case SlotColour: return colourOffset;
+    case SlotTexCoord0: return texCoord0Offset;
+    case SlotTexCoord1: return texCoord1Offset;
+    case SlotTexCoord2: return texCoord2Offset;
+    case SlotTexCoord3: return texCoord3Offset;
+    case SlotNormal: return normalOffset;
+    case SlotVertexAttrib0: return vertexAttrib0Offset;
+    case SlotVertexAttrib1: return vertexAttrib1Offset;
+    case SlotVertexAttrib2: return vertexAttrib2Offset;
+    case SlotVertexAttrib3: return vertexAttrib3Offset;
+    }
+    return 0;
 }
 
 VertexFormat *VertexFormat::copy(const VertexFormat *vf)
@@ -96,38 +168,82 @@ VertexFormat *VertexFormat::copy(const VertexFormat *vf)
         vf->nVertexAttrib0,
         vf->nVertexAttrib1,
         vf->nVertexAttrib2,
-        vf->nVertexAttrib3
+        vf->nVertexAttrib3,
+        vf->types
     );
 }
 
 /* PyEngine::GL::GeometryBuffer */
 
+/**
+ * Number of GL calls GeometryBuffer::setupPointers makes for fmt.
+ */
+static unsigned int attribCallCount(const VertexFormat *fmt)
+{
+    const unsigned int texCoords = (fmt->nTexCoord0 > 0)
+        + (fmt->nTexCoord1 > 0)
+        + (fmt->nTexCoord2 > 0)
+        + (fmt->nTexCoord3 > 0);
+    const unsigned int vertexAttribs = (fmt->nVertexAttrib0 > 0)
+        + (fmt->nVertexAttrib1 > 0)
+        + (fmt->nVertexAttrib2 > 0)
+        + (fmt->nVertexAttrib3 > 0);
+    return 2 * (fmt->nPosition > 0)
+        + 2 * (fmt->nColour > 0)
+        + 3 * texCoords
+        + 2 * fmt->normal
+        + vertexAttribs;
+}
+
 GeometryBuffer::GeometryBuffer(const VertexFormatHandle vertexFormat, const GLenum aPurpose):
     GenericBuffer(vertexFormat->vertexSize, GL_ARRAY_BUFFER, aPurpose),
     _vertexFormat(VertexFormat::copy(&*vertexFormat)),
     _handles(),
     _freeVertices(),
-    _dirtyVertices()
+    _dirtyVertices(),
+    _flushGapThreshold(16),
+    _maxFlushRanges(8),
+    _vertexArrays(),
+    _useVertexArrays(true),
+    _attribCallsPerBind(attribCallCount(_vertexFormat)),
+    _attribCalls(0),
+    _attribCallsSaved(0),
+    _drawIndices(),
+    _drawEntries(),
+    _useServerIndices(false),
+    _clientIndexDraws(0)
 {
     
 }
 
+GeometryBuffer::~GeometryBuffer()
+{
+    freeVertexArrays();
+}
+
 void GeometryBuffer::doExpand(const GLsizei oldCapacity, const GLsizei newCapacity)  
 {
     GenericBuffer::doExpand(oldCapacity, newCapacity);
-    for (VertexIndex i = oldCapacity; i < newCapacity; i++) {
-        _freeVertices.push_back(i);
-    }
+    _dirtyVertices.resize(newCapacity);
+    _freeVertices.release(oldCapacity, newCapacity - oldCapacity);
 }
 
 void GeometryBuffer::gc_one(const VertexIndexListHandle handle) {
-    VertexIndexList *list = handle.get();
-    // freeVertices.splice(freeVertices.begin(), *list);
-    for (VertexIndexList::iterator it = list->begin();
-        it != list->end();
+    VertexIndexList sorted(*handle);
+    std::sort(sorted.begin(), sorted.end());
+
+    IndexRangeList ranges;
+    for (VertexIndexList::iterator it = sorted.begin();
+        it != sorted.end();
         it++)
     {
-        _freeVertices.push_back(*it);
+        appendIndex(ranges, *it);
+    }
+    for (IndexRangeList::iterator it = ranges.begin();
+        it != ranges.end();
+        it++)
+    {
+        _freeVertices.release((*it).first, (*it).second);
     }
 }
 
@@ -146,21 +262,29 @@ GLsizei GeometryBuffer::map(const GLsizei index) {
 void GeometryBuffer::set(const GLsizei index, const GLsizei offset, const GLVertexFloat *value, const GLsizei n) {
     const GLsizei mappedIndex = map(index);
     memcpy(data + (mappedIndex * itemSize) + offset, value, n * glTypeSize);
-    _dirtyVertices.insert(mappedIndex);
+    _dirtyVertices.mark(mappedIndex);
 }
 
 VertexIndexListHandle GeometryBuffer::allocateVertices(const GLsizei count) {
-    if ((GLsizei)_freeVertices.size() < count) {
+    if (_freeVertices.getFreeCount() < count) {
         gc();
-        while ((GLsizei)_freeVertices.size() < count) {
+        while (_freeVertices.getFreeCount() < count) {
             expand();
         }
     }
-    
+
+    IndexRangeList ranges;
+    _freeVertices.allocate(count, ranges);
+
     VertexIndexList *result = new VertexIndexList();
-    for (GLsizei i = 0; i < count; i++) {
-        result->push_back(_freeVertices.front());
-        _freeVertices.pop_front();
+    result->reserve(count);
+    for (IndexRangeList::iterator it = ranges.begin();
+        it != ranges.end();
+        it++)
+    {
+        for (VertexIndex i = 0; i < (*it).second; i++) {
+            result->push_back((*it).first + i);
+        }
     }
     
     VertexIndexListHandle handle = VertexIndexListHandle(result);
@@ -182,7 +306,8 @@ void GeometryBuffer::gc() {
             // if this is below 2, something broke; one reference should
             // be in the list and one here
             assert(handle.use_count() >= 2);
-            if (handle.use_count() == 2) {
+            if (isUnused(handle)) {
+                forgetIndices(handle.get());
                 gc_one(handle);
                 _handles.erase(it);
                 changed = true;
@@ -191,6 +316,7 @@ void GeometryBuffer::gc() {
             }
         }
     }
+    pruneDrawEntries();
     // std::cerr << std::endl << "  use counts: ";
     /*for (VertexIndexListHandleList::iterator it = _handles.begin();
         it != _handles.end();
@@ -213,90 +339,246 @@ BufferMapHandle GeometryBuffer::getMap()
 
 void GeometryBuffer::autoFlush() {
     // std::cout << "auto-flushing geometry buffer " << glID << std::endl;
-    VertexIndex min, max;
-    auto it = _dirtyVertices.begin();
-    if (it == _dirtyVertices.end())
-    {
-        // std::cerr << "nothing to flush" << std::endl;
-        return;
-    }
-    min = *it;
-    max = *it;
-    
-    for (it++;
-        it != _dirtyVertices.end();
-        it++) 
+    IndexRangeList runs;
+    _dirtyVertices.appendRanges(runs);
+
+    const IndexRangeList ranges = coalesceRanges(
+        runs, _flushGapThreshold, _maxFlushRanges);
+    for (auto it = ranges.begin(); it != ranges.end(); it++)
     {
-        if (min > *it) {
-            min = *it;
-        }
-        if (max < *it) {
-            max = *it;
-        }
+        doFlushRange((*it).first, (*it).second);
     }
-    doFlushRange(min, (max - min) + 1);
     _dirtyVertices.clear();
 }
 
 void GeometryBuffer::invalidateRange(const GLsizei minIndex,
     const GLsizei maxIndex)
 {
-    _dirtyVertices.insert(minIndex);
-    _dirtyVertices.insert(maxIndex);
+    _dirtyVertices.markRange(minIndex, maxIndex - minIndex + 1);
+}
+
+void GeometryBuffer::setFlushGapThreshold(const GLsizei aValue)
+{
+    assert(aValue >= 0);
+    _flushGapThreshold = aValue;
+}
+
+void GeometryBuffer::setMaxFlushRanges(const unsigned int aValue)
+{
+    assert(aValue > 0);
+    _maxFlushRanges = aValue;
 }
 
 void GeometryBuffer::setMap(BufferMapHandle aValue) {
     bufferMap = aValue;
 }
 
+bool GeometryBuffer::isUnused(const VertexIndexListHandle &handle) const
+{
+    // referenced from _handles, by the caller and possibly by the entry
+    // of its server side copy
+    const long expected = (_drawEntries.count(handle.get()) ? 3 : 2);
+    return handle.use_count() == expected;
+}
+
+void GeometryBuffer::forgetIndices(const VertexIndexList *list)
+{
+    auto it = _drawEntries.find(list);
+    if (it == _drawEntries.end()) {
+        return;
+    }
+    _drawIndices->remove(it->second);
+    _drawEntries.erase(it);
+}
+
+void GeometryBuffer::pruneDrawEntries()
+{
+    if (!_drawIndices) {
+        return;
+    }
+    // drop copies of lists which are only kept alive by their entry
+    for (auto it = _drawEntries.begin(); it != _drawEntries.end();)
+    {
+        if (it->second->vertices.use_count() == 1) {
+            _drawIndices->remove(it->second);
+            it = _drawEntries.erase(it);
+        } else {
+            it++;
+        }
+    }
+    if (_drawIndices->isCompacting()) {
+        _drawIndices->compress();
+    }
+}
+
+std::shared_ptr<IndexEntry> GeometryBuffer::requireIndices(
+    const VertexIndexListHandle &handle)
+{
+    if (!_drawIndices) {
+        _drawIndices = StaticIndexBufferHandle(
+            new StaticIndexBuffer(GL_STATIC_DRAW));
+    }
+
+    auto it = _drawEntries.find(handle.get());
+    if (it != _drawEntries.end()) {
+        if (it->second->count == (VertexIndex)handle->size()) {
+            return it->second;
+        }
+        forgetIndices(handle.get());
+    }
+
+    if (_drawIndices->getCount() + (GLsizei)handle->size()
+        > _drawIndices->getCapacity())
+    {
+        pruneDrawEntries();
+    }
+    const IndexEntryHandle entry = _drawIndices->add(handle);
+    _drawEntries[handle.get()] = entry;
+    return entry;
+}
+
+void GeometryBuffer::invalidateIndices(const VertexIndexListHandle &handle)
+{
+    forgetIndices(handle.get());
+}
+
+void GeometryBuffer::setUseServerIndices(const bool aValue)
+{
+    _useServerIndices = aValue;
+}
+
+void GeometryBuffer::freeVertexArrays()
+{
+    for (auto it = _vertexArrays.begin(); it != _vertexArrays.end(); it++)
+    {
+        stateCache->deleteVertexArrays(1, &it->second);
+    }
+    _vertexArrays.clear();
+}
+
+void GeometryBuffer::freeBuffer()
+{
+    // the arrays refer to the buffer object by name
+    freeVertexArrays();
+    GenericBuffer::freeBuffer();
+}
+
+void GeometryBuffer::setUseVertexArrays(const bool aValue)
+{
+    if (!aValue) {
+        freeVertexArrays();
+    }
+    _useVertexArrays = aValue;
+}
+
+void GeometryBuffer::resetBindCounters()
+{
+    _attribCalls = 0;
+    _attribCallsSaved = 0;
+    _clientIndexDraws = 0;
+}
+
 void GeometryBuffer::bind()
+{
+    bindWithIndices(0);
+}
+
+void GeometryBuffer::bindWithIndices(GenericBuffer *indexBuffer)
 {
     GenericBuffer::bind();
+
+    if (!_useVertexArrays || !GLEW_ARB_vertex_array_object) {
+        setupPointers();
+        if (indexBuffer) {
+            indexBuffer->bind();
+        }
+        return;
+    }
+
+    auto it = _vertexArrays.find(indexBuffer);
+    if (it != _vertexArrays.end()) {
+        stateCache->bindVertexArray(it->second);
+        _attribCallsSaved += _attribCallsPerBind;
+        if (indexBuffer) {
+            // usually recorded in the array already, but it may need a
+            // flush
+            indexBuffer->bind();
+        }
+        return;
+    }
+
+    GLuint vertexArray;
+    glGenVertexArrays(1, &vertexArray);
+    raiseLastGLError();
+    stateCache->bindVertexArray(vertexArray);
+    setupPointers();
+    if (indexBuffer) {
+        // binding inside the array records it there
+        indexBuffer->bind();
+    }
+    _vertexArrays[indexBuffer] = vertexArray;
+}
+
+void GeometryBuffer::setupPointers()
+{
+    _attribCalls += _attribCallsPerBind;
     const VertexFormat *fmt = _vertexFormat;
     const GLsizei vertexSize = fmt->vertexSize;
     if (fmt->nPosition > 0) {
         glEnableClientState(GL_VERTEX_ARRAY);
-        glVertexPointer(fmt->nPosition, glType, vertexSize, (const void*)(fmt->posOffset));
+        glVertexPointer(fmt->nPosition, attribGLType(fmt->types[SlotPosition]), vertexSize, (const void*)(fmt->posOffset));
     }
     if (fmt->nColour > 0) {
         glEnableClientState(GL_COLOR_ARRAY);
-        glColorPointer(fmt->nColour, glType, vertexSize, (const void*)(fmt->colourOffset));
+        glColorPointer(fmt->nColour, attribGLType(fmt->types[SlotColour]), vertexSize, (const void*)(fmt->colourOffset));
     }
     if (fmt->nTexCoord0 > 0) {
         glClientActiveTexture(GL_TEXTURE0);
         glEnableClientState(GL_TEXTURE_COORD_ARRAY);
-        glTexCoordPointer(fmt->nTexCoord0, glType, vertexSize, (const void*)fmt->texCoord0Offset);
+        glTexCoordPointer(fmt->nTexCoord0, attribGLType(fmt->types[SlotTexCoord0]), vertexSize, (const void*)fmt->texCoord0Offset);
     }
     if (fmt->nTexCoord1 > 0) {
         glClientActiveTexture(GL_TEXTURE1);
         glEnableClientState(GL_TEXTURE_COORD_ARRAY);
-        glTexCoordPointer(fmt->nTexCoord1, glType, vertexSize, (const void*)fmt->texCoord1Offset);
+        glTexCoordPointer(fmt->nTexCoord1, attribGLType(fmt->types[SlotTexCoord1]), vertexSize, (const void*)fmt->texCoord1Offset);
     }
     if (fmt->nTexCoord2 > 0) {
         glClientActiveTexture(GL_TEXTURE2);
         glEnableClientState(GL_TEXTURE_COORD_ARRAY);
-        glTexCoordPointer(fmt->nTexCoord2, glType, vertexSize, (const void*)fmt->texCoord2Offset);
+        glTexCoordPointer(fmt->nTexCoord2, attribGLType(fmt->types[SlotTexCoord2]), vertexSize, (const void*)fmt->texCoord2Offset);
     }
     if (fmt->nTexCoord3 > 0) {
         glClientActiveTexture(GL_TEXTURE3);
         glEnableClientState(GL_TEXTURE_COORD_ARRAY);
-        glTexCoordPointer(fmt->nTexCoord3, glType, vertexSize, (const void*)fmt->texCoord3Offset);
+        glTexCoordPointer(fmt->nTexCoord3, attribGLType(fmt->types[SlotTexCoord3]), vertexSize, (const void*)fmt->texCoord3Offset);
     }
     if (fmt->normal) {
         glEnableClientState(GL_NORMAL_ARRAY);
-        glNormalPointer(glType, vertexSize, (const void*)fmt->normalOffset);
+        glNormalPointer(attribGLType(fmt->types[SlotNormal]), vertexSize, (const void*)fmt->normalOffset);
     }
     if (fmt->nVertexAttrib0 > 0) {
-        glVertexAttribPointer(0, fmt->nVertexAttrib0, glType, GL_FALSE, vertexSize, (const void*)fmt->vertexAttrib0Offset);
+        glVertexAttribPointer(0, fmt->nVertexAttrib0,
+            attribGLType(fmt->types[SlotVertexAttrib0]),
+            attribNormalized(fmt->types[SlotVertexAttrib0]),
+            vertexSize, (const void*)fmt->vertexAttrib0Offset);
     }
     if (fmt->nVertexAttrib1 > 0) {
-        glVertexAttribPointer(1, fmt->nVertexAttrib1, glType, GL_FALSE, vertexSize, (const void*)fmt->vertexAttrib1Offset);
+        glVertexAttribPointer(1, fmt->nVertexAttrib1,
+            attribGLType(fmt->types[SlotVertexAttrib1]),
+            attribNormalized(fmt->types[SlotVertexAttrib1]),
+            vertexSize, (const void*)fmt->vertexAttrib1Offset);
     }
     if (fmt->nVertexAttrib2 > 0) {
-        glVertexAttribPointer(2, fmt->nVertexAttrib2, glType, GL_FALSE, vertexSize, (const void*)fmt->vertexAttrib2Offset);
+        glVertexAttribPointer(2, fmt->nVertexAttrib2,
+            attribGLType(fmt->types[SlotVertexAttrib2]),
+            attribNormalized(fmt->types[SlotVertexAttrib2]),
+            vertexSize, (const void*)fmt->vertexAttrib2Offset);
     }
     if (fmt->nVertexAttrib3 > 0) {
-        glVertexAttribPointer(3, fmt->nVertexAttrib3, glType, GL_FALSE, vertexSize, (const void*)fmt->vertexAttrib3Offset);
+        glVertexAttribPointer(3, fmt->nVertexAttrib3,
+            attribGLType(fmt->types[SlotVertexAttrib3]),
+            attribNormalized(fmt->types[SlotVertexAttrib3]),
+            vertexSize, (const void*)fmt->vertexAttrib3Offset);
     }
 }
 
@@ -304,11 +586,41 @@ void GeometryBuffer::draw(const VertexIndexListHandle &handle,
     const GLenum mode)
 {
     // assume bound
-    VertexIndex *indicies = &(handle.get()->front());
-    glDrawElements(mode, handle->size(), GL_UNSIGNED_INT, (const GLvoid*)indicies);
+    if (!_useServerIndices) {
+        if (_drawIndices) {
+            // may still be bound from a previous draw
+            stateCache->bindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0);
+        }
+        VertexIndex *indicies = &(handle.get()->front());
+        glDrawElements(mode, handle->size(), GL_UNSIGNED_INT, (const GLvoid*)indicies);
+        _clientIndexDraws++;
+        return;
+    }
+
+    const IndexEntryHandle entry = requireIndices(handle);
+    // bound on every draw, in case another index buffer has been bound
+    // in between (the state cache drops the call otherwise); this also
+    // uploads new lists
+    _drawIndices->bind();
+    glDrawElements(mode, entry->count, GL_UNSIGNED_INT,
+        (const GLvoid*)(entry->start * sizeof(VertexIndex)));
 }
 
 void GeometryBuffer::unbind()
+{
+    if (_useVertexArrays && GLEW_ARB_vertex_array_object) {
+        // the client state lives in the vertex array
+        stateCache->bindVertexArray(0);
+    } else {
+        teardownPointers();
+        if (_drawIndices) {
+            _drawIndices->unbind();
+        }
+    }
+    GenericBuffer::unbind();
+}
+
+void GeometryBuffer::teardownPointers()
 {
     const VertexFormat *fmt = _vertexFormat;
     if (fmt->nPosition > 0) {
@@ -348,7 +660,6 @@ void GeometryBuffer::unbind()
     if (fmt->nVertexAttrib3 > 0) {
         glVertexAttribPointer(3, 0, glType, GL_FALSE, 0, 0);
     }
-    GenericBuffer::unbind();
 }
 
 }
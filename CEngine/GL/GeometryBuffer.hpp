@@ -29,7 +29,9 @@ authors named in the AUTHORS file.
 #include <cstring>
 #include <limits>
 #include <list>
+#include <map>
 #include <set>
+#include <unordered_map>
 #include <vector>
 #include <string>
 
@@ -38,7 +40,10 @@ authors named in the AUTHORS file.
 #include "CEngine/Math/Vectors.hpp"
 #include "Base.hpp"
 #include "BufferMap.hpp"
+#include "ExtentAllocator.hpp"
 #include "GenericBuffer.hpp"
+#include "IndexRanges.hpp"
+#include "VertexAttribTypes.hpp"
 
 namespace PyEngine {
 namespace GL {
@@ -56,18 +61,46 @@ typedef std::vector<VertexIndexListHandle> VertexIndexListHandleList;
 #define BUFFER_TEX_COORD_COUNT 4
 #define BUFFER_VERTEX_ATTRIB_COUNT 4
 
+/**
+ * Attributes of a VertexFormat, in the order in which they are laid out
+ * in a vertex.
+ */
+enum VertexAttribSlot {
+    SlotPosition        = 0,
+    SlotColour          = 1,
+    SlotTexCoord0       = 2,
+    SlotTexCoord1       = 3,
+    SlotTexCoord2       = 4,
+    SlotTexCoord3       = 5,
+    SlotNormal          = 6,
+    SlotVertexAttrib0   = 7,
+    SlotVertexAttrib1   = 8,
+    SlotVertexAttrib2   = 9,
+    SlotVertexAttrib3   = 10
+};
+
+#define VERTEX_ATTRIB_SLOT_COUNT 11
+
 struct VertexFormat {
     const unsigned int nPosition, nColour, nTexCoord0,
         nTexCoord1, nTexCoord2, nTexCoord3, nVertexAttrib0,
         nVertexAttrib1, nVertexAttrib2, nVertexAttrib3;
     const bool normal;
+    /* storage type per VertexAttribSlot */
+    VertexAttribType types[VERTEX_ATTRIB_SLOT_COUNT];
     const size_t posOffset, colourOffset, texCoord0Offset,
         texCoord1Offset, texCoord2Offset, texCoord3Offset,
         normalOffset, vertexAttrib0Offset, vertexAttrib1Offset,
         vertexAttrib2Offset, vertexAttrib3Offset;
+    /* size of a vertex in bytes and number of components */
     const size_t vertexSize, vertexLength;
 
 
+    /**
+     * aTypes, if given, points to VERTEX_ATTRIB_SLOT_COUNT storage
+     * types, indexed by VertexAttribSlot. All attributes are stored as
+     * AttribFloat32 otherwise.
+     */
     VertexFormat(const unsigned int aNPosition = 0,
         const unsigned int aNColour = 0,
         const unsigned int aNTexCoord0 = 0,
@@ -78,9 +111,17 @@ struct VertexFormat {
         const unsigned int aNVertexAttrib0 = 0,
         const unsigned int aNVertexAttrib1 = 0,
         const unsigned int aNVertexAttrib2 = 0,
-        const unsigned int aNVertexAttrib3 = 0);
+        const unsigned int aNVertexAttrib3 = 0,
+        const VertexAttribType *aTypes = 0);
 
     bool isCompatible(const VertexFormat &format) const {
+        for (unsigned int i = 0; i < VERTEX_ATTRIB_SLOT_COUNT; i++) {
+            if (format.getCount((VertexAttribSlot)i) > 0
+                && format.types[i] != types[i])
+            {
+                return false;
+            }
+        }
         return !((format.nPosition > nPosition) ||
             (format.nColour > nColour) ||
             (format.nTexCoord0 > nTexCoord0) ||
@@ -94,22 +135,50 @@ struct VertexFormat {
             (format.nVertexAttrib3 > nVertexAttrib3));
     }
 
+    /**
+     * Number of components and byte offset of the attribute in slot.
+     */
+    unsigned int getCount(const VertexAttribSlot slot) const;
+    size_t getOffset(const VertexAttribSlot slot) const;
+
     static VertexFormat *copy(const VertexFormat *vf);
 };
 
 typedef std::shared_ptr<VertexFormat> VertexFormatHandle;
 
+struct IndexEntry;
+class StaticIndexBuffer;
+
 class GeometryBuffer: public GenericBuffer {
 public:
     GeometryBuffer(
         const VertexFormatHandle vertexFormat,
         const GLenum aPurpose);
+    virtual ~GeometryBuffer();
 
 protected:
     const VertexFormat *_vertexFormat;
     VertexIndexListHandleList _handles;
-    std::list<VertexIndex> _freeVertices;
-    std::set<VertexIndex> _dirtyVertices;
+    ExtentAllocator _freeVertices;
+    IndexBitmap _dirtyVertices;
+    GLsizei _flushGapThreshold;
+    unsigned int _maxFlushRanges;
+
+    /* vertex array objects by the index buffer bound in them (0 for
+     * none); the index buffer is bound again on each use, so a reused
+     * address does no harm */
+    std::map<const GenericBuffer*, GLuint> _vertexArrays;
+    bool _useVertexArrays;
+    const unsigned int _attribCallsPerBind;
+    unsigned int _attribCalls, _attribCallsSaved;
+
+    /* server side copies of the index lists passed to draw, by list;
+     * created on the first draw */
+    std::shared_ptr<StaticIndexBuffer> _drawIndices;
+    std::unordered_map<const VertexIndexList*,
+                       std::shared_ptr<IndexEntry> > _drawEntries;
+    bool _useServerIndices;
+    unsigned int _clientIndexDraws;
 
     BufferMapHandle bufferMap;
 
@@ -125,11 +194,16 @@ protected:
         const GLsizei offset,
         GLVertexFloat *value,
         const GLsizei n);
+    void forgetIndices(const VertexIndexList *list);
+    void freeVertexArrays();
+    virtual void freeBuffer();
+    bool isUnused(const VertexIndexListHandle &handle) const;
     GLsizei map(const GLsizei index);
+    void pruneDrawEntries();
 
     virtual bool needsFlush() const
     {
-        return _dirtyVertices.size() > 0;
+        return !_dirtyVertices.empty();
     };
 
     void set(
@@ -137,6 +211,8 @@ protected:
         const GLsizei offset,
         const GLVertexFloat *value,
         const GLsizei n);
+    void setupPointers();
+    void teardownPointers();
 
 public:
     VertexIndexListHandle allocateVertices(
@@ -154,14 +230,94 @@ public:
         return _vertexFormat;
     }
 
+    inline const ExtentAllocator &getFreeVertices() const
+    {
+        return _freeVertices;
+    }
+
     BufferMapHandle getMap();
 
+    /**
+     * Dirty vertices are transferred in disjoint ranges. Ranges which
+     * are at most getFlushGapThreshold() vertices apart are transferred
+     * together, and no more than getMaxFlushRanges() ranges are used
+     * per flush.
+     */
+    GLsizei getFlushGapThreshold() const { return _flushGapThreshold; };
+    unsigned int getMaxFlushRanges() const { return _maxFlushRanges; };
+
     void invalidateRange(const GLsizei minIndex, const GLsizei maxIndex);
 
+    void setFlushGapThreshold(const GLsizei aValue);
+    void setMaxFlushRanges(const unsigned int aValue);
+
     void setMap(BufferMapHandle aValue);
 
+    /**
+     * Whether attribute pointers are recorded in vertex array objects,
+     * so that binding the buffer again only needs glBindVertexArray.
+     * Has no effect without ARB_vertex_array_object.
+     */
+    bool getUseVertexArrays() const { return _useVertexArrays; };
+    void setUseVertexArrays(const bool aValue);
+
+    /**
+     * Number of attribute pointer related GL calls made by bind, and
+     * the number of calls avoided by reusing a vertex array object,
+     * since the last call to resetBindCounters.
+     */
+    unsigned int getAttribCalls() const { return _attribCalls; };
+    unsigned int getAttribCallsSaved() const { return _attribCallsSaved; };
+    void resetBindCounters();
+
+    /**
+     * Whether draw takes the indices from a buffer object which holds a
+     * copy of every list drawn so far, instead of passing them as a
+     * client side array on each call. Off by default, since the copy of
+     * a list is only replaced when its length changes; callers which
+     * edit lists in place must report that with invalidateIndices.
+     */
+    bool getUseServerIndices() const { return _useServerIndices; };
+    void setUseServerIndices(const bool aValue);
+
+    /**
+     * The buffer object holding the drawn index lists; empty before the
+     * first draw with server side indices.
+     */
+    std::shared_ptr<StaticIndexBuffer> getDrawIndices() const
+    {
+        return _drawIndices;
+    };
+
+    /**
+     * Number of draw calls which passed their indices as a client side
+     * array since the last call to resetBindCounters.
+     */
+    unsigned int getClientIndexDraws() const { return _clientIndexDraws; };
+
+    /**
+     * Return the entry of handle in the server side index buffer,
+     * adding (and uploading) the list if it is not there yet or its
+     * length changed.
+     */
+    std::shared_ptr<IndexEntry> requireIndices(
+        const VertexIndexListHandle &handle);
+
+    /**
+     * Drop the server side copy of handle, so that it is uploaded again
+     * on the next draw. Call this after changing a list which has been
+     * drawn before.
+     */
+    void invalidateIndices(const VertexIndexListHandle &handle);
+
 public:
     virtual void bind();
+
+    /**
+     * Bind the buffer together with the index buffer indexBuffer (or
+     * none, if it is 0) as GL_ELEMENT_ARRAY_BUFFER.
+     */
+    void bindWithIndices(GenericBuffer *indexBuffer);
     void draw(const VertexIndexListHandle &handle, const GLenum mode);
     virtual void unbind();
 
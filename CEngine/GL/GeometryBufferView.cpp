@@ -41,20 +41,20 @@ GeometryBufferView::GeometryBufferView(
     _bufferFormat(buffer->getFormat()),
     _indicies(indicies),
     _map(new VertexIndexListMap(indicies)),
-    _position(newAttribView(_bufferFormat->posOffset, _bufferFormat->nPosition)),
-    _colour(newAttribView(_bufferFormat->colourOffset, _bufferFormat->nColour)),
+    _position(newAttribView(SlotPosition)),
+    _colour(newAttribView(SlotColour)),
     _texCoord{
-        newAttribView(_bufferFormat->texCoord0Offset, _bufferFormat->nTexCoord0),
-        newAttribView(_bufferFormat->texCoord1Offset, _bufferFormat->nTexCoord1),
-        newAttribView(_bufferFormat->texCoord2Offset, _bufferFormat->nTexCoord2),
-        newAttribView(_bufferFormat->texCoord3Offset, _bufferFormat->nTexCoord3)
+        newAttribView(SlotTexCoord0),
+        newAttribView(SlotTexCoord1),
+        newAttribView(SlotTexCoord2),
+        newAttribView(SlotTexCoord3)
     },
-    _normal(newAttribView(_bufferFormat->normalOffset, (_bufferFormat->normal?3:0))),
+    _normal(newAttribView(SlotNormal)),
     _vertexAttrib{
-        newAttribView(_bufferFormat->vertexAttrib0Offset, _bufferFormat->nVertexAttrib0),
-        newAttribView(_bufferFormat->vertexAttrib1Offset, _bufferFormat->nVertexAttrib1),
-        newAttribView(_bufferFormat->vertexAttrib2Offset, _bufferFormat->nVertexAttrib2),
-        newAttribView(_bufferFormat->vertexAttrib3Offset, _bufferFormat->nVertexAttrib3)
+        newAttribView(SlotVertexAttrib0),
+        newAttribView(SlotVertexAttrib1),
+        newAttribView(SlotVertexAttrib2),
+        newAttribView(SlotVertexAttrib3)
     }
 {
     // std::cerr << "uc: " << _indicies.use_count() << std::endl;
@@ -69,12 +69,13 @@ GeometryBufferView::~GeometryBufferView()
 }
 
 GeometryBufferView::AttributeView *GeometryBufferView::newAttribView(
-    const GLsizei attribOffset,
-    const GLsizei attribLength)
+    const VertexAttribSlot slot)
 {
+    const GLsizei attribLength = _bufferFormat->getCount(slot);
     if (attribLength == 0)
         return 0;
-    return new AttributeView(this, attribOffset / sizeof(GLVertexFloat), attribLength);
+    return new AttributeView(this, _bufferFormat->getOffset(slot),
+        attribLength, _bufferFormat->types[slot]);
 }
 
 GeometryBufferView::AttributeView *GeometryBufferView::getTexCoordView(const unsigned int texCoordIndex)
@@ -99,15 +100,16 @@ GeometryBufferView::AttributeView *GeometryBufferView::getVertexAttribView(const
 
 GeometryBufferView::AttributeView::AttributeView(
         GeometryBufferView *view,
-        const GLsizei attribOffset,
-        const GLsizei attribLength):
+        const GLsizei byteOffset,
+        const GLsizei attribLength,
+        const VertexAttribType type):
     _view(view),
-    _attribOffset(attribOffset),
+    _byteOffset(byteOffset),
     _attribLength(attribLength),
+    _type(type),
     _slice(new AttributeSlice(this)),
     _vertexCount(view->getLength()),
-    _vertexLength(view->getHandle()->getFormat()->vertexLength),
-    _data(view->getHandle()->getData())
+    _vertexSize(view->getHandle()->getFormat()->vertexSize)
 {
 
 }
@@ -132,12 +134,28 @@ GLsizei GeometryBufferView::AttributeView::getSize()
     return slice(0, _vertexCount)->getSize();
 }
 
+VertexAttribType GeometryBufferView::AttributeView::getType()
+{
+    return _type;
+}
+
+bool GeometryBufferView::AttributeView::getLayout(
+    GLVertexFloat **first, GLsizei *vertexStride)
+{
+    return slice(0, _vertexCount)->getLayout(first, vertexStride);
+}
+
+void GeometryBufferView::AttributeView::invalidate()
+{
+    slice(0, _vertexCount)->invalidate();
+}
+
 GeometryBufferView::AttributeSlice *GeometryBufferView::AttributeView::slice(
     const GLsizei start, const GLsizei stop, const GLsizei step,
     const GLsizei attribOffset, const GLsizei attribLength)
 {
     GeometryBufferView::AttributeSlice *slice = _slice;
-    slice->setUp(start, stop, step, _attribOffset + attribOffset, (attribLength>=1?attribLength:_attribLength));
+    slice->setUp(start, stop, step, attribOffset, (attribLength>=1?attribLength:_attribLength));
     return slice;
 }
 
@@ -153,7 +171,7 @@ GeometryBufferView::AttributeSlice::AttributeSlice(AttributeView *view):
     _start(0),
     _stop(0),
     _step(1),
-    _attribOffset(_view->_attribOffset),
+    _attribOffset(0),
     _attribLength(_view->_attribLength)
 {
 
@@ -167,8 +185,8 @@ void GeometryBufferView::AttributeSlice::setUp(const GLsizei start,
     assert(start <= stop);
     assert(step >= 1);
     assert(stop <= _view->_vertexCount);
-    assert(attribOffset >= _view->_attribOffset);
-    assert(attribLength <= (_view->_attribLength - (attribOffset-_view->_attribOffset)));
+    assert(attribOffset >= 0);
+    assert(attribLength <= (_view->_attribLength - attribOffset));
     _start = start;
     _stop = stop;
     _step = step;
@@ -176,23 +194,41 @@ void GeometryBufferView::AttributeSlice::setUp(const GLsizei start,
     _attribLength = attribLength;
 }
 
+unsigned char *GeometryBufferView::AttributeSlice::vertexAttrib(
+    const GLsizei index)
+{
+    unsigned char *data =
+        (unsigned char*)_view->_view->_buffer->getData();
+    return data + _view->_view->_map->map(index) * _view->_vertexSize
+        + _view->_byteOffset;
+}
+
 void GeometryBufferView::AttributeSlice::get(GLVertexFloat *data)
 {
-    GLsizei vertexLength = _view->_vertexLength;
-    GLsizei attribOffset = _attribOffset;
+    const VertexAttribType type = _view->_type;
     GLsizei dstStep = _attribLength;
 
-    const GLsizei copySize = _attribLength * sizeof(GLVertexFloat);
-
-    GLVertexFloat *src = _view->_view->_buffer->getData();
-    BufferMap *map = _view->_view->_map;
-
     GLVertexFloat *dest = data;
+    if (type == AttribFloat32)
+    {
+        const GLsizei copySize = _attribLength * sizeof(GLVertexFloat);
+        for (GLsizei i = _start; i < _stop; i += _step)
+        {
+            const GLVertexFloat *src =
+                (const GLVertexFloat*)vertexAttrib(i) + _attribOffset;
+            memcpy(dest, src, copySize);
+            dest += dstStep;
+        }
+        return;
+    }
+
+    // packed types are converted a whole attribute at a time
+    GLVertexFloat values[4];
     for (GLsizei i = _start; i < _stop; i += _step)
     {
-        const GLsizei actualIndex = map->map(i);
-        const GLsizei floatIndex = actualIndex * vertexLength + attribOffset;
-        memcpy(dest, &src[floatIndex], copySize);
+        unpackAttrib(type, vertexAttrib(i), _view->_attribLength, values);
+        memcpy(dest, &values[_attribOffset],
+            _attribLength * sizeof(GLVertexFloat));
         dest += dstStep;
     }
 }
@@ -214,17 +250,89 @@ GLsizei GeometryBufferView::AttributeSlice::getSize()
 
 void GeometryBufferView::AttributeSlice::set(const GLVertexFloat *data)
 {
-    GLsizei vertexLength = _view->_vertexLength;
-    GLsizei attribOffset = _attribOffset;
+    const VertexAttribType type = _view->_type;
+    const GLsizei viewLength = _view->_attribLength;
     GLsizei srcStep = _attribLength;
 
-    const GLsizei copySize = _attribLength * sizeof(GLVertexFloat);
+    const GLVertexFloat *src = data;
+
+    if (type == AttribFloat32)
+    {
+        const GLsizei copySize = _attribLength * sizeof(GLVertexFloat);
+        for (GLsizei i = _start; i < _stop; i += _step)
+        {
+            GLVertexFloat *dest =
+                (GLVertexFloat*)vertexAttrib(i) + _attribOffset;
+            memcpy(dest, src, copySize);
+            src += srcStep;
+        }
+    }
+    else
+    {
+        const bool partial = (_attribLength != viewLength);
+        GLVertexFloat values[4];
+        for (GLsizei i = _start; i < _stop; i += _step)
+        {
+            unsigned char *dest = vertexAttrib(i);
+            if (partial)
+            {
+                // keep the components outside of the slice
+                unpackAttrib(type, dest, viewLength, values);
+            }
+            memcpy(&values[_attribOffset], src,
+                _attribLength * sizeof(GLVertexFloat));
+            packAttrib(type, values, viewLength, dest);
+            src += srcStep;
+        }
+    }
+
+    invalidate();
+}
+
+bool GeometryBufferView::AttributeSlice::getLayout(
+    GLVertexFloat **first, GLsizei *vertexStride)
+{
+    if (_view->_type != AttribFloat32)
+    {
+        return false;
+    }
 
-    GLVertexFloat *dest = _view->_view->_buffer->getData();
     BufferMap *map = _view->_view->_map;
+    const GLsizei vertexSize = _view->_vertexSize;
 
-    const GLVertexFloat *src = data;
+    GLsizei firstIndex = 0, delta = 0;
+    if (_start < _stop)
+    {
+        firstIndex = map->map(_start);
+        GLsizei prev = firstIndex;
+        bool haveDelta = false;
+        for (GLsizei i = _start + _step; i < _stop; i += _step)
+        {
+            const GLsizei actualIndex = map->map(i);
+            if (!haveDelta)
+            {
+                delta = actualIndex - prev;
+                haveDelta = true;
+            }
+            else if (actualIndex - prev != delta)
+            {
+                return false;
+            }
+            prev = actualIndex;
+        }
+    }
+
+    unsigned char *data =
+        (unsigned char*)_view->_view->_buffer->getData();
+    *first = (GLVertexFloat*)(data + firstIndex * vertexSize
+        + _view->_byteOffset) + _attribOffset;
+    *vertexStride = delta * (vertexSize / sizeof(GLVertexFloat));
+    return true;
+}
 
+void GeometryBufferView::AttributeSlice::invalidate()
+{
+    BufferMap *map = _view->_view->_map;
     GLsizei minIndex = -1, maxIndex = -1;
 
     for (GLsizei i = _start; i < _stop; i += _step)
@@ -232,13 +340,12 @@ void GeometryBufferView::AttributeSlice::set(const GLVertexFloat *data)
         const GLsizei actualIndex = map->map(i);
         minIndex = ((actualIndex<minIndex) || (minIndex < 0)?actualIndex:minIndex);
         maxIndex = ((actualIndex>maxIndex) || (maxIndex < 0)?actualIndex:maxIndex);
-
-        const GLsizei floatIndex = actualIndex * vertexLength + attribOffset;
-        memcpy(&dest[floatIndex], src, copySize);
-        src += srcStep;
     }
 
-    _view->_view->_buffer->invalidateRange(minIndex, maxIndex);
+    if (minIndex >= 0)
+    {
+        _view->_view->_buffer->invalidateRange(minIndex, maxIndex);
+    }
 }
 
 
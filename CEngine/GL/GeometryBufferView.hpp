@@ -44,21 +44,25 @@ public:
     class AttributeView {
     public:
         AttributeView(GeometryBufferView *view,
-                      const GLsizei attribOffset,
-                      const GLsizei attribLength);
+                      const GLsizei byteOffset,
+                      const GLsizei attribLength,
+                      const VertexAttribType type);
 
     private:
         GeometryBufferView *_view;
-        GLsizei _attribOffset, _attribLength;
+        GLsizei _byteOffset, _attribLength;
+        VertexAttribType _type;
         AttributeSlice *_slice;
-        GLsizei _vertexCount, _vertexLength;
-        GLVertexFloat *_data;
+        GLsizei _vertexCount, _vertexSize;
 
     public:
         void get(GLVertexFloat *data);
         GLsizei getAttributeLength();
         GLsizei getLength();
         GLsizei getSize();
+        VertexAttribType getType();
+        bool getLayout(GLVertexFloat **first, GLsizei *vertexStride);
+        void invalidate();
         AttributeSlice *slice(const GLsizei start,
                               const GLsizei stop, const GLsizei step = 1,
                               const GLsizei attribOffset = 0,
@@ -76,6 +80,8 @@ public:
         AttributeView *_view;
         GLsizei _start, _stop, _step, _attribOffset, _attribLength;
 
+        unsigned char *vertexAttrib(const GLsizei index);
+
     protected:
         void setUp(const GLsizei start, const GLsizei stop, const GLsizei step,
                    const GLsizei attribOffset, const GLsizei attribLength);
@@ -85,6 +91,23 @@ public:
         GLsizei getAttributeLength();
         GLsizei getLength();
         GLsizei getSize();
+
+        /**
+         * If the attribute is stored as AttribFloat32 and the vertices
+         * of the slice are evenly spaced in the buffer, store a pointer
+         * to the first value of the slice in first and the distance
+         * between two vertices (in floats) in vertexStride and return
+         * true. Otherwise, return false.
+         *
+         * The pointer is only valid until the buffer is expanded.
+         */
+        bool getLayout(GLVertexFloat **first, GLsizei *vertexStride);
+
+        /**
+         * Mark the vertices of the slice as changed, after writing to
+         * them through the pointer obtained from getLayout.
+         */
+        void invalidate();
         void set(const GLVertexFloat *data);
 
         friend class AttributeView;
@@ -110,8 +133,7 @@ private:
         *_vertexAttrib[BUFFER_VERTEX_ATTRIB_COUNT];
 
 private:
-    AttributeView *newAttribView(
-        const GLsizei attribOffset, const GLsizei attribLength);
+    AttributeView *newAttribView(const VertexAttribSlot slot);
 
 public:
     GeometryBufferHandle getHandle() { return _buffer; }
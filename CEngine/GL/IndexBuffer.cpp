@@ -25,17 +25,29 @@ authors named in the AUTHORS file.
 **********************************************************************/
 #include "IndexBuffer.hpp"
 
+#include <algorithm>
+#include <cstring>
+#include <iterator>
+#include <sstream>
+
+#include "StateManagement.hpp"
+
 namespace PyEngine {
 namespace GL {
 
 using namespace PyEngine;
 
+// coalescing parameters for UploadDeferred, see GeometryBuffer
+static const GLsizei deferredGapThreshold = 16;
+static const size_t deferredMaxRanges = 8;
+
 /* PyEngine::GL::IndexEntry */
 
 IndexEntry::IndexEntry(const VertexIndex aStart, const VertexIndexListHandle aVertices):
     start(aStart),
     vertices(aVertices),
-    count(aVertices->size())
+    count(aVertices->size()),
+    attached(true)
 {
 
 }
@@ -74,14 +86,40 @@ void GenericIndexBuffer::dump() {
 /* PyEngine::GL::StreamIndexBuffer */
 
 StreamIndexBuffer::StreamIndexBuffer(const GLenum aPurpose):
-    GenericIndexBuffer(aPurpose)
+    GenericIndexBuffer(aPurpose),
+    _stream(),
+    _streamFirst(0)
 {
 
 }
 
+void StreamIndexBuffer::finishStreamFrame() {
+    if (_stream->isInFrame()) {
+        _stream->endFrame();
+    }
+}
+
 void StreamIndexBuffer::add(const VertexIndexListHandle vertices) {
     VertexIndexList *list = vertices.get();
     const GLsizei len = (GLsizei)list->size();
+    if (_stream) {
+        if (!_stream->isInFrame()) {
+            _stream->beginFrame();
+            count = 0;
+        }
+        GLintptr offset;
+        GLuint *dataptr = (GLuint*)_stream->reserve(
+            len * sizeof(GLuint), &offset);
+        if (!dataptr) {
+            throw Error("StreamIndexBuffer: streaming region overflow");
+        }
+        if (count == 0) {
+            _streamFirst = offset;
+        }
+        std::copy(list->begin(), list->end(), dataptr);
+        count += len;
+        return;
+    }
     while (count + len > capacity) {
         expand();
     }
@@ -98,54 +136,208 @@ void StreamIndexBuffer::add(const VertexIndexListHandle vertices) {
     count += len;
 }
 
+void StreamIndexBuffer::enableStreaming(
+    const GLsizei maxIndices,
+    const unsigned int regionCount,
+    const StreamingMode mode)
+{
+    _stream = StreamingBufferHandle(new StreamingBuffer(
+        GL_ELEMENT_ARRAY_BUFFER,
+        maxIndices * sizeof(GLuint),
+        regionCount,
+        mode));
+    _streamFirst = 0;
+    count = 0;
+}
+
+void StreamIndexBuffer::disableStreaming() {
+    _stream = StreamingBufferHandle();
+    _streamFirst = 0;
+    count = 0;
+}
+
+void StreamIndexBuffer::bind() {
+    if (!_stream) {
+        GenericIndexBuffer::bind();
+        return;
+    }
+    finishStreamFrame();
+    _stream->bind();
+}
+
+void StreamIndexBuffer::clear() {
+    GenericIndexBuffer::clear();
+    if (_stream) {
+        finishStreamFrame();
+        _stream->beginFrame();
+        _streamFirst = _stream->getRegionOffset();
+    }
+}
+
+void StreamIndexBuffer::draw(const GLenum mode) {
+    if (!_stream) {
+        GenericIndexBuffer::draw(mode);
+        return;
+    }
+    glDrawElements(mode, count, GL_UNSIGNED_INT, (const GLvoid*)_streamFirst);
+}
+
 /* PyEngine::GL::StaticIndexBuffer */
 
 StaticIndexBuffer::StaticIndexBuffer(const GLenum aPurpose):
     GenericIndexBuffer(aPurpose),
-    handles(new IndexEntryHandles())
+    handles(new IndexEntryHandles()),
+    _compactCursor(),
+    _packedUpTo(0),
+    _liveCount(0),
+    _compactPending(false),
+    _compactBudget(64),
+    _compactThreshold(0.25),
+    _bytesMoved(0),
+    _uploadMode(UploadDeferred),
+    _dirty(),
+    _verifyUploads(false)
 {
-
+    resetCompaction();
 }
 
 StaticIndexBuffer::~StaticIndexBuffer() {
     delete handles;
 }
 
+void StaticIndexBuffer::autoFlush() {
+    IndexRangeList runs;
+    _dirty.appendRanges(runs);
+    _dirty.clear();
+
+    const IndexRangeList ranges = coalesceRanges(
+        runs, deferredGapThreshold, deferredMaxRanges);
+    for (auto it = ranges.begin(); it != ranges.end(); it++) {
+        doFlushRange((*it).first, (*it).second);
+        verifyUpload((*it).first, (*it).second);
+    }
+}
+
+void StaticIndexBuffer::doExpand(const GLsizei, const GLsizei newCapacity) {
+    _dirty.resize(newCapacity);
+}
+
+void StaticIndexBuffer::uploadRange(const GLsizei first, const GLsizei count) {
+    if ((_glid == 0) || (count <= 0)) {
+        // initBuffer uploads everything once the buffer object exists
+        return;
+    }
+    if (_uploadMode == UploadDeferred) {
+        _dirty.markRange(first, count);
+        return;
+    }
+    stateCache->bindBuffer(bufferKind, _glid);
+    doFlushRange(first, count);
+    verifyUpload(first, count);
+    stateCache->bindBuffer(bufferKind, 0);
+}
+
+void StaticIndexBuffer::verifyUpload(const GLsizei first, const GLsizei count) {
+    if (!_verifyUploads) {
+        return;
+    }
+    const GLsizei mismatch = verifyRange(first, count);
+    if (mismatch >= 0) {
+        std::ostringstream message;
+        message << "StaticIndexBuffer: GPU copy differs at index "
+                << mismatch;
+        throw Error(message.str());
+    }
+}
+
+void StaticIndexBuffer::setUploadMode(const IndexUploadMode value) {
+    if ((value == UploadWriteThrough) && needsFlush()) {
+        flush();
+    }
+    _uploadMode = value;
+}
+
+GLsizei StaticIndexBuffer::verify() {
+    if (_glid == 0) {
+        return -1;
+    }
+    bind();
+    const GLsizei result = verifyRange(0, count);
+    unbind();
+    return result;
+}
+
 void StaticIndexBuffer::compress() {
-    VertexIndex minChange = -1, maxChange = count;
-    VertexIndex nextStart = 0;
-    for (IndexEntryHandles::iterator it = handles->begin();
-        it != handles->end();
-        it++)
-    {
-        const IndexEntryHandle handle = *it;
-        IndexEntry *entry = handle.get();
+    while (compactStep(std::numeric_limits<unsigned int>::max()));
+}
 
-        if (entry->start > nextStart) {
-            if ((minChange > nextStart) || (minChange == -1)) {
-                minChange = nextStart;
-            }
-            updateHandles(it, (entry->start - nextStart));
+void StaticIndexBuffer::resetCompaction() {
+    _compactCursor = handles->begin();
+    _packedUpTo = 0;
+}
+
+bool StaticIndexBuffer::compactStep(const unsigned int maxEntries) {
+    GLuint *dataptr = (GLuint *)data;
+    const GLsizei firstMoved = _packedUpTo;
+    GLsizei lastMoved = -1;
+    unsigned int moved = 0;
+
+    while ((_compactCursor != handles->end()) && (moved < maxEntries)) {
+        IndexEntry *entry = _compactCursor->get();
+        if (entry->start != _packedUpTo) {
+            std::memmove(
+                dataptr + _packedUpTo,
+                dataptr + entry->start,
+                entry->count * sizeof(GLuint));
+            entry->start = _packedUpTo;
+            _bytesMoved += entry->count * sizeof(GLuint);
+            lastMoved = _packedUpTo + entry->count;
+            moved++;
         }
+        _packedUpTo += entry->count;
+        _compactCursor++;
+    }
 
-        nextStart = entry->start + entry->count;
+    if (lastMoved > firstMoved) {
+        // moved entries are packed back to back, so this is one range
+        uploadRange(firstMoved, lastMoved - firstMoved);
     }
-    count = nextStart;
-    if ((minChange < maxChange) && (minChange >= 0)) {
-        bind();
-        doFlushRange(minChange, (maxChange - minChange) + 1);
+
+    if (_compactCursor == handles->end()) {
+        count = _packedUpTo;
+        _compactPending = false;
+        return false;
     }
+    return true;
 }
 
-void StaticIndexBuffer::updateHandles(const IndexEntryHandles::iterator startAt, const GLsizei offset) {
-    for (IndexEntryHandles::iterator it(startAt);
-        it != handles->end();
-        it++)
-    {
-        const IndexEntryHandle handle = *it;
-        IndexEntry *entry = handle.get();
-        entry->start += offset;
+bool StaticIndexBuffer::compactFrame() {
+    if (!_compactPending) {
+        return false;
     }
+    return compactStep(_compactBudget);
+}
+
+float StaticIndexBuffer::getFragmentation() const {
+    if (count == 0) {
+        return 0.;
+    }
+    return (float)(count - _liveCount) / count;
+}
+
+float StaticIndexBuffer::getFreeRatio() const {
+    if (capacity == 0) {
+        return 1.;
+    }
+    return (float)(capacity - _liveCount) / capacity;
+}
+
+void StaticIndexBuffer::setCompactBudget(const unsigned int value) {
+    _compactBudget = (value > 0 ? value : 1);
+}
+
+void StaticIndexBuffer::setCompactThreshold(const float value) {
+    _compactThreshold = value;
 }
 
 const IndexEntryHandle StaticIndexBuffer::add(const VertexIndexListHandle vertices) {
@@ -155,6 +347,10 @@ const IndexEntryHandle StaticIndexBuffer::add(const VertexIndexListHandle vertic
 
     if (count + addCount > capacity) {
         gc();
+        if ((count + addCount > capacity) && (count > _liveCount)) {
+            // reclaim the gaps left by remove before growing
+            compress();
+        }
         while (count + addCount > capacity) {
             expand();
         }
@@ -163,32 +359,56 @@ const IndexEntryHandle StaticIndexBuffer::add(const VertexIndexListHandle vertic
     const IndexEntryHandle handle(new IndexEntry(count, vertices));
     IndexEntry *entry = handle.get();
 
-    GLuint *dataptr = (GLuint *)data;
-    dataptr += entry->start;
-
-    for (VertexIndexList::iterator it = list->begin();
-        it != list->end();
-        it++)
-    {
-        *dataptr = *it;
-        dataptr++;
-    }
+    std::copy(list->begin(), list->end(), (GLuint *)data + entry->start);
     count += entry->count;
-    if (_glid != 0) {
-        glBindBuffer(bufferKind, _glid);
-        // std::cout << "writethrough" << std::endl;
-        glBufferSubData(bufferKind, entry->start * sizeof(GLuint), entry->count * sizeof(GLuint), (unsigned char *)( ((GLuint *)dataptr)+entry->start));
-        glBindBuffer(bufferKind, 0);
-    }
+    _liveCount += entry->count;
+    uploadRange(entry->start, entry->count);
 
     handles->push_back(handle);
+    if (_compactCursor == handles->end()) {
+        // the cursor is past the end, point it at the new entry so that
+        // a running compaction picks it up
+        _compactCursor = std::prev(handles->end());
+    }
 
     return handle;
 }
 
 void StaticIndexBuffer::clear() {
     GenericIndexBuffer::clear();
+    for (IndexEntryHandles::iterator it = handles->begin();
+        it != handles->end();
+        it++)
+    {
+        (*it)->attached = false;
+    }
     handles->clear();
+    _liveCount = 0;
+    _compactPending = false;
+    resetCompaction();
+}
+
+IndexRangeList StaticIndexBuffer::batchRanges(
+    const IndexEntryHandleList &entries) const
+{
+    IndexRangeList ranges;
+    ranges.reserve(entries.size());
+    for (IndexEntryHandleList::const_iterator it = entries.begin();
+        it != entries.end();
+        it++)
+    {
+        const IndexEntry *entry = it->get();
+        if (!entry || !entry->attached || entry->count == 0) {
+            continue;
+        }
+        ranges.push_back(IndexRange(entry->start, entry->count));
+    }
+    if (ranges.empty()) {
+        return ranges;
+    }
+    std::sort(ranges.begin(), ranges.end());
+    // a gap threshold of zero only merges touching (or repeated) ranges
+    return coalesceRanges(ranges, 0, ranges.size());
 }
 
 void StaticIndexBuffer::drawHandle(const IndexEntryHandle handle, const GLenum mode) {
@@ -201,6 +421,38 @@ void StaticIndexBuffer::drawHandle(const IndexEntryHandle handle, const GLenum m
     glDrawElements(mode, entry->count, GL_UNSIGNED_INT, (const GLvoid*)dataptr);
 }
 
+GLsizei StaticIndexBuffer::drawHandles(
+    const IndexEntryHandleList &entries,
+    const GLenum mode)
+{
+    _batchRanges = batchRanges(entries);
+    const GLsizei drawCount = _batchRanges.size();
+    if (drawCount == 0) {
+        return 0;
+    }
+
+    // draw from the server side copy; binding also replaces any other
+    // index buffer left bound and uploads pending changes
+    bind();
+    if (drawCount == 1) {
+        const IndexRange &range = _batchRanges.front();
+        glDrawElements(mode, range.second, GL_UNSIGNED_INT,
+                       (const GLvoid*)(range.first * sizeof(GLuint)));
+        return 1;
+    }
+
+    _batchCounts.resize(drawCount);
+    _batchOffsets.resize(drawCount);
+    for (GLsizei i = 0; i < drawCount; i++) {
+        _batchCounts[i] = _batchRanges[i].second;
+        _batchOffsets[i] =
+            (const GLvoid*)(_batchRanges[i].first * sizeof(GLuint));
+    }
+    glMultiDrawElements(mode, &_batchCounts[0], GL_UNSIGNED_INT,
+                        &_batchOffsets[0], drawCount);
+    return drawCount;
+}
+
 void StaticIndexBuffer::gc() {
     bool changed = true;
     bool globalChanged = false;
@@ -230,12 +482,22 @@ void StaticIndexBuffer::remove(const IndexEntryHandle handle, const bool autoCom
         return;
     }
 
-    handles->erase(it);
+    IndexEntry *entry = handle.get();
+    const bool atCursor = (it == _compactCursor);
+    IndexEntryHandles::iterator next = handles->erase(it);
+    entry->attached = false;
+    _liveCount -= entry->count;
+    if (atCursor || (entry->start < _packedUpTo)) {
+        // the gap is before the cursor, resume compaction from there
+        _compactCursor = next;
+        _packedUpTo = std::min(_packedUpTo, entry->start);
+    }
 
-    // We must not change count here, as for now we allow removing
-    // handles without deallocating their space (see autoCompress)
-    if (autoCompress) {
-        compress();
+    // We must not change count here, the space is reclaimed by
+    // compaction, which only starts once fragmentation crosses the
+    // threshold and then proceeds incrementally (see compactFrame)
+    if (autoCompress && (getFragmentation() > _compactThreshold)) {
+        _compactPending = true;
     }
 }
 
@@ -38,6 +38,8 @@ authors named in the AUTHORS file.
 
 #include "Base.hpp"
 #include "GeometryBuffer.hpp"
+#include "IndexRanges.hpp"
+#include "StreamingBuffer.hpp"
 
 namespace PyEngine {
 namespace GL {
@@ -46,12 +48,15 @@ struct IndexEntry {
     VertexIndex start;
     const VertexIndexListHandle vertices;
     const VertexIndex count;
+    /** false once the entry has been removed from its buffer */
+    bool attached;
 
     IndexEntry(const VertexIndex aStart, const VertexIndexListHandle aVertices);
 };
 
 typedef std::shared_ptr<IndexEntry> IndexEntryHandle;
 typedef std::list<IndexEntryHandle> IndexEntryHandles;
+typedef std::vector<IndexEntryHandle> IndexEntryHandleList;
 
 class GenericIndexBuffer: public GenericBuffer {
 public:
@@ -62,7 +67,7 @@ protected:
 
 public:
     virtual void clear();
-    void draw(const GLenum mode);
+    virtual void draw(const GLenum mode);
     void drawUnbound(const GLenum mode);
     void dump();
 
@@ -77,13 +82,50 @@ class StreamIndexBuffer: public GenericIndexBuffer {
 public:
     StreamIndexBuffer(const GLenum aPurpose = GL_STREAM_DRAW);
 
+private:
+    StreamingBufferHandle _stream;
+    GLintptr _streamFirst;
+
+protected:
+    void finishStreamFrame();
+
 public:
     void add(const VertexIndexListHandle vertices);
 
+    /**
+     * Write indices directly into a ring of maxIndices sized regions of
+     * a StreamingBuffer instead of the CPU side copy. Each clear() starts
+     * a new region.
+     */
+    void enableStreaming(
+        const GLsizei maxIndices,
+        const unsigned int regionCount = 3,
+        const StreamingMode mode = StreamAuto);
+    void disableStreaming();
+
+    StreamingBufferHandle getStreamingBuffer() const { return _stream; };
+
+public:
+    virtual void bind();
+    virtual void clear();
+    virtual void draw(const GLenum mode);
+
 };
 
 typedef std::shared_ptr<StreamIndexBuffer> StreamIndexBufferHandle;
 
+/**
+ * When StaticIndexBuffer transfers changed indices to the GPU.
+ *
+ * UploadWriteThrough issues one glBufferSubData per added (or moved)
+ * block right away. UploadDeferred only marks the indices dirty and
+ * uploads them in coalesced ranges the next time the buffer is bound.
+ */
+enum IndexUploadMode {
+    UploadWriteThrough  = 0,
+    UploadDeferred      = 1
+};
+
 class StaticIndexBuffer: public GenericIndexBuffer {
 public:
     StaticIndexBuffer(const GLenum aPurpose = GL_DYNAMIC_DRAW);
@@ -91,23 +133,123 @@ public:
 
 private:
     IndexEntryHandles *handles;
+    IndexRangeList _batchRanges;
+    std::vector<GLsizei> _batchCounts;
+    std::vector<const GLvoid*> _batchOffsets;
+
+    /* compaction state: all entries before _compactCursor are packed
+     * without gaps into [0, _packedUpTo) */
+    IndexEntryHandles::iterator _compactCursor;
+    GLsizei _packedUpTo;
+    GLsizei _liveCount;
+    bool _compactPending;
+    unsigned int _compactBudget;
+    float _compactThreshold;
+    size_t _bytesMoved;
+
+    IndexUploadMode _uploadMode;
+    IndexBitmap _dirty;
+    bool _verifyUploads;
 
 protected:
-    void compress();
-    void updateHandles(
-        const IndexEntryHandles::iterator startAt,
-        const VertexIndex offset);
+    virtual void autoFlush();
+    virtual void doExpand(
+        const GLsizei oldCapacity,
+        const GLsizei newCapacity);
+    virtual bool needsFlush() const { return !_dirty.empty(); };
+    void resetCompaction();
+    void uploadRange(const GLsizei first, const GLsizei count);
+    void verifyUpload(const GLsizei first, const GLsizei count);
 
 public:
     const IndexEntryHandle add(const VertexIndexListHandle vertices);
 
     virtual void clear();
 
+    /**
+     * Return the index ranges covered by the attached entries out of
+     * entries, sorted and with adjacent ranges merged.
+     */
+    IndexRangeList batchRanges(const IndexEntryHandleList &entries) const;
+
     void drawHandle(const IndexEntryHandle handle,
                     const GLenum mode);
 
+    /**
+     * Draw all entries with as few draw calls as possible: one
+     * glDrawElements if they cover a single contiguous range, one
+     * glMultiDrawElements otherwise. Returns the number of ranges drawn.
+     *
+     * The indices are taken from the buffer object, which is left bound.
+     */
+    GLsizei drawHandles(const IndexEntryHandleList &entries,
+                        const GLenum mode);
+
+    /**
+     * Compact the whole buffer in one go.
+     */
+    void compress();
+
+    /**
+     * Move at most maxEntries entries towards the start of the buffer to
+     * close the gaps left by removed entries. Moved indices are uploaded
+     * as one range. Returns true if there is compaction work left.
+     */
+    bool compactStep(const unsigned int maxEntries);
+
+    /**
+     * compactStep with the configured budget, but only if compaction has
+     * been triggered by the fragmentation threshold. Meant to be called
+     * once per frame.
+     */
+    bool compactFrame();
+
     void gc();
 
+    /**
+     * Number of indices in the buffer which belong to live entries.
+     */
+    GLsizei getLiveCount() const { return _liveCount; };
+
+    /**
+     * Fraction of the used part of the buffer which is occupied by gaps.
+     */
+    float getFragmentation() const;
+
+    /**
+     * Fraction of the allocated capacity which is not used by live
+     * entries.
+     */
+    float getFreeRatio() const;
+
+    size_t getBytesMoved() const { return _bytesMoved; };
+    void resetBytesMoved() { _bytesMoved = 0; };
+
+    unsigned int getCompactBudget() const { return _compactBudget; };
+    void setCompactBudget(const unsigned int value);
+
+    float getCompactThreshold() const { return _compactThreshold; };
+    void setCompactThreshold(const float value);
+
+    bool isCompacting() const { return _compactPending; };
+
+    IndexUploadMode getUploadMode() const { return _uploadMode; };
+    void setUploadMode(const IndexUploadMode value);
+
+    /**
+     * If enabled, every upload is read back from the GPU and compared
+     * with the local copy, raising an Error on mismatch. This is slow
+     * and meant for tests.
+     */
+    bool getVerifyUploads() const { return _verifyUploads; };
+    void setVerifyUploads(const bool value) { _verifyUploads = value; };
+
+    /**
+     * Flush pending uploads and compare the whole used part of the
+     * buffer with the GPU. Return the first differing index or -1.
+     */
+    GLsizei verify();
+
     inline GLsizei getIndex(const GLsizei index) const
     {
         return ((GLuint *)data)[index];
@@ -0,0 +1,210 @@
+/**********************************************************************
+File name: IndexRanges.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include "IndexRanges.hpp"
+
+#include <algorithm>
+#include <cassert>
+
+namespace PyEngine {
+namespace GL {
+
+void appendIndex(IndexRangeList &ranges, const GLsizei index)
+{
+    if (!ranges.empty())
+    {
+        IndexRange &last = ranges.back();
+        assert(index >= last.first);
+        if (index < last.first + last.second)
+        {
+            return;
+        }
+        if (index == last.first + last.second)
+        {
+            last.second++;
+            return;
+        }
+    }
+    ranges.push_back(IndexRange(index, 1));
+}
+
+IndexRangeList coalesceRanges(
+    const IndexRangeList &ranges,
+    const GLsizei gapThreshold,
+    const size_t maxRanges)
+{
+    IndexRangeList result;
+    if (ranges.empty())
+    {
+        return result;
+    }
+    assert(maxRanges > 0);
+
+    // gaps[i] is the gap between ranges[i] and ranges[i+1]
+    std::vector<GLsizei> gaps;
+    gaps.reserve(ranges.size() - 1);
+    for (size_t i = 1; i < ranges.size(); i++)
+    {
+        gaps.push_back(ranges[i].first
+            - (ranges[i-1].first + ranges[i-1].second));
+    }
+
+    // find the largest gap which still has to be closed to end up with
+    // at most maxRanges ranges
+    GLsizei closeUpTo = gapThreshold;
+    if (gaps.size() >= maxRanges)
+    {
+        std::vector<GLsizei> sorted(gaps);
+        const size_t toClose = gaps.size() - (maxRanges - 1);
+        std::nth_element(sorted.begin(), sorted.begin() + (toClose - 1),
+                         sorted.end());
+        closeUpTo = std::max(closeUpTo, sorted[toClose - 1]);
+    }
+
+    // ties at closeUpTo may close more gaps than needed, which only
+    // means fewer ranges
+    result.push_back(ranges[0]);
+    for (size_t i = 1; i < ranges.size(); i++)
+    {
+        if (gaps[i-1] <= closeUpTo)
+        {
+            IndexRange &last = result.back();
+            last.second = ranges[i].first + ranges[i].second - last.first;
+        }
+        else
+        {
+            result.push_back(ranges[i]);
+        }
+    }
+    return result;
+}
+
+/* PyEngine::GL::IndexBitmap */
+
+static const size_t WORD_BITS = 64;
+
+IndexBitmap::IndexBitmap():
+    _words(),
+    _minWord(1),
+    _maxWord(0)
+{
+
+}
+
+void IndexBitmap::appendRanges(IndexRangeList &ranges) const
+{
+    if (empty())
+    {
+        return;
+    }
+    for (size_t word = _minWord; word <= _maxWord; word++)
+    {
+        uint64_t bits = _words[word];
+        while (bits)
+        {
+            const unsigned int first = __builtin_ctzll(bits);
+            // length of the run of set bits starting at first
+            const uint64_t shifted = bits >> first;
+            const unsigned int length = (~shifted == 0)
+                ? WORD_BITS - first
+                : __builtin_ctzll(~shifted);
+            const GLsizei index = word * WORD_BITS + first;
+
+            IndexRange *last = ranges.empty() ? 0 : &ranges.back();
+            if (last && last->first + last->second == index)
+            {
+                last->second += length;
+            }
+            else
+            {
+                ranges.push_back(IndexRange(index, length));
+            }
+
+            if (first + length == WORD_BITS)
+            {
+                break;
+            }
+            bits &= ~(((uint64_t(1) << length) - 1) << first);
+        }
+    }
+}
+
+void IndexBitmap::clear()
+{
+    if (empty())
+    {
+        return;
+    }
+    std::fill(_words.begin() + _minWord, _words.begin() + _maxWord + 1, 0);
+    _minWord = 1;
+    _maxWord = 0;
+}
+
+void IndexBitmap::mark(const GLsizei index)
+{
+    const size_t word = index / WORD_BITS;
+    assert(word < _words.size());
+    _words[word] |= uint64_t(1) << (index % WORD_BITS);
+    if (empty())
+    {
+        _minWord = word;
+        _maxWord = word;
+    }
+    else
+    {
+        _minWord = std::min(_minWord, word);
+        _maxWord = std::max(_maxWord, word);
+    }
+}
+
+void IndexBitmap::markRange(const GLsizei first, const GLsizei count)
+{
+    if (count <= 0)
+    {
+        return;
+    }
+    const GLsizei last = first + count - 1;
+    const size_t firstWord = first / WORD_BITS, lastWord = last / WORD_BITS;
+    assert(lastWord < _words.size());
+    for (size_t word = firstWord; word <= lastWord; word++)
+    {
+        const size_t lo = (word == firstWord) ? first % WORD_BITS : 0;
+        const size_t hi = (word == lastWord) ? last % WORD_BITS : WORD_BITS - 1;
+        const uint64_t mask = (hi - lo + 1 == WORD_BITS)
+            ? ~uint64_t(0)
+            : ((uint64_t(1) << (hi - lo + 1)) - 1) << lo;
+        _words[word] |= mask;
+    }
+    mark(first);
+    mark(last);
+}
+
+void IndexBitmap::resize(const GLsizei capacity)
+{
+    _words.resize((capacity + WORD_BITS - 1) / WORD_BITS, 0);
+}
+
+}
+}
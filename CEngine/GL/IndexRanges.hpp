@@ -0,0 +1,96 @@
+/**********************************************************************
+File name: IndexRanges.hpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#ifndef _PYE_GL_INDEX_RANGES_H
+#define _PYE_GL_INDEX_RANGES_H
+
+#include <cstddef>
+#include <cstdint>
+#include <utility>
+#include <vector>
+
+#include <GL/glew.h>
+
+namespace PyEngine {
+namespace GL {
+
+/**
+ * A range of buffer items, as first item and item count.
+ */
+typedef std::pair<GLsizei, GLsizei> IndexRange;
+typedef std::vector<IndexRange> IndexRangeList;
+
+/**
+ * Append the item index to the sorted ranges in ranges, either by
+ * extending the last range or by starting a new one. Indices must be
+ * passed in ascending order.
+ */
+void appendIndex(IndexRangeList &ranges, const GLsizei index);
+
+/**
+ * Merge the sorted, disjoint ranges in ranges so that each gap between
+ * two resulting ranges is larger than gapThreshold items and at most
+ * maxRanges ranges are left. If there are too many ranges, the
+ * smallest gaps are closed first.
+ */
+IndexRangeList coalesceRanges(
+    const IndexRangeList &ranges,
+    const GLsizei gapThreshold,
+    const size_t maxRanges);
+
+/**
+ * Dense set of item indices, one bit per item. Marking is O(1) and
+ * does not allocate; ranges are extracted a machine word at a time and
+ * only the words between the lowest and highest marked index are
+ * visited.
+ */
+class IndexBitmap {
+public:
+    IndexBitmap();
+
+protected:
+    std::vector<uint64_t> _words;
+    size_t _minWord, _maxWord;
+
+public:
+    /**
+     * Append the marked indices as sorted runs of consecutive indices
+     * to ranges.
+     */
+    void appendRanges(IndexRangeList &ranges) const;
+    void clear();
+    bool empty() const { return _minWord > _maxWord; };
+    void mark(const GLsizei index);
+    void markRange(const GLsizei first, const GLsizei count);
+    /**
+     * Make room for indices up to (excluding) capacity.
+     */
+    void resize(const GLsizei capacity);
+};
+
+}
+}
+
+#endif
@@ -0,0 +1,236 @@
+/**********************************************************************
+File name: RenderQueue.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include "RenderQueue.hpp"
+
+#include <algorithm>
+#include <cstring>
+
+namespace PyEngine {
+namespace GL {
+
+/* PyEngine::GL::RenderQueue */
+
+RenderQueue::RenderQueue(int order):
+    Group::Group(order),
+    _items(),
+    _entries(),
+    _sortBuffer(),
+    _stateIds(),
+    _sorted(true),
+    _stateChanges(0),
+    _stateChangesSkipped(0)
+{
+
+}
+
+uint16_t RenderQueue::stateId(const RenderStateSlot slot,
+    const Struct *state)
+{
+    if (!state) {
+        return 0;
+    }
+    std::unordered_map<const Struct*, uint16_t> &ids = _stateIds[slot];
+    auto it = ids.find(state);
+    if (it != ids.end()) {
+        return it->second;
+    }
+    if (ids.size() >= 0xffff) {
+        throw Error("Too many distinct states in render queue");
+    }
+    const uint16_t id = ids.size() + 1;
+    ids[state] = id;
+    return id;
+}
+
+void RenderQueue::add(GroupHandle group,
+    StructHandle shader,
+    StructHandle texture,
+    StructHandle buffer)
+{
+    RenderItem item;
+    item.group = group;
+    item.states[StateShader] = shader;
+    item.states[StateTexture] = texture;
+    item.states[StateBuffer] = buffer;
+
+    RenderSortEntry entry;
+    entry.key = makeKey(group->getOrder(),
+        stateId(StateShader, shader.get()),
+        stateId(StateTexture, texture.get()),
+        stateId(StateBuffer, buffer.get()));
+    entry.item = _items.size();
+
+    _items.push_back(item);
+    _entries.push_back(entry);
+    _sorted = false;
+}
+
+void RenderQueue::clear()
+{
+    _items.clear();
+    _entries.clear();
+    for (unsigned int i = 0; i < RENDER_STATE_SLOT_COUNT; i++) {
+        _stateIds[i].clear();
+    }
+    _sorted = true;
+}
+
+RenderSortKey RenderQueue::getKey(const unsigned int index) const
+{
+    return _entries[index].key;
+}
+
+RenderSortKey RenderQueue::makeKey(const int order,
+    const uint16_t shader,
+    const uint16_t texture,
+    const uint16_t buffer)
+{
+    const int clamped = std::min(std::max(order, -0x8000), 0x7fff);
+    const uint16_t biasedOrder = clamped + 0x8000;
+    return ((RenderSortKey)biasedOrder << 48)
+        | ((RenderSortKey)shader << 32)
+        | ((RenderSortKey)texture << 16)
+        | (RenderSortKey)buffer;
+}
+
+void RenderQueue::resetCounters()
+{
+    _stateChanges = 0;
+    _stateChangesSkipped = 0;
+}
+
+void RenderQueue::sort()
+{
+    if (_sorted) {
+        return;
+    }
+    const size_t count = _entries.size();
+    if (count == 0) {
+        _sorted = true;
+        return;
+    }
+    _sortBuffer.resize(count);
+
+    // histograms of all eight byte positions in one go
+    static const unsigned int passes = sizeof(RenderSortKey);
+    size_t histograms[passes][256];
+    memset(histograms, 0, sizeof(histograms));
+    for (auto it = _entries.begin(); it != _entries.end(); it++) {
+        const RenderSortKey key = (*it).key;
+        for (unsigned int pass = 0; pass < passes; pass++) {
+            histograms[pass][(key >> (8 * pass)) & 0xff]++;
+        }
+    }
+
+    RenderSortEntry *src = &_entries[0];
+    RenderSortEntry *dest = &_sortBuffer[0];
+    for (unsigned int pass = 0; pass < passes; pass++) {
+        size_t *histogram = histograms[pass];
+        const unsigned int shift = 8 * pass;
+        // all keys share this byte, so the pass would not move anything
+        if (histogram[(src[0].key >> shift) & 0xff] == count) {
+            continue;
+        }
+
+        size_t offset = 0;
+        for (unsigned int i = 0; i < 256; i++) {
+            const size_t bucketSize = histogram[i];
+            histogram[i] = offset;
+            offset += bucketSize;
+        }
+        for (size_t i = 0; i < count; i++) {
+            const unsigned int digit = (src[i].key >> shift) & 0xff;
+            dest[histogram[digit]++] = src[i];
+        }
+        std::swap(src, dest);
+    }
+    if (src != &_entries[0]) {
+        _entries.swap(_sortBuffer);
+    }
+    _sorted = true;
+}
+
+void RenderQueue::compile(GroupCommandList &commands)
+{
+    // items may change without the tree changing
+    commands.execute(this);
+}
+
+void RenderQueue::execute()
+{
+    sort();
+
+    // calls made, and calls setting up and tearing down every item would
+    // have made
+    unsigned int changes = 0, naive = 0;
+
+    Struct *current[RENDER_STATE_SLOT_COUNT] = {0};
+    for (auto it = _entries.begin(); it != _entries.end(); it++)
+    {
+        const RenderItem &item = _items[(*it).item];
+
+        unsigned int first = RENDER_STATE_SLOT_COUNT;
+        for (unsigned int slot = 0; slot < RENDER_STATE_SLOT_COUNT; slot++) {
+            const Struct *state = item.states[slot].get();
+            naive += (state ? 2 : 0);
+            if ((first == RENDER_STATE_SLOT_COUNT) && (state != current[slot])) {
+                first = slot;
+            }
+        }
+
+        // states are nested, so everything from the first difference on
+        // is torn down innermost first and set up again
+        for (unsigned int slot = RENDER_STATE_SLOT_COUNT; slot > first; slot--) {
+            if (current[slot-1]) {
+                current[slot-1]->unbind();
+                changes++;
+            }
+        }
+        for (unsigned int slot = first; slot < RENDER_STATE_SLOT_COUNT; slot++) {
+            Struct *state = item.states[slot].get();
+            if (state) {
+                state->bind();
+                changes++;
+            }
+            current[slot] = state;
+        }
+
+        item.group->execute();
+    }
+
+    for (unsigned int slot = RENDER_STATE_SLOT_COUNT; slot > 0; slot--) {
+        if (current[slot-1]) {
+            current[slot-1]->unbind();
+            changes++;
+        }
+    }
+
+    _stateChanges += changes;
+    _stateChangesSkipped += naive - changes;
+}
+
+}
+}
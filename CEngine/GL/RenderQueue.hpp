@@ -0,0 +1,149 @@
+/**********************************************************************
+File name: RenderQueue.hpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#ifndef _PYE_GL_RENDER_QUEUE_H
+#define _PYE_GL_RENDER_QUEUE_H
+
+#include <cstdint>
+#include <unordered_map>
+#include <vector>
+
+#include "Base.hpp"
+#include "StateManagement.hpp"
+
+namespace PyEngine {
+namespace GL {
+
+/**
+ * State a RenderQueue sorts its items by, from the most to the least
+ * significant.
+ */
+enum RenderStateSlot {
+    StateShader     = 0,
+    StateTexture    = 1,
+    StateBuffer     = 2
+};
+
+#define RENDER_STATE_SLOT_COUNT 3
+
+typedef uint64_t RenderSortKey;
+
+struct RenderItem {
+    GroupHandle group;
+    StructHandle states[RENDER_STATE_SLOT_COUNT];
+};
+
+struct RenderSortEntry {
+    RenderSortKey key;
+    uint32_t item;
+};
+
+/**
+ * A group which draws a list of groups sorted by their order and the
+ * state they need, so that items sharing a shader, texture or buffer
+ * end up next to each other. Between two items, only the states which
+ * differ are torn down and set up again; the states are nested like
+ * StateGroups, i.e. changing the shader tears down the texture and
+ * buffer as well.
+ *
+ * Items are kept until clear() and sorted again on the next execute
+ * after they changed.
+ */
+class RenderQueue: public Group {
+public:
+    RenderQueue(int order = 0);
+
+private:
+    std::vector<RenderItem> _items;
+    /* keys and item indices, in drawing order once sorted */
+    std::vector<RenderSortEntry> _entries;
+    std::vector<RenderSortEntry> _sortBuffer;
+    /* dense per-slot ids of the states, 0 is no state */
+    std::unordered_map<const Struct*, uint16_t>
+        _stateIds[RENDER_STATE_SLOT_COUNT];
+    bool _sorted;
+
+    unsigned int _stateChanges, _stateChangesSkipped;
+
+protected:
+    uint16_t stateId(const RenderStateSlot slot, const Struct *state);
+
+public:
+    /**
+     * Queue group (usually a plain Group, which draws its index buffer)
+     * to be executed with the given states bound. Any of the states may
+     * be empty.
+     */
+    void add(GroupHandle group,
+             StructHandle shader,
+             StructHandle texture,
+             StructHandle buffer);
+    void clear();
+
+    /**
+     * Sort the items by key with a stable LSD radix sort. Called by
+     * execute if needed.
+     */
+    void sort();
+
+    unsigned int getCount() const { return _items.size(); };
+    /**
+     * Key of the index-th item in drawing order.
+     */
+    RenderSortKey getKey(const unsigned int index) const;
+
+    /**
+     * Number of setUp/tearDown calls made by execute, and the number of
+     * calls saved compared to setting up and tearing down all states
+     * of each item, since the last call to resetCounters.
+     */
+    unsigned int getStateChanges() const { return _stateChanges; };
+    unsigned int getStateChangesSkipped() const
+    {
+        return _stateChangesSkipped;
+    };
+    void resetCounters();
+
+    /**
+     * Build the key of an item: 16 bits each for the order (biased, so
+     * that negative orders sort first) and the shader, texture and
+     * buffer ids.
+     */
+    static RenderSortKey makeKey(const int order,
+                                 const uint16_t shader,
+                                 const uint16_t texture,
+                                 const uint16_t buffer);
+
+public:
+    virtual void compile(GroupCommandList &commands);
+    virtual void execute();
+};
+
+typedef boost::shared_ptr<RenderQueue> RenderQueueHandle;
+
+}
+}
+
+#endif
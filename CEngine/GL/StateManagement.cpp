@@ -25,9 +25,433 @@ authors named in the AUTHORS file.
 **********************************************************************/
 #include "StateManagement.hpp"
 
+#include <cstring>
+
 namespace PyEngine {
 namespace GL {
 
+/* PyEngine::GL::StateCache */
+
+StateCache::StateCache():
+    _buffers(),
+    _textures(),
+    _capabilities(),
+    // the initial state of a new context
+    _activeTexture(GL_TEXTURE0),
+    _vertexArrayKnown(false),
+    _vertexArray(0),
+    _programKnown(false),
+    _program(0),
+    _blendFuncKnown(false),
+    _blendSrc(GL_ONE),
+    _blendDst(GL_ZERO),
+    _depthFuncKnown(false),
+    _depthFunc(GL_LESS),
+    _depthMaskKnown(false),
+    _depthMask(true),
+    _matrix(),
+    _matrixStack(),
+    _issued(0),
+    _elided(0),
+    _lastFrameIssued(0),
+    _lastFrameElided(0)
+{
+    _matrix.known = false;
+    _matrix.pushed = false;
+}
+
+template <typename T>
+bool StateCache::update(bool &known, T &current, const T value)
+{
+    if (known && (current == value)) {
+        _elided++;
+        return false;
+    }
+    known = true;
+    current = value;
+    _issued++;
+    return true;
+}
+
+template <typename K, typename T>
+bool StateCache::update(std::unordered_map<K, T> &state, const K key,
+                        const T value)
+{
+    auto it = state.find(key);
+    if (it == state.end()) {
+        state[key] = value;
+    } else if (it->second == value) {
+        _elided++;
+        return false;
+    } else {
+        it->second = value;
+    }
+    _issued++;
+    return true;
+}
+
+bool StateCache::updateMatrix(const double *coeff)
+{
+    if (_matrix.known
+        && (memcmp(_matrix.coeff, coeff, sizeof(_matrix.coeff)) == 0))
+    {
+        _elided++;
+        return false;
+    }
+    _matrix.known = true;
+    memcpy(_matrix.coeff, coeff, sizeof(_matrix.coeff));
+    _issued++;
+    return true;
+}
+
+template <typename K>
+void StateCache::forgetBindings(std::unordered_map<K, GLuint> &state,
+                                const GLsizei n, const GLuint *ids)
+{
+    // deleting a bound object reverts the binding to zero
+    for (auto it = state.begin(); it != state.end(); it++) {
+        for (GLsizei i = 0; i < n; i++) {
+            if (it->second == ids[i]) {
+                it->second = 0;
+                break;
+            }
+        }
+    }
+}
+
+void StateCache::bindBuffer(const GLenum target, const GLuint buffer)
+{
+    if (update(_buffers, target, buffer)) {
+        glBindBuffer(target, buffer);
+    }
+}
+
+void StateCache::deleteBuffers(const GLsizei n, const GLuint *buffers)
+{
+    glDeleteBuffers(n, buffers);
+    forgetBindings(_buffers, n, buffers);
+}
+
+void StateCache::activeTexture(const GLenum unit)
+{
+    if (_activeTexture == unit) {
+        _elided++;
+        return;
+    }
+    _activeTexture = unit;
+    _issued++;
+    glActiveTexture(unit);
+}
+
+void StateCache::bindTexture(const GLenum target, const GLuint texture)
+{
+    const uint64_t key = ((uint64_t)_activeTexture << 32) | target;
+    if (update(_textures, key, texture)) {
+        glBindTexture(target, texture);
+    }
+}
+
+void StateCache::deleteTextures(const GLsizei n, const GLuint *textures)
+{
+    glDeleteTextures(n, textures);
+    forgetBindings(_textures, n, textures);
+}
+
+void StateCache::bindVertexArray(const GLuint array)
+{
+    if (update(_vertexArrayKnown, _vertexArray, array)) {
+        glBindVertexArray(array);
+        _buffers.erase(GL_ELEMENT_ARRAY_BUFFER);
+    }
+}
+
+void StateCache::deleteVertexArrays(const GLsizei n, const GLuint *arrays)
+{
+    glDeleteVertexArrays(n, arrays);
+    if (!_vertexArrayKnown) {
+        return;
+    }
+    for (GLsizei i = 0; i < n; i++) {
+        if (arrays[i] == _vertexArray) {
+            _vertexArray = 0;
+            _buffers.erase(GL_ELEMENT_ARRAY_BUFFER);
+            break;
+        }
+    }
+}
+
+void StateCache::useProgram(const GLuint program)
+{
+    if (update(_programKnown, _program, program)) {
+        glUseProgram(program);
+    }
+}
+
+void StateCache::enable(const GLenum cap)
+{
+    setCapability(cap, true);
+}
+
+void StateCache::disable(const GLenum cap)
+{
+    setCapability(cap, false);
+}
+
+void StateCache::setCapability(const GLenum cap, const bool enabled)
+{
+    if (!update(_capabilities, cap, enabled)) {
+        return;
+    }
+    if (enabled) {
+        glEnable(cap);
+    } else {
+        glDisable(cap);
+    }
+}
+
+void StateCache::blendFunc(const GLenum src, const GLenum dst)
+{
+    if (_blendFuncKnown && (_blendSrc == src) && (_blendDst == dst)) {
+        _elided++;
+        return;
+    }
+    _blendFuncKnown = true;
+    _blendSrc = src;
+    _blendDst = dst;
+    _issued++;
+    glBlendFunc(src, dst);
+}
+
+void StateCache::depthFunc(const GLenum func)
+{
+    if (update(_depthFuncKnown, _depthFunc, func)) {
+        glDepthFunc(func);
+    }
+}
+
+void StateCache::depthMask(const bool mask)
+{
+    if (update(_depthMaskKnown, _depthMask, mask)) {
+        glDepthMask(mask ? GL_TRUE : GL_FALSE);
+    }
+}
+
+void StateCache::loadIdentity()
+{
+    static const double identity[16] = {
+        1, 0, 0, 0,
+        0, 1, 0, 0,
+        0, 0, 1, 0,
+        0, 0, 0, 1
+    };
+    if (updateMatrix(identity)) {
+        glLoadIdentity();
+    }
+}
+
+void StateCache::loadMatrix(const Matrix4f &matrix)
+{
+    double coeff[16];
+    for (int i = 0; i < 16; i++) {
+        coeff[i] = matrix.coeff[i];
+    }
+    if (updateMatrix(coeff)) {
+        glLoadMatrixf(matrix.coeff);
+    }
+}
+
+void StateCache::loadMatrix(const Matrix4 &matrix)
+{
+    double coeff[16];
+    for (int i = 0; i < 16; i++) {
+        coeff[i] = matrix.coeff[i];
+    }
+    if (updateMatrix(coeff)) {
+        glLoadMatrixd(coeff);
+    }
+}
+
+void StateCache::pushMatrix()
+{
+    if (_matrix.known) {
+        _matrixStack.push_back(_matrix);
+        _elided++;
+        return;
+    }
+    glPushMatrix();
+    _issued++;
+    MatrixState saved = _matrix;
+    saved.pushed = true;
+    _matrixStack.push_back(saved);
+}
+
+void StateCache::popMatrix()
+{
+    if (_matrixStack.empty()) {
+        throw Error("Matrix stack underflow");
+    }
+    const MatrixState saved = _matrixStack.back();
+    _matrixStack.pop_back();
+    if (saved.pushed) {
+        glPopMatrix();
+        _issued++;
+        _matrix.known = false;
+        return;
+    }
+    if (updateMatrix(saved.coeff)) {
+        glLoadMatrixd(saved.coeff);
+    }
+}
+
+void StateCache::invalidate()
+{
+    _buffers.clear();
+    _textures.clear();
+    _capabilities.clear();
+    // texture bindings are tracked per unit, so the unit must be known
+    _activeTexture = GL_TEXTURE0;
+    glActiveTexture(GL_TEXTURE0);
+    _vertexArrayKnown = false;
+    _programKnown = false;
+    _blendFuncKnown = false;
+    _depthFuncKnown = false;
+    _depthMaskKnown = false;
+    _matrix.known = false;
+}
+
+void StateCache::endFrame()
+{
+    _lastFrameIssued = _issued;
+    _lastFrameElided = _elided;
+    _issued = 0;
+    _elided = 0;
+}
+
+StateCache *stateCache = new StateCache();
+StateCacheHandle stateCacheHandle(stateCache);
+
+/* PyEngine::GL::GroupCommandList */
+
+GroupCommandList::GroupCommandList():
+    _commands()
+{
+
+}
+
+GroupCommand &GroupCommandList::append(const GroupCommandKind kind)
+{
+    _commands.push_back(GroupCommand());
+    GroupCommand &command = _commands.back();
+    command.kind = kind;
+    return command;
+}
+
+void GroupCommandList::clear()
+{
+    _commands.clear();
+}
+
+GroupCommandKind GroupCommandList::getKind(const unsigned int index) const
+{
+    return _commands.at(index).kind;
+}
+
+void GroupCommandList::draw(StaticIndexBuffer *indexBuffer)
+{
+    append(CommandDraw).indexBuffer = indexBuffer;
+}
+
+void GroupCommandList::bind(Struct *glObject)
+{
+    append(CommandBind).glObject = glObject;
+}
+
+void GroupCommandList::unbind(Struct *glObject)
+{
+    append(CommandUnbind).glObject = glObject;
+}
+
+void GroupCommandList::pushMatrix(const Matrix4f *matrix)
+{
+    append(CommandPushMatrix).matrix = matrix;
+}
+
+void GroupCommandList::popMatrix()
+{
+    append(CommandPopMatrix).matrix = 0;
+}
+
+void GroupCommandList::setUp(ParentGroup *parent)
+{
+    append(CommandSetUp).parent = parent;
+}
+
+void GroupCommandList::tearDown(ParentGroup *parent)
+{
+    append(CommandTearDown).parent = parent;
+}
+
+void GroupCommandList::execute(Group *group)
+{
+    append(CommandExecute).group = group;
+}
+
+void GroupCommandList::replay() const
+{
+    for (auto it = _commands.cbegin();
+        it != _commands.cend();
+        it++)
+    {
+        const GroupCommand &command = *it;
+        switch (command.kind) {
+        case CommandDraw:
+        {
+            // most parents have no geometry of their own
+            if (command.indexBuffer->getCount() > 0) {
+                command.indexBuffer->draw(GL_TRIANGLES);
+            }
+            break;
+        }
+        case CommandBind:
+        {
+            command.glObject->bind();
+            break;
+        }
+        case CommandUnbind:
+        {
+            command.glObject->unbind();
+            break;
+        }
+        case CommandPushMatrix:
+        {
+            stateCache->pushMatrix();
+            stateCache->loadMatrix(*command.matrix);
+            break;
+        }
+        case CommandPopMatrix:
+        {
+            stateCache->popMatrix();
+            break;
+        }
+        case CommandSetUp:
+        {
+            command.parent->setUp();
+            break;
+        }
+        case CommandTearDown:
+        {
+            command.parent->tearDown();
+            break;
+        }
+        case CommandExecute:
+        {
+            command.group->execute();
+            break;
+        }
+        }
+    }
+}
+
 /* PyEngine::GL::Group */
 
 Group::Group(int order):
@@ -99,6 +523,11 @@ bool Group::operator >= (const Group &other) const
     return compare(other) >= 0;
 }
 
+void Group::compile(GroupCommandList &commands)
+{
+    commands.draw(_indexBuffer);
+}
+
 void Group::execute()
 {
     drawGeometry();
@@ -106,11 +535,27 @@ void Group::execute()
 
 /* PyEngine::GL::ParentGroup */
 
+unsigned int ParentGroup::_treeRevision = 0;
+
 ParentGroup::ParentGroup(int order):
     Group::Group(order),
-    _children()
+    _children(),
+    _commands(),
+    _compiled(false),
+    _compiledRevision(0),
+    _compileCount(0)
+{
+
+}
+
+void ParentGroup::compileSetUp(GroupCommandList &commands)
 {
+    commands.setUp(this);
+}
 
+void ParentGroup::compileTearDown(GroupCommandList &commands)
+{
+    commands.tearDown(this);
 }
 
 void ParentGroup::executeChildren()
@@ -127,6 +572,7 @@ void ParentGroup::executeChildren()
 void ParentGroup::add(GroupHandle handle)
 {
     _children.push_back(handle);
+    _treeRevision++;
 }
 
 void ParentGroup::remove(GroupHandle handle)
@@ -140,17 +586,40 @@ void ParentGroup::remove(GroupHandle handle)
         if (cmp.get() == group)
         {
             _children.erase(it);
+            _treeRevision++;
             return;
         }
     }
 }
 
+void ParentGroup::recompile()
+{
+    _commands.clear();
+    compile(_commands);
+    _compiled = true;
+    _compiledRevision = _treeRevision;
+    _compileCount++;
+}
+
+void ParentGroup::compile(GroupCommandList &commands)
+{
+    compileSetUp(commands);
+    this->Group::compile(commands);
+    for (auto it = _children.cbegin();
+        it != _children.cend();
+        it++)
+    {
+        (*it)->compile(commands);
+    }
+    compileTearDown(commands);
+}
+
 void ParentGroup::execute()
 {
-    setUp();
-    this->Group::execute();
-    executeChildren();
-    tearDown();
+    if (!_compiled || (_compiledRevision != _treeRevision)) {
+        recompile();
+    }
+    _commands.replay();
 }
 
 void ParentGroup::setUp()
@@ -173,6 +642,16 @@ StateGroup::StateGroup(StructHandle glObject, int order):
     
 }
 
+void StateGroup::compileSetUp(GroupCommandList &commands)
+{
+    commands.bind(_glObject);
+}
+
+void StateGroup::compileTearDown(GroupCommandList &commands)
+{
+    commands.unbind(_glObject);
+}
+
 void StateGroup::setUp()
 {
     _glObject->bind();
@@ -192,14 +671,25 @@ TransformGroup::TransformGroup(const Matrix4f *matrix, int order):
     
 }
 
+void TransformGroup::compileSetUp(GroupCommandList &commands)
+{
+    commands.pushMatrix(_matrix);
+}
+
+void TransformGroup::compileTearDown(GroupCommandList &commands)
+{
+    commands.popMatrix();
+}
+
 void TransformGroup::setUp()
 {
-    glLoadMatrixf(_matrix->coeff);
+    stateCache->pushMatrix();
+    stateCache->loadMatrix(*_matrix);
 }
 
 void TransformGroup::tearDown()
 {
-    glLoadIdentity();
+    stateCache->popMatrix();
 }
 
 }
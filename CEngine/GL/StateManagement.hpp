@@ -26,6 +26,10 @@ authors named in the AUTHORS file.
 #ifndef _PYE_GL_STATE_MANAGEMENT_H
 #define _PYE_GL_STATE_MANAGEMENT_H
 
+#include <cstdint>
+#include <unordered_map>
+#include <vector>
+
 #include <boost/shared_ptr.hpp>
 
 #include "CEngine/Math/Matrices.hpp"
@@ -35,10 +39,178 @@ authors named in the AUTHORS file.
 namespace PyEngine {
 namespace GL {
 
+/**
+ * Shadow copy of the OpenGL state changed by the engine: bound buffers,
+ * textures, vertex array and program, blend and depth state and the
+ * modelview matrix stack. Calls which would not change the current
+ * state are dropped before they reach the driver.
+ *
+ * This only works as long as the state is changed through the cache.
+ * Code which changes it behind the back of the cache has to call
+ * invalidate() afterwards; the next call for each piece of state is then
+ * always issued.
+ *
+ * The matrix functions assume GL_MODELVIEW to be the current matrix
+ * mode.
+ */
+class StateCache {
+    public:
+        StateCache();
+    private:
+        struct MatrixState {
+            bool known;
+            /* set if the entry has been pushed on the GL matrix stack,
+             * as the matrix was not known at that time */
+            bool pushed;
+            double coeff[16];
+        };
+    private:
+        /* absent entries are not known */
+        std::unordered_map<GLenum, GLuint> _buffers;
+        std::unordered_map<uint64_t, GLuint> _textures;
+        std::unordered_map<GLenum, bool> _capabilities;
+        /* always known, so that texture bindings can be keyed by it */
+        GLenum _activeTexture;
+        bool _vertexArrayKnown;
+        GLuint _vertexArray;
+        bool _programKnown;
+        GLuint _program;
+        bool _blendFuncKnown;
+        GLenum _blendSrc, _blendDst;
+        bool _depthFuncKnown;
+        GLenum _depthFunc;
+        bool _depthMaskKnown;
+        bool _depthMask;
+        MatrixState _matrix;
+        std::vector<MatrixState> _matrixStack;
+
+        unsigned int _issued, _elided;
+        unsigned int _lastFrameIssued, _lastFrameElided;
+    protected:
+        template <typename T>
+        bool update(bool &known, T &current, const T value);
+        template <typename K, typename T>
+        bool update(std::unordered_map<K, T> &state, const K key,
+                    const T value);
+        bool updateMatrix(const double *coeff);
+        template <typename K>
+        void forgetBindings(std::unordered_map<K, GLuint> &state,
+                            const GLsizei n, const GLuint *ids);
+    public:
+        void bindBuffer(const GLenum target, const GLuint buffer);
+        void deleteBuffers(const GLsizei n, const GLuint *buffers);
+
+        void activeTexture(const GLenum unit);
+        void bindTexture(const GLenum target, const GLuint texture);
+        void deleteTextures(const GLsizei n, const GLuint *textures);
+
+        /**
+         * Bind a vertex array. As the element array buffer binding is
+         * part of the vertex array, it is not known afterwards.
+         */
+        void bindVertexArray(const GLuint array);
+        void deleteVertexArrays(const GLsizei n, const GLuint *arrays);
+
+        void useProgram(const GLuint program);
+
+        void enable(const GLenum cap);
+        void disable(const GLenum cap);
+        void setCapability(const GLenum cap, const bool enabled);
+        void blendFunc(const GLenum src, const GLenum dst);
+        void depthFunc(const GLenum func);
+        void depthMask(const bool mask);
+
+        void loadIdentity();
+        void loadMatrix(const Matrix4f &matrix);
+        void loadMatrix(const Matrix4 &matrix);
+        /**
+         * Save the current matrix. If it is known, it is only saved in
+         * the cache and restored with a load by popMatrix if needed.
+         */
+        void pushMatrix();
+        void popMatrix();
+
+        /**
+         * Forget all known state, e.g. after foreign code issued GL
+         * calls. Saved matrices are kept. The active texture unit is
+         * reset to GL_TEXTURE0, which requires a current context.
+         */
+        void invalidate();
+
+        /**
+         * Number of calls passed to GL and dropped in the current frame
+         * and in the last frame completed with endFrame.
+         */
+        unsigned int getIssued() const { return _issued; };
+        unsigned int getElided() const { return _elided; };
+        unsigned int getLastFrameIssued() const { return _lastFrameIssued; };
+        unsigned int getLastFrameElided() const { return _lastFrameElided; };
+        void endFrame();
+};
+
+typedef boost::shared_ptr<StateCache> StateCacheHandle;
+
+extern StateCache *stateCache;
+extern StateCacheHandle stateCacheHandle;
+
 class Group;
+class ParentGroup;
 
 typedef boost::shared_ptr<Group> GroupHandle;
 
+enum GroupCommandKind {
+    CommandDraw = 0,
+    CommandBind = 1,
+    CommandUnbind = 2,
+    CommandPushMatrix = 3,
+    CommandPopMatrix = 4,
+    CommandSetUp = 5,
+    CommandTearDown = 6,
+    CommandExecute = 7
+};
+
+struct GroupCommand {
+    GroupCommandKind kind;
+    union {
+        StaticIndexBuffer *indexBuffer;
+        Struct *glObject;
+        const Matrix4f *matrix;
+        ParentGroup *parent;
+        Group *group;
+    };
+};
+
+/**
+ * A group tree flattened into a list of state changes and draws, which
+ * can be replayed without walking the tree.
+ *
+ * The commands refer to the groups and states by plain pointers, so the
+ * list must be compiled again whenever the tree changes.
+ */
+class GroupCommandList {
+    public:
+        GroupCommandList();
+    private:
+        std::vector<GroupCommand> _commands;
+    protected:
+        GroupCommand &append(const GroupCommandKind kind);
+    public:
+        void clear();
+        unsigned int getCount() const { return _commands.size(); };
+        GroupCommandKind getKind(const unsigned int index) const;
+    public:
+        void draw(StaticIndexBuffer *indexBuffer);
+        void bind(Struct *glObject);
+        void unbind(Struct *glObject);
+        void pushMatrix(const Matrix4f *matrix);
+        void popMatrix();
+        void setUp(ParentGroup *parent);
+        void tearDown(ParentGroup *parent);
+        void execute(Group *group);
+    public:
+        void replay() const;
+};
+
 class Group {
     public:
         Group(int order = 0);
@@ -51,6 +223,7 @@ class Group {
     public:
         int compare(const Group &other) const;
         StaticIndexBufferHandle getIndexBuffer() { return _ibHandle; };
+        int getOrder() const { return _order; };
     public:
         bool operator == (const Group &other) const;
         bool operator != (const Group &other) const;
@@ -59,20 +232,48 @@ class Group {
         bool operator >  (const Group &other) const;
         bool operator >= (const Group &other) const;
     public:
+        /**
+         * Append the commands equivalent to execute to commands.
+         * Subclasses which override execute have to override this as
+         * well, e.g. to append an execute command for themselves.
+         */
+        virtual void compile(GroupCommandList &commands);
         virtual void execute();
 };
 
+/**
+ * A group with children. execute flattens the tree below the group into
+ * a GroupCommandList, which is replayed until a group in any tree is
+ * added or removed.
+ */
 class ParentGroup: public Group {
     public:
         ParentGroup(int order = 0);
+    private:
+        /* bumped by add and remove on any group */
+        static unsigned int _treeRevision;
     protected:
         std::vector<GroupHandle> _children;
+        GroupCommandList _commands;
+        bool _compiled;
+        unsigned int _compiledRevision;
+        unsigned int _compileCount;
     protected:
         void executeChildren();
+        /**
+         * Append the commands equivalent to setUp and tearDown. The
+         * default calls the virtual methods when replayed.
+         */
+        virtual void compileSetUp(GroupCommandList &commands);
+        virtual void compileTearDown(GroupCommandList &commands);
     public:
         void add(GroupHandle handle);
         void remove(GroupHandle handle);
+        void recompile();
+        unsigned int getCommandCount() const { return _commands.getCount(); };
+        unsigned int getCompileCount() const { return _compileCount; };
     public:
+        virtual void compile(GroupCommandList &commands);
         virtual void execute();
         virtual void setUp();
         virtual void tearDown();
@@ -84,6 +285,9 @@ class StateGroup: public ParentGroup {
     private:
         StructHandle _glObjectHandle;
         Struct *_glObject;
+    protected:
+        virtual void compileSetUp(GroupCommandList &commands);
+        virtual void compileTearDown(GroupCommandList &commands);
     public:
         virtual void setUp();
         virtual void tearDown();
@@ -96,6 +300,9 @@ class TransformGroup: public ParentGroup {
         TransformGroup(const Matrix4f *matrix, int order = 0);
     private:
         const Matrix4f *_matrix;
+    protected:
+        virtual void compileSetUp(GroupCommandList &commands);
+        virtual void compileTearDown(GroupCommandList &commands);
     public:
         virtual void setUp();
         virtual void tearDown();
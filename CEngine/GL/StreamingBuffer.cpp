@@ -0,0 +1,236 @@
+/**********************************************************************
+File name: StreamingBuffer.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include "StreamingBuffer.hpp"
+
+#include <cassert>
+
+#include "StateManagement.hpp"
+
+namespace PyEngine {
+namespace GL {
+
+/* PyEngine::GL::StreamingBuffer */
+
+StreamingBuffer::StreamingBuffer(
+        const GLenum aKind,
+        const GLsizeiptr aRegionSize,
+        const unsigned int aRegionCount,
+        const StreamingMode aMode):
+    Class(),
+    _kind(aKind),
+    _regionSize(aRegionSize),
+    _regionCount(aRegionCount),
+    _mode(aMode == StreamAuto ? bestMode() : aMode),
+    _fences(aRegionCount, (GLsync)0),
+    _staging(),
+    _mapped(0),
+    _writePtr(0),
+    _region(aRegionCount - 1),
+    _used(0),
+    _inFrame(false),
+    _fencePending(false),
+    _stalls(0)
+{
+    assert(aRegionCount > 0);
+    assert(aRegionSize > 0);
+    if (_mode == StreamSubData) {
+        _staging.resize(_regionSize);
+    }
+}
+
+StreamingBuffer::~StreamingBuffer()
+{
+    for (auto it = _fences.begin(); it != _fences.end(); it++) {
+        if (*it) {
+            glDeleteSync(*it);
+        }
+    }
+    if (_glid != 0) {
+        if (_mapped) {
+            stateCache->bindBuffer(_kind, _glid);
+            glUnmapBuffer(_kind);
+            stateCache->bindBuffer(_kind, 0);
+        }
+        stateCache->deleteBuffers(1, &_glid);
+    }
+}
+
+StreamingMode StreamingBuffer::bestMode()
+{
+    if (GLEW_ARB_buffer_storage && GLEW_ARB_sync) {
+        return StreamPersistent;
+    }
+    if (GLEW_ARB_map_buffer_range && GLEW_ARB_sync) {
+        return StreamUnsynchronized;
+    }
+    return StreamSubData;
+}
+
+void StreamingBuffer::initBuffer()
+{
+    const GLsizeiptr size = _regionSize * _regionCount;
+    glGenBuffers(1, &_glid);
+    raiseLastGLError();
+    stateCache->bindBuffer(_kind, _glid);
+    if (_mode == StreamPersistent) {
+        const GLbitfield flags = GL_MAP_WRITE_BIT
+            | GL_MAP_PERSISTENT_BIT
+            | GL_MAP_COHERENT_BIT;
+        glBufferStorage(_kind, size, 0, flags);
+        raiseLastGLError();
+        _mapped = (unsigned char*)glMapBufferRange(_kind, 0, size, flags);
+        raiseLastGLError();
+    } else {
+        glBufferData(_kind, size, 0, GL_STREAM_DRAW);
+        raiseLastGLError();
+    }
+    stateCache->bindBuffer(_kind, 0);
+}
+
+void StreamingBuffer::waitForRegion()
+{
+    GLsync &fence = _fences[_region];
+    if (!fence) {
+        return;
+    }
+    GLenum result = glClientWaitSync(fence, 0, 0);
+    if (result == GL_TIMEOUT_EXPIRED) {
+        _stalls++;
+        do {
+            result = glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT,
+                                      1000000);
+        } while (result == GL_TIMEOUT_EXPIRED);
+    }
+    glDeleteSync(fence);
+    fence = 0;
+}
+
+void StreamingBuffer::beginFrame()
+{
+    assert(!_inFrame);
+    if (_glid == 0) {
+        initBuffer();
+    }
+    // the draws from the previous region have been issued by now
+    fence();
+    _region = (_region + 1) % _regionCount;
+    _used = 0;
+    _inFrame = true;
+
+    switch (_mode) {
+    case StreamPersistent:
+        waitForRegion();
+        _writePtr = _mapped + getRegionOffset();
+        break;
+    case StreamUnsynchronized:
+        waitForRegion();
+        stateCache->bindBuffer(_kind, _glid);
+        _writePtr = (unsigned char*)glMapBufferRange(
+            _kind, getRegionOffset(), _regionSize,
+            GL_MAP_WRITE_BIT
+            | GL_MAP_UNSYNCHRONIZED_BIT
+            | GL_MAP_INVALIDATE_RANGE_BIT);
+        raiseLastGLError();
+        stateCache->bindBuffer(_kind, 0);
+        break;
+    default:
+        // without fences, glBufferSubData on a region the GPU still
+        // reads from lets the driver decide between a copy and a stall
+        if (GLEW_ARB_sync) {
+            waitForRegion();
+        }
+        _writePtr = &_staging[0];
+        break;
+    }
+}
+
+void StreamingBuffer::endFrame()
+{
+    assert(_inFrame);
+    _inFrame = false;
+
+    switch (_mode) {
+    case StreamPersistent:
+        break;
+    case StreamUnsynchronized:
+        stateCache->bindBuffer(_kind, _glid);
+        glUnmapBuffer(_kind);
+        stateCache->bindBuffer(_kind, 0);
+        break;
+    default:
+        if (_used > 0) {
+            stateCache->bindBuffer(_kind, _glid);
+            glBufferSubData(_kind, getRegionOffset(), _used, &_staging[0]);
+            raiseLastGLError();
+            stateCache->bindBuffer(_kind, 0);
+        }
+        break;
+    }
+    _writePtr = 0;
+    _fencePending = true;
+}
+
+void StreamingBuffer::fence()
+{
+    assert(!_inFrame);
+    if (!_fencePending) {
+        return;
+    }
+    _fencePending = false;
+    if (_mode == StreamSubData && !GLEW_ARB_sync) {
+        return;
+    }
+    GLsync &fence = _fences[_region];
+    if (fence) {
+        glDeleteSync(fence);
+    }
+    fence = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0);
+}
+
+void *StreamingBuffer::reserve(const GLsizeiptr size, GLintptr *offset)
+{
+    assert(_inFrame);
+    if (_used + size > _regionSize) {
+        return 0;
+    }
+    void *result = _writePtr + _used;
+    *offset = getRegionOffset() + _used;
+    _used += size;
+    return result;
+}
+
+void StreamingBuffer::bind()
+{
+    stateCache->bindBuffer(_kind, _glid);
+}
+
+void StreamingBuffer::unbind()
+{
+    stateCache->bindBuffer(_kind, 0);
+}
+
+}
+}
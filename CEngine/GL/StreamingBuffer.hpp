@@ -0,0 +1,152 @@
+/**********************************************************************
+File name: StreamingBuffer.hpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#ifndef _PYE_GL_STREAMING_BUFFER_H
+#define _PYE_GL_STREAMING_BUFFER_H
+
+#include <memory>
+#include <vector>
+
+#include <GL/glew.h>
+
+#include "Base.hpp"
+
+namespace PyEngine {
+namespace GL {
+
+/**
+ * How a StreamingBuffer gets data to the GPU.
+ *
+ * StreamPersistent maps the whole buffer once (ARB_buffer_storage) and
+ * writes go straight into GPU visible memory. StreamUnsynchronized maps
+ * one region per frame with GL_MAP_UNSYNCHRONIZED_BIT
+ * (ARB_map_buffer_range). StreamSubData writes into a CPU side copy of
+ * the region and transfers it with glBufferSubData; this works on every
+ * implementation. StreamAuto picks the first mode available in this
+ * order.
+ */
+enum StreamingMode {
+    StreamAuto          = 0,
+    StreamPersistent    = 1,
+    StreamUnsynchronized= 2,
+    StreamSubData       = 3
+};
+
+/**
+ * A buffer object which is split into a ring of regions, one per frame
+ * in flight. Each frame writes into the next region, after waiting for
+ * the fence the GPU signalled when it finished with that region, so
+ * writes never stall on data the GPU is still reading.
+ */
+class StreamingBuffer: public Class {
+public:
+    StreamingBuffer(
+        const GLenum aKind,
+        const GLsizeiptr aRegionSize,
+        const unsigned int aRegionCount = 3,
+        const StreamingMode aMode = StreamAuto);
+    virtual ~StreamingBuffer();
+
+protected:
+    const GLenum _kind;
+    const GLsizeiptr _regionSize;
+    const unsigned int _regionCount;
+    StreamingMode _mode;
+
+    std::vector<GLsync> _fences;
+    std::vector<unsigned char> _staging;
+    unsigned char *_mapped;
+    unsigned char *_writePtr;
+    unsigned int _region;
+    GLsizeiptr _used;
+    bool _inFrame;
+    /* set from endFrame until the region has been fenced */
+    bool _fencePending;
+    unsigned int _stalls;
+
+protected:
+    void initBuffer();
+    void waitForRegion();
+
+public:
+    /**
+     * Start writing into the next region. Fences the previous region if
+     * that has not happened yet and blocks if the GPU has not finished
+     * reading from the next region yet.
+     */
+    void beginFrame();
+
+    /**
+     * Make the data written since beginFrame available to the GPU. Must
+     * be called before drawing from the region.
+     */
+    void endFrame();
+
+    /**
+     * Fence the region ended last, so that it is reused only after the
+     * GPU finished the commands issued so far. Call this after the last
+     * draw reading from the region; otherwise it happens in the next
+     * beginFrame.
+     */
+    void fence();
+
+    /**
+     * Return a pointer to size bytes of the current region and store
+     * their offset in the buffer object in offset. Return 0 if the
+     * region is full.
+     */
+    void *reserve(const GLsizeiptr size, GLintptr *offset);
+
+public:
+    virtual void bind();
+    virtual void unbind();
+
+public:
+    StreamingMode getMode() const { return _mode; };
+    GLsizeiptr getRegionSize() const { return _regionSize; };
+    unsigned int getRegionCount() const { return _regionCount; };
+    GLintptr getRegionOffset() const { return _region * _regionSize; };
+    GLsizeiptr getUsed() const { return _used; };
+    bool isInFrame() const { return _inFrame; };
+    bool isFencePending() const { return _fencePending; };
+
+    /**
+     * Number of times beginFrame had to wait for the GPU.
+     */
+    unsigned int getStalls() const { return _stalls; };
+
+    /**
+     * The mode StreamAuto resolves to on the current context.
+     */
+    static StreamingMode bestMode();
+
+};
+
+typedef std::shared_ptr<StreamingBuffer> StreamingBufferHandle;
+
+}
+}
+
+#endif
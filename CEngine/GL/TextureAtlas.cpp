@@ -29,6 +29,8 @@ authors named in the AUTHORS file.
 
 #include "CEngine/Misc/Exception.hpp"
 
+#include "StateManagement.hpp"
+
 namespace PyEngine {
 namespace GL {
 
@@ -58,7 +60,7 @@ TextureAtlas::TextureAtlas(
 TextureAtlas::~TextureAtlas()
 {
     if (owns_texture) {
-        glDeleteTextures(1, &_glid);
+        stateCache->deleteTextures(1, &_glid);
     }
 }
 
@@ -107,7 +109,7 @@ void TextureAtlas::set_segment(
 
 void TextureAtlas::bind()
 {
-    glBindTexture(GL_TEXTURE_2D, _glid);
+    stateCache->bindTexture(GL_TEXTURE_2D, _glid);
 }
 
 void TextureAtlas::gc()
@@ -147,7 +149,7 @@ void TextureAtlas::gc()
 
 void TextureAtlas::unbind()
 {
-    glBindTexture(GL_TEXTURE_2D, 0);
+    stateCache->bindTexture(GL_TEXTURE_2D, 0);
 }
 
 TextureAtlas::AllocationHandle TextureAtlas::upload(
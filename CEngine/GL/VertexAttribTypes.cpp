@@ -0,0 +1,255 @@
+/**********************************************************************
+File name: VertexAttribTypes.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include "VertexAttribTypes.hpp"
+
+#include <algorithm>
+#include <cassert>
+#include <cmath>
+#include <cstring>
+
+namespace PyEngine {
+namespace GL {
+
+static inline GLfloat clamp(const GLfloat value,
+    const GLfloat min, const GLfloat max)
+{
+    return std::min(std::max(value, min), max);
+}
+
+static inline uint32_t packSNorm(const GLfloat value, const unsigned int bits)
+{
+    const GLfloat scale = (1 << (bits - 1)) - 1;
+    const int32_t result = lrintf(clamp(value, -1, 1) * scale);
+    return (uint32_t)result & ((1u << bits) - 1);
+}
+
+static inline GLfloat unpackSNorm(const uint32_t value, const unsigned int bits)
+{
+    // sign extend
+    const int32_t shift = 32 - bits;
+    const int32_t signedValue = (int32_t)(value << shift) >> shift;
+    const GLfloat scale = (1 << (bits - 1)) - 1;
+    return std::max(signedValue / scale, (GLfloat)-1);
+}
+
+size_t attribSize(const VertexAttribType type, const unsigned int n)
+{
+    if (n == 0) {
+        return 0;
+    }
+    size_t size = 0;
+    switch (type) {
+    case AttribFloat32:
+        size = n * sizeof(GLfloat);
+        break;
+    case AttribFloat16:
+        size = n * sizeof(uint16_t);
+        break;
+    case AttribUNorm8:
+        size = n;
+        break;
+    case AttribSNorm10_10_10_2:
+        assert(n <= 4);
+        size = sizeof(uint32_t);
+        break;
+    }
+    return (size + 3) & ~(size_t)3;
+}
+
+GLenum attribGLType(const VertexAttribType type)
+{
+    switch (type) {
+    case AttribFloat16:
+        return GL_HALF_FLOAT;
+    case AttribUNorm8:
+        return GL_UNSIGNED_BYTE;
+    case AttribSNorm10_10_10_2:
+        return GL_INT_2_10_10_10_REV;
+    default:
+        return GL_FLOAT;
+    }
+}
+
+GLboolean attribNormalized(const VertexAttribType type)
+{
+    return ((type == AttribUNorm8) || (type == AttribSNorm10_10_10_2)
+            ? GL_TRUE : GL_FALSE);
+}
+
+void packAttrib(const VertexAttribType type, const GLfloat *src,
+                const unsigned int n, void *dest)
+{
+    switch (type) {
+    case AttribFloat32:
+    {
+        memcpy(dest, src, n * sizeof(GLfloat));
+        break;
+    }
+    case AttribFloat16:
+    {
+        uint16_t *ptr = (uint16_t*)dest;
+        for (unsigned int i = 0; i < n; i++) {
+            ptr[i] = floatToHalf(src[i]);
+        }
+        break;
+    }
+    case AttribUNorm8:
+    {
+        uint8_t *ptr = (uint8_t*)dest;
+        for (unsigned int i = 0; i < n; i++) {
+            ptr[i] = lrintf(clamp(src[i], 0, 1) * 255);
+        }
+        break;
+    }
+    case AttribSNorm10_10_10_2:
+    {
+        uint32_t word = 0;
+        for (unsigned int i = 0; i < n && i < 3; i++) {
+            word |= packSNorm(src[i], 10) << (10 * i);
+        }
+        if (n > 3) {
+            word |= packSNorm(src[3], 2) << 30;
+        }
+        memcpy(dest, &word, sizeof(uint32_t));
+        break;
+    }
+    }
+}
+
+void unpackAttrib(const VertexAttribType type, const void *src,
+                  const unsigned int n, GLfloat *dest)
+{
+    switch (type) {
+    case AttribFloat32:
+    {
+        memcpy(dest, src, n * sizeof(GLfloat));
+        break;
+    }
+    case AttribFloat16:
+    {
+        const uint16_t *ptr = (const uint16_t*)src;
+        for (unsigned int i = 0; i < n; i++) {
+            dest[i] = halfToFloat(ptr[i]);
+        }
+        break;
+    }
+    case AttribUNorm8:
+    {
+        const uint8_t *ptr = (const uint8_t*)src;
+        for (unsigned int i = 0; i < n; i++) {
+            dest[i] = ptr[i] / (GLfloat)255;
+        }
+        break;
+    }
+    case AttribSNorm10_10_10_2:
+    {
+        uint32_t word;
+        memcpy(&word, src, sizeof(uint32_t));
+        for (unsigned int i = 0; i < n && i < 3; i++) {
+            dest[i] = unpackSNorm((word >> (10 * i)) & 0x3ff, 10);
+        }
+        if (n > 3) {
+            dest[3] = unpackSNorm(word >> 30, 2);
+        }
+        break;
+    }
+    }
+}
+
+uint16_t floatToHalf(const GLfloat value)
+{
+    uint32_t bits;
+    memcpy(&bits, &value, sizeof(uint32_t));
+
+    const uint16_t sign = (bits >> 16) & 0x8000;
+    const int32_t exponent = ((bits >> 23) & 0xff) - 127 + 15;
+    uint32_t mantissa = bits & 0x7fffff;
+
+    if (((bits >> 23) & 0xff) == 0xff) {
+        // inf stays inf, nan stays nan
+        return sign | 0x7c00 | (mantissa ? 0x200 : 0);
+    }
+    if (exponent >= 0x1f) {
+        return sign | 0x7c00;
+    }
+    if (exponent <= 0) {
+        if (exponent < -10) {
+            return sign;
+        }
+        // denormal; make the implicit one explicit and shift it in
+        mantissa |= 0x800000;
+        const uint32_t shift = 14 - exponent;
+        uint32_t result = mantissa >> shift;
+        // round half to even
+        const uint32_t rest = mantissa & ((1u << shift) - 1);
+        const uint32_t half = 1u << (shift - 1);
+        if ((rest > half) || ((rest == half) && (result & 1))) {
+            result++;
+        }
+        return sign | result;
+    }
+
+    uint32_t result = (exponent << 10) | (mantissa >> 13);
+    const uint32_t rest = mantissa & 0x1fff;
+    if ((rest > 0x1000) || ((rest == 0x1000) && (result & 1))) {
+        // may carry into the exponent, which is what we want
+        result++;
+    }
+    return sign | result;
+}
+
+GLfloat halfToFloat(const uint16_t value)
+{
+    const uint32_t sign = (uint32_t)(value & 0x8000) << 16;
+    const uint32_t exponent = (value >> 10) & 0x1f;
+    uint32_t mantissa = value & 0x3ff;
+    uint32_t bits;
+
+    if (exponent == 0) {
+        if (mantissa == 0) {
+            bits = sign;
+        } else {
+            // denormal, normalize it
+            int32_t e = -1;
+            do {
+                e++;
+                mantissa <<= 1;
+            } while ((mantissa & 0x400) == 0);
+            bits = sign | ((127 - 15 - e) << 23) | ((mantissa & 0x3ff) << 13);
+        }
+    } else if (exponent == 0x1f) {
+        bits = sign | 0x7f800000 | (mantissa << 13);
+    } else {
+        bits = sign | ((exponent - 15 + 127) << 23) | (mantissa << 13);
+    }
+
+    GLfloat result;
+    memcpy(&result, &bits, sizeof(GLfloat));
+    return result;
+}
+
+}
+}
@@ -0,0 +1,80 @@
+/**********************************************************************
+File name: VertexAttribTypes.hpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#ifndef _PYE_GL_VERTEX_ATTRIB_TYPES_H
+#define _PYE_GL_VERTEX_ATTRIB_TYPES_H
+
+#include <cstddef>
+#include <cstdint>
+
+#include <GL/glew.h>
+
+namespace PyEngine {
+namespace GL {
+
+/**
+ * Storage type of the components of a vertex attribute. Values are
+ * always passed around as floats and converted when they are written
+ * to or read from a buffer.
+ *
+ * AttribUNorm8 maps [0, 1] to unsigned bytes, AttribSNorm10_10_10_2
+ * packs up to four components in [-1, 1] into one
+ * GL_INT_2_10_10_10_REV word.
+ */
+enum VertexAttribType {
+    AttribFloat32           = 0,
+    AttribFloat16           = 1,
+    AttribUNorm8            = 2,
+    AttribSNorm10_10_10_2   = 3
+};
+
+/**
+ * Number of bytes an attribute with n components of type takes in a
+ * vertex, padded to a multiple of four to keep attributes aligned.
+ */
+size_t attribSize(const VertexAttribType type, const unsigned int n);
+
+GLenum attribGLType(const VertexAttribType type);
+GLboolean attribNormalized(const VertexAttribType type);
+
+/**
+ * Convert n components from src to type and store them at dest.
+ */
+void packAttrib(const VertexAttribType type, const GLfloat *src,
+                const unsigned int n, void *dest);
+
+/**
+ * Convert n components of type at src to floats.
+ */
+void unpackAttrib(const VertexAttribType type, const void *src,
+                  const unsigned int n, GLfloat *dest);
+
+uint16_t floatToHalf(const GLfloat value);
+GLfloat halfToFloat(const uint16_t value);
+
+}
+}
+
+#endif
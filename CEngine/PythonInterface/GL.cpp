@@ -25,10 +25,13 @@ authors named in the AUTHORS file.
 **********************************************************************/
 #include "GL.hpp"
 
+#include <cstdint>
+#include <cstring>
 #include <iostream>
 
 #include <GL/glew.h>
 #include <boost/python/slice.hpp>
+#include <boost/python/stl_iterator.hpp>
 
 #include "CEngine/GL/AbstractImage.hpp"
 #include "CairoHelpers.hpp"
@@ -139,10 +142,70 @@ PyObject *AttributeSlice_get(SliceT *slice)
 }
 
 template <class SliceT>
-void AttributeSlice_set(SliceT *slice, list bpList)
+void AttributeSlice_setBuffer(SliceT *slice, PyObject *obj)
 {
+    Py_buffer view;
+    if (PyObject_GetBuffer(obj, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) != 0)
+    {
+        throw error_already_set();
+    }
+    const char *format = (view.format ? view.format : "B");
+    const bool isFloat = (view.itemsize == sizeof(GLVertexFloat))
+        && (strchr("@=<>!", format[0]) ? format[1] == 'f' : format[0] == 'f');
+    if (!isFloat)
+    {
+        PyBuffer_Release(&view);
+        PyErr_SetString(PyExc_TypeError, "buffer must contain 32 bit floats");
+        throw error_already_set();
+    }
+    if (view.len != slice->getSize())
+    {
+        PyBuffer_Release(&view);
+        PyErr_Format(PyExc_ValueError, "need exactly %d bytes, got %zd",
+                     (int)slice->getSize(), view.len);
+        throw error_already_set();
+    }
+    slice->set((const GLVertexFloat*)view.buf);
+    PyBuffer_Release(&view);
+}
+
+template <class SliceT>
+dict AttributeSlice_arrayInterface(SliceT *slice)
+{
+    GLVertexFloat *first;
+    GLsizei vertexStride;
+    if (!slice->getLayout(&first, &vertexStride))
+    {
+        PyErr_SetString(PyExc_ValueError,
+            "attribute is not stored as evenly spaced 32 bit floats, "
+            "use get() instead");
+        throw error_already_set();
+    }
+    const uint16_t probe = 1;
+    const bool littleEndian = *(const unsigned char*)&probe == 1;
+
+    dict result;
+    result["version"] = 3;
+    result["typestr"] = (littleEndian ? "<f4" : ">f4");
+    result["shape"] = make_tuple(
+        slice->getLength(), slice->getAttributeLength());
+    result["strides"] = make_tuple(
+        (Py_ssize_t)(vertexStride * sizeof(GLVertexFloat)),
+        (Py_ssize_t)sizeof(GLVertexFloat));
+    result["data"] = make_tuple((size_t)first, false);
+    return result;
+}
+
+template <class SliceT>
+void AttributeSlice_set(SliceT *slice, object data)
+{
+    if (!PyList_Check(data.ptr()))
+    {
+        AttributeSlice_setBuffer(slice, data.ptr());
+        return;
+    }
     const GLsizei len = slice->getLength() * slice->getAttributeLength();
-    PyObject *pyList = bpList.ptr();
+    PyObject *pyList = data.ptr();
     if (PyList_Size(pyList) != len)
     {
         std::cerr << "need exactly " << len << " items, got " << PyList_Size(pyList) << "." << std::endl;
@@ -166,6 +229,57 @@ void AttributeSlice_set(SliceT *slice, list bpList)
     free(buffer);
 }
 
+VertexFormatHandle VertexFormat_create(
+    const unsigned int nPosition, const unsigned int nColour,
+    const unsigned int nTexCoord0, const unsigned int nTexCoord1,
+    const unsigned int nTexCoord2, const unsigned int nTexCoord3,
+    const bool normal, const unsigned int nVertexAttrib0,
+    const unsigned int nVertexAttrib1, const unsigned int nVertexAttrib2,
+    const unsigned int nVertexAttrib3, object pyTypes)
+{
+    VertexAttribType types[VERTEX_ATTRIB_SLOT_COUNT];
+    if (boost::python::len(pyTypes) != VERTEX_ATTRIB_SLOT_COUNT)
+    {
+        PyErr_Format(PyExc_ValueError, "need exactly %d attribute types",
+                     VERTEX_ATTRIB_SLOT_COUNT);
+        throw error_already_set();
+    }
+    for (unsigned int i = 0; i < VERTEX_ATTRIB_SLOT_COUNT; i++)
+    {
+        types[i] = extract<VertexAttribType>(pyTypes[i])();
+    }
+    return VertexFormatHandle(new VertexFormat(
+        nPosition, nColour, nTexCoord0, nTexCoord1, nTexCoord2,
+        nTexCoord3, normal, nVertexAttrib0, nVertexAttrib1,
+        nVertexAttrib2, nVertexAttrib3, types));
+}
+
+VertexIndexListHandle VertexIndexList_take(const VertexIndexList &self, list indices)
+{
+    const Py_ssize_t len = boost::python::len(indices);
+    VertexIndexListHandle result(new VertexIndexList());
+    result->reserve(len);
+    for (Py_ssize_t i = 0; i < len; i++)
+    {
+        const unsigned long index = extract<unsigned long>(indices[i])();
+        if (index >= self.size())
+        {
+            PyErr_SetString(PyExc_IndexError, "vertex index out of range");
+            throw error_already_set();
+        }
+        result->push_back(self[index]);
+    }
+    return result;
+}
+
+GLsizei StaticIndexBuffer_drawHandles(StaticIndexBuffer &self,
+    object entries, const GLenum mode)
+{
+    stl_input_iterator<IndexEntryHandle> begin(entries), end;
+    const IndexEntryHandleList handles(begin, end);
+    return self.drawHandles(handles, mode);
+}
+
 void __bp_glTexCairoSurfaceSubImage2D(GLenum target,
     GLint level,
     GLint xoffset, GLint yoffset,
@@ -206,9 +320,22 @@ BOOST_PYTHON_MODULE(_cuni_gl)
         .def("unbind", &GenericBuffer::unbind)
         .def("flush", &GenericBuffer::flush)
         .def("readBack", &GenericBuffer::readBack)
+        .def("verifyRange", &GenericBuffer::verifyRange)
+        .def("resetUploadCounters", &GenericBuffer::resetUploadCounters)
+        .add_property("BytesUploaded", &GenericBuffer::getBytesUploaded)
+        .add_property("UploadCalls", &GenericBuffer::getUploadCalls)
     ;
 
 
+    /* VertexAttribTypes.hpp */
+
+    enum_<VertexAttribType>("AttribType")
+        .value("Float32", AttribFloat32)
+        .value("Float16", AttribFloat16)
+        .value("UNorm8", AttribUNorm8)
+        .value("SNorm10_10_10_2", AttribSNorm10_10_10_2)
+    ;
+
     /* GeometryBuffer.hpp */
 
     class_<VertexFormat, VertexFormatHandle, boost::noncopyable>("VertexFormat",
@@ -216,9 +343,21 @@ BOOST_PYTHON_MODULE(_cuni_gl)
             const unsigned int, const unsigned int, const unsigned int,
             const bool, const unsigned int, const unsigned int,
             const unsigned int, const unsigned int>())
+        .def("__init__", make_constructor(&VertexFormat_create))
+        .def_readonly("VertexSize", &VertexFormat::vertexSize)
     ;
 
-    class_<VertexIndexList, VertexIndexListHandle, boost::noncopyable>("VertexIndexList", no_init);
+    class_<ExtentAllocator, boost::noncopyable>("ExtentAllocator", no_init)
+        .add_property("FreeCount", &ExtentAllocator::getFreeCount)
+        .add_property("ExtentCount", &ExtentAllocator::getExtentCount)
+        .add_property("LargestExtent", &ExtentAllocator::getLargestExtent)
+        .add_property("Fragmentation", &ExtentAllocator::getFragmentation)
+    ;
+
+    class_<VertexIndexList, VertexIndexListHandle, boost::noncopyable>("VertexIndexList", no_init)
+        .def("__len__", &VertexIndexList::size)
+        .def("take", &VertexIndexList_take)
+    ;
 
     class_<GeometryBuffer, bases<GenericBuffer>, boost::noncopyable>("GeometryBuffer",
             init<const VertexFormatHandle, GLenum>())
@@ -227,6 +366,19 @@ BOOST_PYTHON_MODULE(_cuni_gl)
         .def("draw", &GeometryBuffer::draw)
         .def("unbind", &GeometryBuffer::unbind)
         .def("gc", &GeometryBuffer::gc)
+        .def("invalidateRange", &GeometryBuffer::invalidateRange)
+        .add_property("FlushGapThreshold", &GeometryBuffer::getFlushGapThreshold, &GeometryBuffer::setFlushGapThreshold)
+        .add_property("MaxFlushRanges", &GeometryBuffer::getMaxFlushRanges, &GeometryBuffer::setMaxFlushRanges)
+        .add_property("FreeVertices", make_function(&GeometryBuffer::getFreeVertices, return_internal_reference<>()))
+        .def("bindWithIndices", &GeometryBuffer::bindWithIndices)
+        .add_property("UseVertexArrays", &GeometryBuffer::getUseVertexArrays, &GeometryBuffer::setUseVertexArrays)
+        .add_property("AttribCalls", &GeometryBuffer::getAttribCalls)
+        .add_property("AttribCallsSaved", &GeometryBuffer::getAttribCallsSaved)
+        .def("resetBindCounters", &GeometryBuffer::resetBindCounters)
+        .add_property("UseServerIndices", &GeometryBuffer::getUseServerIndices, &GeometryBuffer::setUseServerIndices)
+        .add_property("DrawIndices", &GeometryBuffer::getDrawIndices)
+        .add_property("ClientIndexDraws", &GeometryBuffer::getClientIndexDraws)
+        .def("invalidateIndices", &GeometryBuffer::invalidateIndices)
     ;
 
 
@@ -237,15 +389,20 @@ BOOST_PYTHON_MODULE(_cuni_gl)
         .def("__len__", &GeometryBufferView::AttributeView::getLength)
         .add_property("AttributeLength", &GeometryBufferView::AttributeView::getAttributeLength)
         .add_property("Size", &GeometryBufferView::AttributeView::getSize)
+        .add_property("Type", &GeometryBufferView::AttributeView::getType)
+        .add_property("__array_interface__", &AttributeSlice_arrayInterface<GeometryBufferView::AttributeView>)
         .def("get", &AttributeSlice_get<GeometryBufferView::AttributeView>)
         .def("set", &AttributeSlice_set<GeometryBufferView::AttributeView>)
+        .def("invalidate", &GeometryBufferView::AttributeView::invalidate)
     ;
 
     class_<GeometryBufferView::AttributeSlice, boost::noncopyable>("AttributeSlice", no_init)
         .def("__len__", &GeometryBufferView::AttributeSlice::getLength)
         .add_property("Size", &GeometryBufferView::AttributeSlice::getSize)
+        .add_property("__array_interface__", &AttributeSlice_arrayInterface<GeometryBufferView::AttributeSlice>)
         .def("get", &AttributeSlice_get<GeometryBufferView::AttributeSlice>)
         .def("set", &AttributeSlice_set<GeometryBufferView::AttributeSlice>)
+        .def("invalidate", &GeometryBufferView::AttributeSlice::invalidate)
     ;
 
     class_<GeometryBufferView, GeometryBufferViewHandle, boost::noncopyable>("GeometryBufferView",
@@ -285,9 +442,37 @@ BOOST_PYTHON_MODULE(_cuni_gl)
         .def("dump", &GenericIndexBuffer::dump)
     ;
 
+    /* StreamingBuffer.hpp */
+
+    enum_<StreamingMode>("StreamingMode")
+        .value("Auto", StreamAuto)
+        .value("Persistent", StreamPersistent)
+        .value("Unsynchronized", StreamUnsynchronized)
+        .value("SubData", StreamSubData)
+    ;
+
+    class_<StreamingBuffer, StreamingBufferHandle, boost::noncopyable>("StreamingBuffer", no_init)
+        .add_property("Mode", &StreamingBuffer::getMode)
+        .add_property("RegionSize", &StreamingBuffer::getRegionSize)
+        .add_property("RegionCount", &StreamingBuffer::getRegionCount)
+        .add_property("RegionOffset", &StreamingBuffer::getRegionOffset)
+        .add_property("Used", &StreamingBuffer::getUsed)
+        .add_property("Stalls", &StreamingBuffer::getStalls)
+        .def("bestMode", &StreamingBuffer::bestMode)
+        .staticmethod("bestMode")
+    ;
+
     class_<StreamIndexBuffer, bases<GenericIndexBuffer>, StreamIndexBufferHandle, boost::noncopyable>("StreamIndexBuffer", init<const GLenum>())
         // .def("__init__", init<>())
         .def("add", &StreamIndexBuffer::add)
+        .def("enableStreaming", &StreamIndexBuffer::enableStreaming)
+        .def("disableStreaming", &StreamIndexBuffer::disableStreaming)
+        .add_property("StreamingBuffer", &StreamIndexBuffer::getStreamingBuffer)
+    ;
+
+    enum_<IndexUploadMode>("IndexUploadMode")
+        .value("WriteThrough", UploadWriteThrough)
+        .value("Deferred", UploadDeferred)
     ;
 
     class_<StaticIndexBuffer, bases<GenericIndexBuffer>, StaticIndexBufferHandle, boost::noncopyable>("StaticIndexBuffer", init<const GLenum>())
@@ -296,14 +481,47 @@ BOOST_PYTHON_MODULE(_cuni_gl)
         .def("add", &StaticIndexBuffer::add)
         .def("clear", &StaticIndexBuffer::clear)
         .def("drawHandle", &StaticIndexBuffer::drawHandle)
+        .def("drawHandles", &StaticIndexBuffer_drawHandles)
         .def("gc", &StaticIndexBuffer::gc)
+        .def("compress", &StaticIndexBuffer::compress)
+        .def("compactStep", &StaticIndexBuffer::compactStep)
+        .def("compactFrame", &StaticIndexBuffer::compactFrame)
         .def("remove", &StaticIndexBuffer::remove)
         .def("resolveIndexEntry", &StaticIndexBuffer::resolveIndexEntry)
+        .def("resetBytesMoved", &StaticIndexBuffer::resetBytesMoved)
+        .add_property("LiveCount", &StaticIndexBuffer::getLiveCount)
+        .add_property("Fragmentation", &StaticIndexBuffer::getFragmentation)
+        .add_property("FreeRatio", &StaticIndexBuffer::getFreeRatio)
+        .add_property("BytesMoved", &StaticIndexBuffer::getBytesMoved)
+        .add_property("Compacting", &StaticIndexBuffer::isCompacting)
+        .add_property("CompactBudget",
+            &StaticIndexBuffer::getCompactBudget,
+            &StaticIndexBuffer::setCompactBudget)
+        .add_property("CompactThreshold",
+            &StaticIndexBuffer::getCompactThreshold,
+            &StaticIndexBuffer::setCompactThreshold)
+        .add_property("UploadMode",
+            &StaticIndexBuffer::getUploadMode,
+            &StaticIndexBuffer::setUploadMode)
+        .add_property("VerifyUploads",
+            &StaticIndexBuffer::getVerifyUploads,
+            &StaticIndexBuffer::setVerifyUploads)
+        .def("verify", &StaticIndexBuffer::verify)
     ;
 
 
     /* StateManagement.hpp */
 
+    class_<StateCache, StateCacheHandle, boost::noncopyable>("StateCache", no_init)
+        .add_property("Issued", &StateCache::getIssued)
+        .add_property("Elided", &StateCache::getElided)
+        .add_property("LastFrameIssued", &StateCache::getLastFrameIssued)
+        .add_property("LastFrameElided", &StateCache::getLastFrameElided)
+        .def("endFrame", &StateCache::endFrame)
+        .def("invalidate", &StateCache::invalidate)
+    ;
+    scope().attr("stateCache") = stateCacheHandle;
+
     class_<GroupWrap, boost::shared_ptr<GroupWrap>, boost::noncopyable>("Group", init<int>())
         // .def("__init__", init<>())
         .def("execute", &GroupWrap::__bp_execute)
@@ -318,6 +536,9 @@ BOOST_PYTHON_MODULE(_cuni_gl)
         .def("tearDown", &ParentGroupWrap::__bp_tearDown)
         .def("add", &ParentGroup::add)
         .def("remove", &ParentGroup::remove)
+        .def("recompile", &ParentGroup::recompile)
+        .add_property("CommandCount", &ParentGroup::getCommandCount)
+        .add_property("CompileCount", &ParentGroup::getCompileCount)
     ;
 
     class_<StateGroup, bases<ParentGroup>, StateGroupHandle, boost::noncopyable>("StateGroup", init<StructHandle, int>())
@@ -331,6 +552,20 @@ BOOST_PYTHON_MODULE(_cuni_gl)
         .def("tearDown", &TransformGroup::tearDown)
     ;
 
+    /* RenderQueue.hpp */
+
+    class_<RenderQueue, bases<Group>, RenderQueueHandle, boost::noncopyable>("RenderQueue", init<int>())
+        .def("execute", &RenderQueue::execute)
+        .def("add", &RenderQueue::add)
+        .def("clear", &RenderQueue::clear)
+        .def("sort", &RenderQueue::sort)
+        .def("getKey", &RenderQueue::getKey)
+        .def("__len__", &RenderQueue::getCount)
+        .add_property("StateChanges", &RenderQueue::getStateChanges)
+        .add_property("StateChangesSkipped", &RenderQueue::getStateChangesSkipped)
+        .def("resetCounters", &RenderQueue::resetCounters)
+    ;
+
     class_<AbstractImage2D, AbstractImage2DHandle, boost::noncopyable>("AbstractImage2D", no_init)
         .def("cairoSurface", &__bp_AbstractImage2D__cairoSurface)
     ;
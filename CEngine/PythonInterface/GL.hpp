@@ -32,6 +32,7 @@ authors named in the AUTHORS file.
 
 #include "CEngine/GL/Base.hpp"
 #include "CEngine/GL/StateManagement.hpp"
+#include "CEngine/GL/RenderQueue.hpp"
 #include "CEngine/GL/GeometryBuffer.hpp"
 #include "CEngine/GL/GeometryBufferView.hpp"
 #include "CEngine/GL/CairoUtils.hpp"
@@ -72,6 +73,18 @@ class GroupWrap: public GL::Group, public boost::python::wrapper<GL::Group>
         GroupWrap(int order = 0):
             GL::Group::Group(order) {}
     public:
+        virtual void compile(GL::GroupCommandList &commands)
+        {
+            if (this->get_override("execute"))
+            {
+                commands.execute(this);
+            }
+            else
+            {
+                this->GL::Group::compile(commands);
+            }
+        }
+
         virtual void execute()
         {
             if (boost::python::override f = this->get_override("execute"))
@@ -95,7 +108,36 @@ class ParentGroupWrap: public GL::ParentGroup, public boost::python::wrapper<GL:
     public:
         ParentGroupWrap(int order = 0):
             GL::ParentGroup::ParentGroup(order) {}
+    protected:
+        /* only call into python for overridden methods */
+        virtual void compileSetUp(GL::GroupCommandList &commands)
+        {
+            if (this->get_override("setUp"))
+            {
+                commands.setUp(this);
+            }
+        }
+
+        virtual void compileTearDown(GL::GroupCommandList &commands)
+        {
+            if (this->get_override("tearDown"))
+            {
+                commands.tearDown(this);
+            }
+        }
     public:
+        virtual void compile(GL::GroupCommandList &commands)
+        {
+            if (this->get_override("execute"))
+            {
+                commands.execute(this);
+            }
+            else
+            {
+                this->GL::ParentGroup::compile(commands);
+            }
+        }
+
         virtual void execute()
         {
             if (boost::python::override f = this->get_override("execute"))
@@ -36,13 +36,90 @@ using namespace PyEngine::SceneGraph;
 
 typedef MapHelper<VertexMap, VertexMapHandle> VertexMapHelper;
 
+Vector3 Vector3_fromPython(object obj)
+{
+    if (len(obj) != 3) {
+        ValueError("Need exactly three coordinates.");
+    }
+    return Vector3(extract<VectorFloat>(obj[0])(),
+                   extract<VectorFloat>(obj[1])(),
+                   extract<VectorFloat>(obj[2])());
+}
+
+tuple Vector3_toPython(const Vector3 &vec)
+{
+    return make_tuple(vec[0], vec[1], vec[2]);
+}
+
+boost::shared_ptr<BoundingVolume> BoundingVolume_create(
+    object min, object max, object center, VectorFloat radius)
+{
+    return boost::shared_ptr<BoundingVolume>(new BoundingVolume(
+        Vector3_fromPython(min), Vector3_fromPython(max),
+        Vector3_fromPython(center), radius));
+}
+
+tuple BoundingVolume_getMin(const BoundingVolume &bound)
+{
+    return Vector3_toPython(bound.min);
+}
+
+tuple BoundingVolume_getMax(const BoundingVolume &bound)
+{
+    return Vector3_toPython(bound.max);
+}
+
+tuple BoundingVolume_getCenter(const BoundingVolume &bound)
+{
+    return Vector3_toPython(bound.center);
+}
+
+boost::shared_ptr<Frustum> Frustum_create(object viewProjection)
+{
+    if (len(viewProjection) != 16) {
+        ValueError("Need 16 values (a 4x4 matrix in row-major order).");
+    }
+    Matrix4 matrix;
+    for (unsigned int i = 0; i < 16; i++) {
+        matrix.coeff[i] = extract<VectorFloat>(viewProjection[i])();
+    }
+    return boost::shared_ptr<Frustum>(new Frustum(matrix));
+}
+
+bool Frustum_test(const Frustum &frustum, const BoundingVolume &bound)
+{
+    unsigned int planeMask = FRUSTUM_ALL_PLANES;
+    return frustum.test(bound, planeMask);
+}
+
+void SceneGraph_draw(PyEngine::SceneGraph::SceneGraph &graph)
+{
+    graph.draw();
+}
+
+void SceneGraph_drawFrustum(PyEngine::SceneGraph::SceneGraph &graph,
+    const Frustum &frustum)
+{
+    graph.draw(frustum);
+}
+
+void SceneGraph_selectLOD(PyEngine::SceneGraph::SceneGraph &graph,
+    object eye, VectorFloat projectionScale)
+{
+    graph.selectLOD(Vector3_fromPython(eye), projectionScale);
+}
+
 BOOST_PYTHON_MODULE(_cuni_scenegraph)
 {
     class_<PyEngine::SceneGraph::SceneGraph, bases<>, PyEngine::SceneGraph::SceneGraphHandle, boost::noncopyable>("SceneGraph", no_init)
         .def("__init__", make_constructor(&PyEngine::SceneGraph::SceneGraph::create))
         .def("update", &PyEngine::SceneGraph::SceneGraph::update)
-        .def("draw", &PyEngine::SceneGraph::SceneGraph::draw)
+        .def("selectLOD", &SceneGraph_selectLOD)
+        .def("draw", &SceneGraph_draw)
+        .def("draw", &SceneGraph_drawFrustum)
         .add_property("RootNode", &PyEngine::SceneGraph::SceneGraph::getRootNode)
+        .add_property("CulledCount", &PyEngine::SceneGraph::SceneGraph::getCulledCount)
+        .add_property("DrawnCount", &PyEngine::SceneGraph::SceneGraph::getDrawnCount)
     ;
 
     VertexMapHelper::ItemsIteratorRegT::wrap("__VertexMap_IterItems");
@@ -61,6 +138,21 @@ BOOST_PYTHON_MODULE(_cuni_scenegraph)
             return_value_policy<manage_new_object>())
     ;
 
+    class_<BoundingVolume, boost::shared_ptr<BoundingVolume> >("BoundingVolume", init<>())
+        .def("__init__", make_constructor(&BoundingVolume_create))
+        .def("merge", &BoundingVolume::merge)
+        .def_readonly("Empty", &BoundingVolume::empty)
+        .add_property("Min", &BoundingVolume_getMin)
+        .add_property("Max", &BoundingVolume_getMax)
+        .add_property("Center", &BoundingVolume_getCenter)
+        .def_readonly("Radius", &BoundingVolume::radius)
+    ;
+
+    class_<Frustum, boost::shared_ptr<Frustum> >("Frustum", init<>())
+        .def("__init__", make_constructor(&Frustum_create))
+        .def("test", &Frustum_test)
+    ;
+
     class_<Spatial, SpatialHandle, boost::noncopyable>("Spatial", no_init)
         .def("translate", &Spatial::translate)
         .def("setTranslation", &Spatial::setTranslation)
@@ -71,6 +163,14 @@ BOOST_PYTHON_MODULE(_cuni_scenegraph)
         .def("draw", pure_virtual(&Spatial::draw))
         .def("resetTransformation", &Spatial::resetTransformation)
         .def("applyTransformation", &Spatial::applyTransformation)
+        .add_property("ModelBound",
+            make_function(&Spatial::getModelBound,
+                return_value_policy<copy_const_reference>()),
+            &Spatial::setModelBound)
+        .add_property("WorldBound",
+            make_function(&Spatial::getWorldBound,
+                return_value_policy<copy_const_reference>()))
+        .add_property("Cullable", &Spatial::isCullable)
     ;
 
     class_<Node, bases<Spatial>, NodeHandle, boost::noncopyable>("Node", no_init)
@@ -81,6 +181,12 @@ BOOST_PYTHON_MODULE(_cuni_scenegraph)
 
     class_<LeafWrap, bases<Spatial>, boost::shared_ptr<LeafWrap>, boost::noncopyable>("Leaf")
         .add_property("VertexMap", &Leaf::getVertexMap)
+        .def("addLOD", &Leaf::addLOD)
+        .def("getLODVertexMap", &Leaf::getLODVertexMap)
+        .add_property("CurrentVertexMap", &Leaf::getCurrentVertexMap)
+        .add_property("CurrentLOD", &Leaf::getCurrentLOD)
+        .add_property("LODCount", &Leaf::getLODCount)
+        .add_property("LODHysteresis", &Leaf::getLODHysteresis, &Leaf::setLODHysteresis)
     ;
     implicitly_convertible<boost::shared_ptr<LeafWrap>, SpatialHandle>();
 }
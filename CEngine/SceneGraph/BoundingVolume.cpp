@@ -0,0 +1,118 @@
+/**********************************************************************
+File name: BoundingVolume.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include "BoundingVolume.hpp"
+
+#include <algorithm>
+
+namespace PyEngine {
+namespace SceneGraph {
+
+/* PyEngine::SceneGraph::BoundingVolume */
+
+BoundingVolume::BoundingVolume():
+    empty(true),
+    min(),
+    max(),
+    center(),
+    radius(0)
+{
+
+}
+
+BoundingVolume::BoundingVolume(const Vector3 &aMin, const Vector3 &aMax,
+        const Vector3 &aCenter, const VectorFloat aRadius):
+    empty(false),
+    min(aMin),
+    max(aMax),
+    center(aCenter),
+    radius(aRadius)
+{
+
+}
+
+void BoundingVolume::merge(const BoundingVolume &other)
+{
+    if (other.empty) {
+        return;
+    }
+    if (empty) {
+        *this = other;
+        return;
+    }
+
+    for (unsigned int i = 0; i < 3; i++) {
+        min[i] = std::min(min[i], other.min[i]);
+        max[i] = std::max(max[i], other.max[i]);
+    }
+
+    const Vector3 offset = other.center - center;
+    const VectorFloat distance = offset.length();
+    if (distance + other.radius <= radius) {
+        // other sphere is contained in this one
+        return;
+    }
+    if (distance + radius <= other.radius) {
+        center = other.center;
+        radius = other.radius;
+        return;
+    }
+    const VectorFloat newRadius = (distance + radius + other.radius) / 2;
+    center += offset * ((newRadius - radius) / distance);
+    radius = newRadius;
+}
+
+BoundingVolume BoundingVolume::transformed(const Matrix4 &transformation) const
+{
+    if (empty) {
+        return BoundingVolume();
+    }
+
+    BoundingVolume result(*this);
+    VectorFloat maxScale = 0;
+    for (unsigned int i = 0; i < 3; i++) {
+        const VectorFloat translation = transformation.component(i, 3);
+        result.min[i] = translation;
+        result.max[i] = translation;
+        result.center[i] = translation;
+        VectorFloat scale = 0;
+        for (unsigned int j = 0; j < 3; j++) {
+            const VectorFloat coeff = transformation.component(i, j);
+            const VectorFloat a = coeff * min[j], b = coeff * max[j];
+            result.min[i] += std::min(a, b);
+            result.max[i] += std::max(a, b);
+            result.center[i] += coeff * center[j];
+
+            const VectorFloat column = transformation.component(j, i);
+            scale += column * column;
+        }
+        maxScale = std::max(maxScale, scale);
+    }
+    result.radius = radius * sqrt(maxScale);
+    return result;
+}
+
+}
+}
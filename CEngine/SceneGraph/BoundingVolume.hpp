@@ -0,0 +1,66 @@
+/**********************************************************************
+File name: BoundingVolume.hpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#ifndef _PYE_SCENEGRAPH_BOUNDING_VOLUME_H
+#define _PYE_SCENEGRAPH_BOUNDING_VOLUME_H
+
+#include "CEngine/Math/Vectors.hpp"
+#include "CEngine/Math/Matrices.hpp"
+
+namespace PyEngine {
+namespace SceneGraph {
+
+/**
+ * Axis aligned box and bounding sphere around some geometry. A default
+ * constructed volume is empty and contains nothing.
+ */
+struct BoundingVolume
+{
+    BoundingVolume();
+    BoundingVolume(const Vector3 &aMin, const Vector3 &aMax,
+                   const Vector3 &aCenter, const VectorFloat aRadius);
+
+    bool empty;
+    Vector3 min, max;
+    Vector3 center;
+    VectorFloat radius;
+
+    /**
+     * Grow this volume so that it also encloses *other*.
+     */
+    void merge(const BoundingVolume &other);
+
+    /**
+     * Return the volume enclosing this one after applying
+     * *transformation* (which maps column vectors, as translation4
+     * does).
+     */
+    BoundingVolume transformed(const Matrix4 &transformation) const;
+};
+
+}
+}
+
+#endif
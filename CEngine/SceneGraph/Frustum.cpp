@@ -0,0 +1,104 @@
+/**********************************************************************
+File name: Frustum.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include "Frustum.hpp"
+
+#include <cmath>
+
+namespace PyEngine {
+namespace SceneGraph {
+
+/* PyEngine::SceneGraph::Frustum */
+
+Frustum::Frustum()
+{
+    for (unsigned int i = 0; i < FRUSTUM_PLANE_COUNT; i++) {
+        normals[i] = Vector3(0, 0, 0);
+        distances[i] = 1;
+    }
+}
+
+Frustum::Frustum(const Matrix4 &viewProjection)
+{
+    // left, right, bottom, top, near, far: w +- x, w +- y, w +- z in
+    // clip space
+    for (unsigned int i = 0; i < FRUSTUM_PLANE_COUNT; i++) {
+        const unsigned int row = i / 2;
+        const VectorFloat sign = (i % 2 == 0 ? 1 : -1);
+        Vector3 normal;
+        for (unsigned int j = 0; j < 3; j++) {
+            normal[j] = viewProjection.component(3, j)
+                + sign * viewProjection.component(row, j);
+        }
+        const VectorFloat distance = viewProjection.component(3, 3)
+            + sign * viewProjection.component(row, 3);
+        const VectorFloat length = normal.length();
+        normals[i] = normal * (1 / length);
+        distances[i] = distance / length;
+    }
+}
+
+bool Frustum::test(const BoundingVolume &bound,
+                   unsigned int &planeMask) const
+{
+    if (bound.empty) {
+        return true;
+    }
+
+    const Vector3 boxCenter = (bound.min + bound.max) * 0.5;
+    const Vector3 halfSize = (bound.max - bound.min) * 0.5;
+    for (unsigned int i = 0; i < FRUSTUM_PLANE_COUNT; i++) {
+        const unsigned int bit = 1 << i;
+        if (!(planeMask & bit)) {
+            continue;
+        }
+        const Vector3 &normal = normals[i];
+
+        // the sphere is cheaper and usually decides
+        const VectorFloat sphere = normal * bound.center + distances[i];
+        if (sphere < -bound.radius) {
+            return false;
+        }
+        if (sphere >= bound.radius) {
+            planeMask &= ~bit;
+            continue;
+        }
+
+        const VectorFloat box = normal * boxCenter + distances[i];
+        const VectorFloat extent = std::abs(normal[0]) * halfSize[0]
+            + std::abs(normal[1]) * halfSize[1]
+            + std::abs(normal[2]) * halfSize[2];
+        if (box + extent < 0) {
+            return false;
+        }
+        if (box - extent >= 0) {
+            planeMask &= ~bit;
+        }
+    }
+    return true;
+}
+
+}
+}
@@ -0,0 +1,72 @@
+/**********************************************************************
+File name: Frustum.hpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#ifndef _PYE_SCENEGRAPH_FRUSTUM_H
+#define _PYE_SCENEGRAPH_FRUSTUM_H
+
+#include "CEngine/Math/Vectors.hpp"
+#include "CEngine/Math/Matrices.hpp"
+#include "BoundingVolume.hpp"
+
+namespace PyEngine {
+namespace SceneGraph {
+
+#define FRUSTUM_PLANE_COUNT 6
+#define FRUSTUM_ALL_PLANES 0x3f
+
+/**
+ * Six planes bounding the volume visible to a camera. A point p is
+ * inside a plane if normal * p + distance >= 0.
+ */
+struct Frustum
+{
+    /**
+     * A frustum which contains everything.
+     */
+    Frustum();
+    /**
+     * Extract the planes from a combined projection and view matrix
+     * (which maps column vectors, like translation4).
+     */
+    Frustum(const Matrix4 &viewProjection);
+
+    Vector3 normals[FRUSTUM_PLANE_COUNT];
+    VectorFloat distances[FRUSTUM_PLANE_COUNT];
+
+    /**
+     * Test *bound* against the planes set in *planeMask*. Return false
+     * if it is entirely outside of one of them. Otherwise, clear the
+     * planes from *planeMask* which contain the bound entirely, so that
+     * anything inside the bound need not be tested against them.
+     *
+     * Empty bounds are always visible.
+     */
+    bool test(const BoundingVolume &bound, unsigned int &planeMask) const;
+};
+
+}
+}
+
+#endif
@@ -26,6 +26,7 @@ authors named in the AUTHORS file.
 #include "Leaf.hpp"
 
 #include <cassert>
+#include <stdexcept>
 #include <GL/glew.h>
 
 namespace PyEngine {
@@ -35,13 +36,93 @@ namespace SceneGraph {
 
 Leaf::Leaf():
     Spatial::Spatial(),
-    _vertexMap(new VertexMap())
+    _vertexMap(new VertexMap()),
+    _lods(),
+    _currentLOD(0),
+    _lodHysteresis(0.1)
 {
 }
 
 void Leaf::draw()
 {
-    glLoadMatrixd(worldTransformation.coeff);
+    GL::stateCache->loadMatrix(worldTransformation);
+}
+
+VertexMapHandle Leaf::addLOD(VectorFloat maxScreenSize)
+{
+    LODLevel level;
+    level.vertexMap = VertexMapHandle(new VertexMap());
+    level.maxScreenSize = maxScreenSize;
+
+    std::vector<LODLevel>::iterator iter = _lods.begin();
+    for (/**/; iter != _lods.end(); ++iter)
+    {
+        if ((*iter).maxScreenSize < maxScreenSize)
+        {
+            break;
+        }
+    }
+    _lods.insert(iter, level);
+    _currentLOD = 0;
+    return level.vertexMap;
+}
+
+VertexMapHandle Leaf::getLODVertexMap(unsigned int level)
+{
+    if (level == 0)
+    {
+        return _vertexMap;
+    }
+    if (level > _lods.size())
+    {
+        throw std::out_of_range("detail level out of range");
+    }
+    return _lods[level-1].vertexMap;
+}
+
+VertexMapHandle Leaf::getCurrentVertexMap()
+{
+    return getLODVertexMap(_currentLOD);
+}
+
+void Leaf::setLODHysteresis(VectorFloat hysteresis)
+{
+    if (!(hysteresis >= 0 && hysteresis < 1))
+    {
+        throw std::invalid_argument("LOD hysteresis must be in [0, 1).");
+    }
+    _lodHysteresis = hysteresis;
+}
+
+void Leaf::selectLOD(const Vector3 &eye, VectorFloat projectionScale)
+{
+    if (_lods.empty() || worldBound.empty)
+    {
+        return;
+    }
+
+    const VectorFloat distance = (worldBound.center - eye).length();
+    if (distance <= worldBound.radius)
+    {
+        _currentLOD = 0;
+        return;
+    }
+    const VectorFloat screenSize =
+        2 * worldBound.radius * projectionScale / distance;
+
+    // a level is only entered or left once the screen size is past its
+    // threshold by the hysteresis margin, so leaves near a threshold do
+    // not flip between two levels every frame
+    while (_currentLOD < _lods.size()
+           && screenSize < _lods[_currentLOD].maxScreenSize * (1 - _lodHysteresis))
+    {
+        _currentLOD++;
+    }
+    while (_currentLOD > 0
+           && screenSize > _lods[_currentLOD-1].maxScreenSize * (1 + _lodHysteresis))
+    {
+        _currentLOD--;
+    }
 }
 
 }
@@ -27,6 +27,7 @@ authors named in the AUTHORS file.
 #define _PYE_SCENEGRAPH_LEAF_H
 
 #include <unordered_map>
+#include <vector>
 
 #include "CEngine/GL/GeometryBuffer.hpp"
 #include "CEngine/GL/StateManagement.hpp"
@@ -42,15 +43,43 @@ class Leaf;
 
 typedef boost::shared_ptr<Leaf> LeafHandle;
 
+/**
+ * A reduced detail level of a leaf, which is used while the leaf
+ * covers less than maxScreenSize pixels on screen.
+ */
+struct LODLevel
+{
+    VertexMapHandle vertexMap;
+    VectorFloat maxScreenSize;
+};
+
 class Leaf: public Spatial
 {
     protected:
         Leaf();
     protected:
         VertexMapHandle _vertexMap;
+        std::vector<LODLevel> _lods;
+        unsigned int _currentLOD;
+        VectorFloat _lodHysteresis;
     public:
         void draw();
         VertexMapHandle getVertexMap() { return _vertexMap; };
+
+        /**
+         * Add a detail level and return its (empty) vertex map. Levels
+         * are ordered by decreasing maxScreenSize, level 0 is the full
+         * detail vertex map.
+         */
+        VertexMapHandle addLOD(VectorFloat maxScreenSize);
+        VertexMapHandle getLODVertexMap(unsigned int level);
+        VertexMapHandle getCurrentVertexMap();
+        unsigned int getCurrentLOD() const { return _currentLOD; };
+        unsigned int getLODCount() const { return _lods.size() + 1; };
+        VectorFloat getLODHysteresis() const { return _lodHysteresis; };
+        void setLODHysteresis(VectorFloat hysteresis);
+
+        virtual void selectLOD(const Vector3 &eye, VectorFloat projectionScale);
 };
 
 }
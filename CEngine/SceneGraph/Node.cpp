@@ -60,6 +60,37 @@ void Node::draw()
     }
 }
 
+void Node::drawVisible(const Frustum &frustum, unsigned int planeMask,
+                       CullStatistics &stats)
+{
+    // children are only tested against planes intersecting this node
+    if (_cullable && planeMask && !frustum.test(worldBound, planeMask))
+    {
+        stats.culled++;
+        return;
+    }
+    std::vector<SpatialHandle>::iterator iter = children.begin();
+    for(/**/; iter != children.end(); ++iter)
+    {
+        if(*iter)
+        {
+            (*iter)->drawVisible(frustum, planeMask, stats);
+        }
+    }
+}
+
+void Node::selectLOD(const Vector3 &eye, VectorFloat projectionScale)
+{
+    std::vector<SpatialHandle>::iterator iter = children.begin();
+    for(/**/; iter != children.end(); ++iter)
+    {
+        if(*iter)
+        {
+            (*iter)->selectLOD(eye, projectionScale);
+        }
+    }
+}
+
 void Node::addChild(SpatialHandle child)
 {
     assert(child);
@@ -101,9 +132,26 @@ void Node::removeChild(SpatialHandle child)
     }
 }
 
+void Node::updateWorldBound()
+{
+    Spatial::updateWorldBound();
+    // the node itself usually has no geometry
+    _cullable = true;
+
+    std::vector<SpatialHandle>::iterator iter = children.begin();
+    for(/**/; iter != children.end(); ++iter)
+    {
+        if(*iter)
+        {
+            worldBound.merge((*iter)->getWorldBound());
+            _cullable = _cullable && (*iter)->isCullable();
+        }
+    }
+}
+
 void Node::updateWorldData()
 {
-    Spatial::updateWorldData();
+    updateWorldTransformation();
 
     std::vector<SpatialHandle>::iterator iter = children.begin();
     for(/**/; iter != children.end(); ++iter)
@@ -114,6 +162,8 @@ void Node::updateWorldData()
             child->updateGeometry(false);
         }
     }
+
+    updateWorldBound();
 }
 
 NodeHandle Node::create()
@@ -47,12 +47,16 @@ class Node : public Spatial
         ~Node();
 
         void draw();
+        void drawVisible(const Frustum &frustum, unsigned int planeMask,
+                         CullStatistics &stats);
+        void selectLOD(const Vector3 &eye, VectorFloat projectionScale);
 
         void addChild(SpatialHandle child);
         void removeChild(SpatialHandle child);
 
         static NodeHandle create();
     protected:
+        virtual void updateWorldBound();
         virtual void updateWorldData();
 
         std::vector<SpatialHandle> children; 
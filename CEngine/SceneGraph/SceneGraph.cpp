@@ -30,7 +30,8 @@ namespace PyEngine {
 namespace SceneGraph {
 
 SceneGraph::SceneGraph():
-    _root(Node::create())
+    _root(Node::create()),
+    _stats()
 {
     
 }
@@ -44,9 +45,21 @@ void SceneGraph::update(double deltaT)
     _root->updateGeometry();
 }
 
+void SceneGraph::selectLOD(const Vector3 &eye, VectorFloat projectionScale)
+{
+    _root->selectLOD(eye, projectionScale);
+}
+
 void SceneGraph::draw()
 {
-    _root->draw();
+    draw(Frustum());
+}
+
+void SceneGraph::draw(const Frustum &frustum)
+{
+    _stats.culled = 0;
+    _stats.drawn = 0;
+    _root->drawVisible(frustum, FRUSTUM_ALL_PLANES, _stats);
 }
 
 SceneGraphHandle SceneGraph::create()
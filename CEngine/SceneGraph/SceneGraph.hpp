@@ -44,14 +44,26 @@ class SceneGraph
         ~SceneGraph();
 
         void update(double deltaT = 0);
+        void selectLOD(const Vector3 &eye, VectorFloat projectionScale);
         void draw();
+        /**
+         * Draw the spatials which intersect *frustum*, skipping whole
+         * subtrees outside of it.
+         */
+        void draw(const Frustum &frustum);
 
         inline NodeHandle getRootNode() const { return _root; }
+        /**
+         * Statistics of the last call to draw.
+         */
+        inline unsigned int getCulledCount() const { return _stats.culled; }
+        inline unsigned int getDrawnCount() const { return _stats.drawn; }
 
         static SceneGraphHandle create();
 
     protected:
         NodeHandle _root;
+        CullStatistics _stats;
 };
 
 }
@@ -28,11 +28,16 @@ authors named in the AUTHORS file.
 #include <iostream>
 #include <GL/glew.h>
 
+#include "CEngine/GL/StateManagement.hpp"
+
 namespace PyEngine {
 namespace SceneGraph {
 
 Spatial::Spatial():
-    _parent()
+    localTransformation(Identity),
+    worldTransformation(Identity),
+    _parent(),
+    _cullable(false)
 {
 }
 
@@ -53,9 +58,17 @@ void Spatial::setParent(SpatialHandle s)
 void Spatial::updateGeometry(bool initiator)
 {
     updateWorldData();
+    if (!initiator) {
+        return;
+    }
+    // the bounds of the parents enclose this one
+    for (SpatialHandle p = getParent(); p; p = p->getParent())
+    {
+        p->updateWorldBound();
+    }
 }
 
-void Spatial::updateWorldData()
+void Spatial::updateWorldTransformation()
 {
     SpatialHandle p = getParent();
 
@@ -69,6 +82,39 @@ void Spatial::updateWorldData()
     }
 }
 
+void Spatial::updateWorldBound()
+{
+    worldBound = modelBound.transformed(worldTransformation);
+    _cullable = !worldBound.empty;
+}
+
+void Spatial::updateWorldData()
+{
+    updateWorldTransformation();
+    updateWorldBound();
+}
+
+void Spatial::drawVisible(const Frustum &frustum, unsigned int planeMask,
+                          CullStatistics &stats)
+{
+    if (_cullable && planeMask && !frustum.test(worldBound, planeMask))
+    {
+        stats.culled++;
+        return;
+    }
+    stats.drawn++;
+    draw();
+}
+
+void Spatial::selectLOD(const Vector3 &eye, VectorFloat projectionScale)
+{
+}
+
+void Spatial::setModelBound(const BoundingVolume &bound)
+{
+    modelBound = bound;
+}
+
 void Spatial::translate(double x, double y, double z)
 {
     localTransformation = localTransformation * translation4(Vector3(x, y, z));
@@ -101,12 +147,12 @@ void Spatial::setScale(double x, double y, double z)
 
 void Spatial::resetTransformation()
 {
-    localTransformation = Matrix4();
+    localTransformation = Matrix4(Identity);
 }
 
 void Spatial::applyTransformation()
 {
-    glLoadMatrixd(worldTransformation.coeff);
+    GL::stateCache->loadMatrix(worldTransformation);
 }
 
 }
@@ -30,6 +30,8 @@ authors named in the AUTHORS file.
 #include <boost/weak_ptr.hpp>
 
 #include "CEngine/Math/Matrices.hpp"
+#include "BoundingVolume.hpp"
+#include "Frustum.hpp"
 
 namespace PyEngine {
 namespace SceneGraph {
@@ -39,6 +41,16 @@ class Spatial;
 typedef boost::shared_ptr<Spatial> SpatialHandle;
 typedef boost::weak_ptr<Spatial> WeakSpatialHandle;
 
+/**
+ * Number of spatials rejected by the frustum test (whole subtrees count
+ * once) and of non-node spatials drawn.
+ */
+struct CullStatistics
+{
+    unsigned int culled;
+    unsigned int drawn;
+};
+
 class Spatial
 {
     protected:
@@ -47,10 +59,12 @@ class Spatial
     public:
         virtual ~Spatial();
 
-        //Bound worldBound;
         Matrix4 localTransformation;
         Matrix4 worldTransformation;
 
+        BoundingVolume modelBound;
+        BoundingVolume worldBound;
+
         void updateGeometry(bool initiator=true);
 
         SpatialHandle getParent();
@@ -63,15 +77,42 @@ class Spatial
         virtual void scale(double x, double y, double z);
         virtual void setScale(double x, double y, double z);
 
+        const BoundingVolume &getModelBound() const { return modelBound; };
+        void setModelBound(const BoundingVolume &bound);
+        const BoundingVolume &getWorldBound() const { return worldBound; };
+        /**
+         * False if the extent of the spatial or one of its children is
+         * not known, i.e. their model bound is empty. Such spatials are
+         * never culled.
+         */
+        bool isCullable() const { return _cullable; };
+
         virtual void resetTransformation();
         virtual void applyTransformation();
 
+        /**
+         * Select the detail level for a viewer at eye. projectionScale
+         * converts a size at distance 1 into pixels, i.e. viewport
+         * height / (2 tan(fovy / 2)).
+         */
+        virtual void selectLOD(const Vector3 &eye, VectorFloat projectionScale);
+
         virtual void draw() = 0;
+        /**
+         * Draw the spatial unless its world bound is outside of one of
+         * the planes of *frustum* set in *planeMask*.
+         */
+        virtual void drawVisible(const Frustum &frustum,
+                                 unsigned int planeMask,
+                                 CullStatistics &stats);
 
     protected:
         WeakSpatialHandle _parent;
         WeakSpatialHandle _weak;
+        bool _cullable;
         
+        void updateWorldTransformation();
+        virtual void updateWorldBound();
         virtual void updateWorldData();
 
 };
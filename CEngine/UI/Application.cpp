@@ -2,6 +2,7 @@
 
 #include "CEngine/GL/Base.hpp"
 #include "CEngine/GL/CairoUtils.hpp"
+#include "CEngine/GL/StateManagement.hpp"
 
 namespace PyEngine { namespace UI {
 
@@ -38,7 +39,7 @@ Application::Application():
 Application::~Application()
 {
     if (_cairo_tex) {
-        glDeleteTextures(1, &_cairo_tex);
+        stateCache->deleteTextures(1, &_cairo_tex);
     }
 }
 
@@ -58,7 +59,7 @@ void Application::_recreate_cairo_surface(
     }
 
     if ((pot_w != _cairo_tex_w) || (pot_h != _cairo_tex_h)) {
-        glBindTexture(GL_TEXTURE_2D, _cairo_tex);
+        stateCache->bindTexture(GL_TEXTURE_2D, _cairo_tex);
         glTexImage2D(
             GL_TEXTURE_2D,
             0,
@@ -77,7 +78,7 @@ void Application::_recreate_cairo_surface(
         raiseLastGLError();
         glTexParameteri(GL_TEXTURE_2D, GL_GENERATE_MIPMAP, GL_FALSE);
         raiseLastGLError();
-        glBindTexture(GL_TEXTURE_2D, 0);
+        stateCache->bindTexture(GL_TEXTURE_2D, 0);
 
         _cairo_tex_w = pot_w;
         _cairo_tex_h = pot_h;
@@ -112,6 +113,8 @@ void Application::init_display(
                                fullscreen);
     _window->switchTo();
     _window->initializeGLEW();
+    // a new context starts with unknown state
+    stateCache->invalidate();
 
     modeswitch(dimensions, fullscreen);
 
@@ -188,7 +191,7 @@ void Application::ui_frame_unsynced(TimeFloat deltaT)
 
     render();
 
-    glBindTexture(GL_TEXTURE_2D, _cairo_tex);
+    stateCache->bindTexture(GL_TEXTURE_2D, _cairo_tex);
     if (get_surface_dirty() || true) {
         glTexCairoSurfaceSubImage2D(
             GL_TEXTURE_2D, 0,
@@ -199,9 +202,9 @@ void Application::ui_frame_unsynced(TimeFloat deltaT)
     float s = _cairo_tex_s,
           t = _cairo_tex_t;
 
-    glEnable(GL_TEXTURE_2D);
-    glEnable(GL_BLEND);
-    glBlendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA);
+    stateCache->enable(GL_TEXTURE_2D);
+    stateCache->enable(GL_BLEND);
+    stateCache->blendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA);
     glBegin(GL_QUADS);
         glTexCoord2f(0, 0);
         glVertex2f(0, 0);
@@ -215,7 +218,10 @@ void Application::ui_frame_unsynced(TimeFloat deltaT)
         glTexCoord2f(s, 0);
         glVertex2f(rect.get_width(), 0);
     glEnd();
-    glBindTexture(GL_TEXTURE_2D, 0);
+    stateCache->bindTexture(GL_TEXTURE_2D, 0);
+
+    // the UI is drawn last
+    stateCache->endFrame();
 }
 
 void Application::frame_unsynced(TimeFloat deltaT)
@@ -37,20 +37,68 @@ def __test_index_range(idx, min, max, type):
         raise ValueError("Index must be in [{0}..{1}] for {2}. Got {3}".format(min, max, type, idx))
     return idx
 
+__attrib_types = {
+    "f32": AttribType.Float32,
+    "float": AttribType.Float32,
+    "f16": AttribType.Float16,
+    "half": AttribType.Float16,
+    "u8": AttribType.UNorm8,
+    "i10_10_10_2": AttribType.SNorm10_10_10_2,
+}
+
+# types the fixed function pointer calls accept for each attribute;
+# packed types need four components, so packed normals have to go
+# through a generic attribute
+__allowed_types = {
+    "v": (AttribType.Float32, AttribType.Float16),
+    "c": (AttribType.Float32, AttribType.Float16, AttribType.UNorm8),
+    "n": (AttribType.Float32, AttribType.Float16),
+    "t": (AttribType.Float32, AttribType.Float16),
+    "g": (AttribType.Float32, AttribType.Float16, AttribType.UNorm8,
+          AttribType.SNorm10_10_10_2),
+}
+__allowed_types["a"] = __allowed_types["g"]
+
+def __test_attrib_type(typename, attrib, size):
+    try:
+        attribtype = __attrib_types[typename]
+    except KeyError:
+        raise ValueError("Unknown component type: {0}".format(typename))
+    if attribtype not in __allowed_types[attrib[0]]:
+        raise ValueError("Component type {0} not supported for {1}".format(typename, attrib))
+    if (attribtype == AttribType.SNorm10_10_10_2 and attrib[0] in "ga"
+            and size != 4):
+        raise ValueError("Component type {0} needs size 4 for {1}. Got {2}".format(typename, attrib, size))
+    return attribtype
+
 __VertexFormat = VertexFormat
 
 def VertexFormat(fmtspecifier):
+    """
+    Create a vertex format from a specifier like ``"v:3;c:4:u8;n:3"``.
+    Each segment names an attribute, its number of components and,
+    optionally, the type the components are stored as in the buffer
+    (``f32``, the default, ``half``, ``u8`` or ``i10_10_10_2``).
+    """
     nvertex, ncolour = 0, 0
     ntexcoord = [0, 0, 0, 0]
     nattrib = [0, 0, 0, 0]
     has_normal = False
+    # indexed like the slots of the C++ VertexFormat:
+    # v, c, t0..t3, n, g0..g3
+    types = [AttribType.Float32] * 11
 
     if not isinstance(fmtspecifier, (unicode, str)):
         segmentiter = fmtspecifier
     else:
         segmentiter = fmtspecifier.split(";")
     segments = [segment.split(':') for segment in segmentiter]
-    for type, size in ((type.strip(), size.strip()) for type, size in segments):
+    for segment in segments:
+        if len(segment) == 3:
+            type, size, typename = (part.strip() for part in segment)
+        else:
+            type, size = (part.strip() for part in segment)
+            typename = None
         if len(type) + len(size) == 0:
             continue
         if len(type) == 0:
@@ -60,17 +108,28 @@ def VertexFormat(fmtspecifier):
         attrib = type[0]
         if attrib == "v":
             nvertex = __test_size_range(size, 2, 4, attrib)
+            slot = 0
         elif attrib == "c":
             ncolour = __test_size_range(size, 3, 4, attrib)
+            slot = 1
         elif attrib == "n":
             __test_size_range(size, 3, 3, attrib)
             has_normal = True
+            slot = 6
         elif attrib == "t":
             idx = __test_index_range(type[1:], 0, len(ntexcoord), attrib)
             ntexcoord[idx] = __test_size_range(size, 1, 4, type)
+            slot = 2 + idx
         elif attrib == "g" or attrib == "a":
             idx = __test_index_range(type[1:], 0, len(nattrib), attrib)
             nattrib[idx] = __test_size_range(size, 1, 4, type)
+            slot = 7 + idx
+        else:
+            continue
+        if typename is not None:
+            types[slot] = __test_attrib_type(typename, type, size)
 
     args = [nvertex, ncolour] + ntexcoord + [has_normal] + nattrib;
+    if any(attribtype != AttribType.Float32 for attribtype in types):
+        args.append(types)
     return __VertexFormat(*args)
@@ -24,12 +24,98 @@
 ########################################################################
 from __future__ import unicode_literals, print_function, division
 from our_future import *
+import array
+import bisect
+import mmap
+import struct
 import sys
 
+import Simplify
+import VertexCache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PACK_LISTS = "lists"
+"""
+Packing mode which keeps model data in python lists and packs each face
+into a tuple of lists. This is the default.
+"""
+
+PACK_ARRAYS = "arrays"
+"""
+Packing mode which keeps model data in contiguous float32 numpy arrays
+and packs all faces into one interleaved array. Requires numpy.
+"""
+
+def _is_empty(value):
+    return value is not None and len(value) == 0
+
+class BoundingVolume(object):
+    """
+    Axis aligned bounding box (*Min*, *Max*) and bounding sphere
+    (*Center*, *Radius*) of a set of vertices. All points are 3-tuples.
+    """
+    __slots__ = ("Min", "Max", "Center", "Radius")
+
+    def __init__(self, min, max, center, radius):
+        self.Min = min
+        self.Max = max
+        self.Center = center
+        self.Radius = radius
+
+    @classmethod
+    def from_vertices(cls, vertices):
+        """
+        Compute the bounding volume of the flat coordinate sequence
+        *vertices* (three values per vertex). The sphere is centered on
+        the box and as small as possible for that center. Return None if
+        there are no vertices.
+        """
+        if vertices is None or len(vertices) < 3:
+            return None
+        if numpy is None:
+            return cls._from_vertices_python(vertices)
+        points = numpy.asarray(vertices, dtype=numpy.float64)
+        points = points[:len(points) // 3 * 3].reshape(-1, 3)
+        min_, max_ = points.min(axis=0), points.max(axis=0)
+        center = (min_ + max_) / 2
+        radius = numpy.sqrt(((points - center) ** 2).sum(axis=1).max())
+        return cls(tuple(min_.tolist()), tuple(max_.tolist()),
+                   tuple(center.tolist()), float(radius))
+
+    @classmethod
+    def _from_vertices_python(cls, vertices):
+        count = len(vertices) // 3
+        axes = [vertices[i:count*3:3] for i in range(3)]
+        min_ = tuple(min(axis) for axis in axes)
+        max_ = tuple(max(axis) for axis in axes)
+        center = tuple((a + b) / 2 for a, b in zip(min_, max_))
+        radius = max(
+            sum((p - c) ** 2 for p, c in zip(vertices[i:i+3], center))
+            for i in range(0, count*3, 3)) ** 0.5
+        return cls(min_, max_, center, radius)
+
+    def apply(self, spatial):
+        """
+        Set this volume as model bound of the scene graph node
+        *spatial*, so the engine can cull it.
+        """
+        from Engine.CEngine.SceneGraph import BoundingVolume as CBoundingVolume
+        spatial.ModelBound = CBoundingVolume(self.Min, self.Max,
+                                             self.Center, self.Radius)
+
 class Geometry(object):
+    __slots__ = ("_indices", "_vertices", "_normals", "_bounding_volume")
 
     def __init__(self, **kwargs):
         super(Geometry, self).__init__(**kwargs)
+        self._bounding_volume = None
+
+    def _coerce_floats(self, value):
+        return value
 
     @property
     def Indices(self):
@@ -37,7 +123,7 @@ class Geometry(object):
 
     @Indices.setter
     def Indices(self, value):
-        if value == []: value = None
+        if _is_empty(value): value = None
         self._indices = value
 
     @property
@@ -46,8 +132,9 @@ class Geometry(object):
 
     @Vertices.setter
     def Vertices(self, value):
-        if value == []: value = None
-        self._vertices = value
+        if _is_empty(value): value = None
+        self._vertices = self._coerce_floats(value)
+        self._bounding_volume = None
 
     @property
     def Normals(self):
@@ -55,13 +142,182 @@ class Geometry(object):
 
     @Normals.setter
     def Normals(self, value):
-        if value == []: value = None
-        self._normals = value
+        if _is_empty(value): value = None
+        self._normals = self._coerce_floats(value)
 
     @property
     def BoundingVolume(self):
+        """
+        The :class:`BoundingVolume` of :attr:`Vertices`, or None if
+        there are no vertices. It is computed on first access and cached
+        until :attr:`Vertices` is set again; call
+        :meth:`invalidate_bounding_volume` after changing the vertices
+        in place.
+        """
+        if self._bounding_volume is None:
+            self._bounding_volume = BoundingVolume.from_vertices(
+                self._vertices)
         return self._bounding_volume
 
+    def invalidate_bounding_volume(self):
+        self._bounding_volume = None
+
+class PackedFaceArrays(object):
+    """
+    Faces of a :class:`Model` packed into one interleaved float32 array.
+
+    Each row of :attr:`Data` holds one face corner. The columns are laid
+    out in the same order a :class:`GeometryBuffer` uses for its vertex
+    format (position, texture coordinate, normal), so :attr:`Data` can
+    be written into a buffer created with :attr:`VertexFormat` as is.
+
+    :attr:`Vertices`, :attr:`TexCoords` and :attr:`Normals` are strided
+    views into :attr:`Data` (or None if the model has no such
+    attribute). Indexing the object returns the same
+    ``(vertices, normals, texcoords)`` tuple per face as the list based
+    packing, but made of views instead of copies.
+    """
+    __slots__ = ("Data", "CornersPerFace", "VertexFormat",
+                 "Vertices", "Normals", "TexCoords")
+
+    def __init__(self, data, corners_per_face, vertex_format,
+                 vertices, normals, texcoords):
+        self.Data = data
+        self.CornersPerFace = corners_per_face
+        self.VertexFormat = vertex_format
+        self.Vertices = vertices
+        self.Normals = normals
+        self.TexCoords = texcoords
+
+    def _face_slice(self, view, start, stop):
+        if view is None:
+            return None
+        return view[start:stop]
+
+    def __len__(self):
+        if self.CornersPerFace == 0:
+            return 0
+        return len(self.Data) // self.CornersPerFace
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("face index out of range")
+        start = index * self.CornersPerFace
+        stop = start + self.CornersPerFace
+        return (self._face_slice(self.Vertices, start, stop),
+                self._face_slice(self.Normals, start, stop),
+                self._face_slice(self.TexCoords, start, stop))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class IndexedFaces(object):
+    """
+    Faces of a :class:`Model` as a table of unique vertices and an index
+    list, as returned by :meth:`Model.pack_indexed`.
+
+    :attr:`Data` holds one interleaved vertex per :attr:`Stride` floats
+    in the layout described by :attr:`VertexFormat`. It is a two
+    dimensional float32 array with one vertex per row in
+    :data:`PACK_ARRAYS` mode and a flat ``array.array`` otherwise.
+    :attr:`Indices` holds :attr:`CornersPerFace` indices into the vertex
+    table per face, in face order.
+    """
+    __slots__ = ("Data", "Indices", "CornersPerFace", "VertexFormat",
+                 "_layout")
+
+    def __init__(self, data, indices, corners_per_face, layout):
+        self.Data = data
+        self.Indices = indices
+        self.CornersPerFace = corners_per_face
+        self.VertexFormat = ";".join(
+            "{0}:{1}".format(name, components)
+            for name, _, components in layout)
+        self._layout = layout
+
+    @property
+    def Stride(self):
+        return sum(components for _, _, components in self._layout)
+
+    def _is_array(self):
+        return numpy is not None and isinstance(self.Data, numpy.ndarray)
+
+    @property
+    def VertexCount(self):
+        if self._is_array():
+            return len(self.Data)
+        return len(self.Data) // self.Stride
+
+    def __len__(self):
+        if self.CornersPerFace == 0:
+            return 0
+        return len(self.Indices) // self.CornersPerFace
+
+    def acmr(self, cache_size=VertexCache.DEFAULT_CACHE_SIZE):
+        """
+        Return the average cache miss ratio of :attr:`Indices`, see
+        :func:`VertexCache.acmr`. Only meaningful for triangles.
+        """
+        return VertexCache.acmr(self.Indices.tolist(), cache_size)
+
+    def attribute(self, name):
+        """
+        Return the values of the attribute *name* (``"v"``, ``"t0"`` or
+        ``"n"``) of all vertices as a flat list of floats, or None if the
+        vertices have no such attribute.
+        """
+        stride = self.Stride
+        for attrib, offset, components in self._layout:
+            if attrib != name:
+                continue
+            if self._is_array():
+                return self.Data[
+                    :, offset:offset+components].ravel().tolist()
+            return [value
+                    for i in range(offset, len(self.Data), stride)
+                    for value in self.Data[i:i+components]]
+        return None
+
+    def _attribute_array(self, name):
+        """
+        Like :meth:`attribute`, but return a contiguous float32 array
+        with one row per vertex. Only valid with array data.
+        """
+        for attrib, offset, components in self._layout:
+            if attrib == name:
+                return numpy.ascontiguousarray(
+                    self.Data[:, offset:offset+components])
+        return None
+
+    def upload(self, buffer, index_buffer):
+        """
+        Allocate the vertices in the :class:`GeometryBuffer` *buffer*,
+        write their data and add the indices to the
+        :class:`StaticIndexBuffer` *index_buffer*. Return the index entry
+        handle and the :class:`GeometryBufferView` on the vertices.
+        """
+        from Engine.CEngine.GL import GeometryBufferView
+        handle = buffer.allocateVertices(self.VertexCount)
+        view = GeometryBufferView(buffer, handle)
+        targets = [(view.Vertex, "v"),
+                   (view.TexCoord(0), "t0"),
+                   (view.Normal, "n")]
+        for attrib, name in targets:
+            if attrib is None:
+                continue
+            # arrays go through the buffer protocol in one piece
+            if self._is_array():
+                values = self._attribute_array(name)
+            else:
+                values = self.attribute(name)
+            if values is not None:
+                attrib.set(values)
+        entry = index_buffer.add(handle.take(self.Indices.tolist()))
+        return entry, view
+
 class Model(Geometry):
     """
     The Model class stores 3D model data like vertices, normals,
@@ -70,20 +326,59 @@ class Model(Geometry):
     calculating the model's bounding box for example.
     See the class GL.RenderModel on how to render Models using OpenGL.
     """
+    __slots__ = ("_packing", "_tex_coords", "_materials", "_faces",
+                 "_packed_faces", "_packed_layout", "_faces_need_packing",
+                 "_dirty_faces", "_changed_faces")
     _data_types = ('Faces', 'Vertices', 'Normals', 'TexCoords', 'Materials')
 
-    def __init__(self, **args):
+    def __init__(self, packing=PACK_LISTS, **args):
         """
         Construct a new Model instance.
         You may pass the parameters faces and materials in oder to initialize
         the model data during construction.
         Each argument has to pass an appropriate list (see the corresponding
         setters below for details).
+
+        *packing* selects how the data is stored and packed, either
+        :data:`PACK_LISTS` or :data:`PACK_ARRAYS`.
         """
+        if packing not in (PACK_LISTS, PACK_ARRAYS):
+            raise ValueError("Unknown packing mode: {0}".format(packing))
+        if packing == PACK_ARRAYS and numpy is None:
+            raise ValueError("Packing mode {0} requires numpy.".format(packing))
+        self._packing = packing
         super(Model, self).__init__()
         self.clear()
         self.set_data(**args)
 
+    def _coerce_floats(self, value):
+        if value is None or self._packing != PACK_ARRAYS:
+            return value
+        return numpy.ascontiguousarray(value, dtype=numpy.float32).reshape(-1)
+
+    def _coerce_faces(self, value):
+        """
+        Convert a face list into an integer array of shape
+        (faces, corners, 3), with -1 marking missing indices.
+        """
+        if len(value) == 0:
+            return numpy.zeros((0, 0, 3), dtype=numpy.intp)
+        if isinstance(value, numpy.ndarray) and value.dtype.kind in "iu":
+            faces = value
+        else:
+            # None becomes nan in a float array, which lets numpy do
+            # the conversion without touching each corner in python
+            try:
+                faces = numpy.array(value, dtype=numpy.float64)
+            except ValueError:
+                faces = None
+            if faces is None or faces.ndim != 3:
+                raise ValueError("Packing mode {0} requires all faces to"
+                                 " have the same number of corners.".format(
+                                     self._packing))
+            faces[numpy.isnan(faces)] = -1
+        return faces.astype(numpy.intp).reshape(len(value), -1, 3)
+
     def _copy(self, other):
         """
         Copy variables from another Model object.
@@ -92,29 +387,337 @@ class Model(Geometry):
         for dtype in self._data_types:
             setattr(self, dtype, getattr(other, dtype))
 
+    def _gather(self, source, components, indices):
+        """
+        Gather *components*-tuples from the flat array *source* at
+        *indices*. Index -1 yields zeros.
+        """
+        if source is None:
+            return numpy.zeros((len(indices), components), dtype=numpy.float32)
+        result = source.reshape(-1, components)[numpy.maximum(indices, 0)]
+        result[indices < 0] = 0
+        return result
+
+    def _attribute_sources(self):
+        return {"v": (3, self.Vertices, 0),
+                "t0": (2, self.TexCoords, 1),
+                "n": (3, self.Normals, 2)}
+
+    def _corner_layout(self, corners):
+        """
+        Return the interleaved vertex layout for the ``(v, t, n)`` index
+        rows *corners* as a list of ``(name, offset, components)``.
+        Texture coordinates and normals are left out if no corner
+        references them.
+        """
+        sources = self._attribute_sources()
+        layout = []
+        offset = 0
+        for name in ("v", "t0", "n"):
+            components, source, column = sources[name]
+            if name != "v" and (source is None or not (corners[:, column] >= 0).any()):
+                continue
+            layout.append((name, offset, components))
+            offset += components
+        return layout
+
+    def _pack_corners(self, corners, layout):
+        """
+        Gather the attributes of *corners* into one interleaved float32
+        array with one row per corner.
+        """
+        sources = self._attribute_sources()
+        stride = sum(components for _, _, components in layout)
+        data = numpy.empty((len(corners), stride), dtype=numpy.float32)
+        for name, offset, components in layout:
+            components, source, column = sources[name]
+            data[:, offset:offset+components] = self._gather(
+                source, components, corners[:, column])
+        return data
+
+    def _pack_faces_arrays(self):
+        """
+        Pack faces into a :class:`PackedFaceArrays` instance.
+        """
+        faces = self.Faces
+        corners = faces.reshape(-1, 3)
+        layout = self._corner_layout(corners)
+        self._packed_layout = layout
+        self._packed_faces = self._packed_face_arrays(
+            self._pack_corners(corners, layout), faces.shape[1], layout)
+        return self._packed_faces
+
+    def _packed_face_arrays(self, data, corners_per_face, layout):
+        views = dict((name, data[:, offset:offset+components])
+                     for name, offset, components in layout)
+        return PackedFaceArrays(
+            data,
+            corners_per_face,
+            ";".join("{0}:{1}".format(name, components)
+                     for name, _, components in layout),
+            views["v"], views.get("n"), views.get("t0"))
+
+    def iter_packed(self, faces_per_chunk=1024):
+        """
+        Pack the faces in chunks of *faces_per_chunk* faces and yield
+        ``(first_face, chunk)`` tuples, where *chunk* has the same format
+        as :attr:`PackedFaces` but covers only these faces. Nothing is
+        packed ahead of the consumer, so a large model can be loaded
+        over several frames. The chunks are not cached.
+        """
+        faces = self.Faces
+        if self._packing == PACK_ARRAYS:
+            layout = self._corner_layout(faces.reshape(-1, 3))
+        for start in range(0, len(faces), faces_per_chunk):
+            chunk = faces[start:start+faces_per_chunk]
+            if self._packing == PACK_ARRAYS:
+                corners = chunk.reshape(-1, 3)
+                yield start, self._packed_face_arrays(
+                    self._pack_corners(corners, layout), faces.shape[1],
+                    layout)
+            else:
+                yield start, [self._pack_face(face) for face in chunk]
+
+    def _repack_faces_arrays(self, indices):
+        """
+        Repack the faces at *indices* into the existing packed array.
+        """
+        packed = self._packed_faces
+        cpf = packed.CornersPerFace
+        indices = numpy.asarray(indices, dtype=numpy.intp)
+        rows = (indices[:, None] * cpf + numpy.arange(cpf)).reshape(-1)
+        corners = self.Faces[indices].reshape(-1, 3)
+        packed.Data[rows] = self._pack_corners(corners, self._packed_layout)
+
+    def _pack_face(self, face):
+        fvertices, ftexcoords, fnormals = \
+            array.array(b"f"), array.array(b"f"), array.array(b"f")
+        for elems in face:
+            vpos = elems[0]
+            fvertices.extend(self.Vertices[vpos*3:vpos*3+3])
+            if elems[1] is not None:
+                tpos = elems[1]
+                ftexcoords.extend(self.TexCoords[tpos*2:tpos*2+2])
+            if elems[2] is not None:
+                npos = elems[2]
+                fnormals.extend(self.Normals[npos*3:npos*3+3])
+        if None in fnormals: fnormals = None
+        if None in ftexcoords: ftexcoords = None
+        return (fvertices, fnormals, ftexcoords)
+
     def _pack_faces(self):
         """
         Pack faces into a convenient data structure.
         See the faces property below for details.
         """
-        self._packed_faces = []
-        for face in self.Faces:
-            fvertices, ftexcoords, fnormals = [], [], []
-            for elems in face:
-                vpos = elems[0]
-                fvertices.extend(self.Vertices[vpos*3:vpos*3+3])
-                if elems[1] is not None:
-                    tpos = elems[1]
-                    ftexcoords.extend(self.TexCoords[tpos*2:tpos*2+2])
-                if elems[2] is not None:
-                    npos = elems[2]
-                    fnormals.extend(self.Normals[npos*3:npos*3+3])
-            if None in fnormals: fnormals = None
-            if None in ftexcoords: ftexcoords = None
-            self._packed_faces.append((fvertices, fnormals, ftexcoords))
+        if self._packing == PACK_ARRAYS:
+            self._pack_faces_arrays()
+        else:
+            self._packed_faces = [self._pack_face(face) for face in self.Faces]
         self._faces_need_packing = False
+        self._dirty_faces = set()
+        self._changed_faces = set(range(len(self.Faces)))
         return self._packed_faces
 
+    def _repack_dirty_faces(self):
+        """
+        Repack only the faces which were changed using
+        :meth:`set_face` or :meth:`invalidate_faces`.
+        """
+        dirty = sorted(self._dirty_faces)
+        if self._packing == PACK_ARRAYS:
+            self._repack_faces_arrays(dirty)
+        else:
+            for index in dirty:
+                self._packed_faces[index] = self._pack_face(self.Faces[index])
+        self._changed_faces.update(dirty)
+        self._dirty_faces = set()
+
+    def _corners_per_face(self):
+        if self._packing == PACK_ARRAYS:
+            return self.Faces.shape[1]
+        counts = set(len(face) for face in self.Faces)
+        if len(counts) > 1:
+            raise ValueError("Indexed packing requires all faces to have"
+                             " the same number of corners.")
+        return counts.pop() if counts else 0
+
+    def _pack_indexed_arrays(self):
+        corners = self.Faces.reshape(-1, 3)
+        layout = self._corner_layout(corners)
+        data = self._pack_corners(corners, layout)
+        # compare whole rows as opaque byte strings, which is what a
+        # hash of the (position, texcoord, normal) tuple would do
+        rows = data.view(numpy.dtype((numpy.void, data.strides[0])))
+        _, first, inverse = numpy.unique(
+            rows.ravel(), return_index=True, return_inverse=True)
+        # keep the vertices in the order they are first used in
+        order = numpy.argsort(first, kind="mergesort")
+        remap = numpy.empty_like(order)
+        remap[order] = numpy.arange(len(order))
+        return IndexedFaces(data[first[order]],
+                            remap[inverse].astype(numpy.uint32),
+                            self.Faces.shape[1], layout)
+
+    def _pack_indexed_lists(self):
+        faces = self.Faces
+        layout = [("v", 0, 3)]
+        attributes = [(self.Vertices, 3, 0)]
+        for name, source, components, column in (
+                ("t0", self.TexCoords, 2, 1), ("n", self.Normals, 3, 2)):
+            if source is None or all(corner[column] is None
+                                     for face in faces for corner in face):
+                continue
+            layout.append((name, layout[-1][1] + layout[-1][2], components))
+            attributes.append((source, components, column))
+
+        data = array.array(b"f")
+        indices = array.array(b"I")
+        lookup = {}
+        for face in faces:
+            for corner in face:
+                key = ()
+                for source, components, column in attributes:
+                    pos = corner[column]
+                    if pos is None:
+                        key += (0.0,) * components
+                    else:
+                        key += tuple(source[pos*components:(pos+1)*components])
+                index = lookup.get(key)
+                if index is None:
+                    index = lookup[key] = len(lookup)
+                    data.extend(key)
+                indices.append(index)
+        return IndexedFaces(data, indices, self._corners_per_face(), layout)
+
+    def _optimize_indices(self, indexed, cache_size):
+        """
+        Reorder the triangles of *indexed* for the vertex cache. Faces
+        are only moved within their material, so
+        :meth:`material_ranges` stays valid.
+        """
+        if indexed.CornersPerFace != 3:
+            raise ValueError("Vertex cache optimization requires triangles.")
+        indices = indexed.Indices
+        bounds = set([0, len(indices)])
+        bounds.update(first for _, first, _ in self.material_ranges(3))
+        bounds = sorted(bounds)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            segment = VertexCache.optimize(indices[start:stop].tolist(),
+                                           cache_size)
+            if isinstance(indices, array.array):
+                segment = array.array(indices.typecode, segment)
+            indices[start:stop] = segment
+
+    def pack_indexed(self, optimize=False,
+                     cache_size=VertexCache.DEFAULT_CACHE_SIZE):
+        """
+        Pack the faces into a table of unique vertices and an index list
+        and return it as :class:`IndexedFaces`.
+
+        Face corners with equal position, texture coordinate and normal
+        share one vertex, so a mesh in which each vertex is used by
+        several faces needs only a fraction of the vertices
+        :attr:`PackedFaces` has. All faces must have the same number of
+        corners.
+
+        If *optimize* is true, the faces (which must be triangles) are
+        reordered for a vertex cache of *cache_size* entries using
+        :func:`VertexCache.optimize`, and the cache miss ratio before and
+        after is written to the ``model`` log channel.
+        """
+        if self._packing == PACK_ARRAYS:
+            indexed = self._pack_indexed_arrays()
+        else:
+            self._corners_per_face()
+            indexed = self._pack_indexed_lists()
+        if optimize:
+            before = indexed.acmr(cache_size)
+            self._optimize_indices(indexed, cache_size)
+            from Engine.CEngine.Log import server, Severity
+            server.getChannel("model").log(
+                Severity.Debug,
+                "vertex cache miss ratio: {0:.3f} -> {1:.3f}".format(
+                    before, indexed.acmr(cache_size)))
+        return indexed
+
+    def set_face(self, index, face):
+        """
+        Replace the face at *index* with *face* (same format as the
+        entries of :attr:`Faces`). Only this face is repacked on the next
+        access to :attr:`PackedFaces`, unless it references an attribute
+        the packed data does not hold yet.
+        """
+        if self._packing == PACK_ARRAYS:
+            face = self._coerce_faces([face])[0]
+            if len(face) != self._faces.shape[1]:
+                raise ValueError("Face must have {0} corners.".format(
+                    self._faces.shape[1]))
+            if not self._faces_need_packing and \
+                    self._adds_attribute(self._corner_layout(face)):
+                self._faces_need_packing = True
+        self._faces[index] = face
+        self._dirty_faces.add(index % len(self._faces))
+
+    def _adds_attribute(self, layout):
+        """
+        Return whether *layout* contains an attribute which is missing
+        from the layout of the packed faces.
+        """
+        packed = set(name for name, _, _ in self._packed_layout)
+        return any(name not in packed for name, _, _ in layout)
+
+    def invalidate_faces(self, start, stop=None):
+        """
+        Mark the faces from *start* up to (excluding) *stop* for
+        repacking, e.g. after modifying vertex data in place. If *stop*
+        is omitted, only the face at *start* is marked.
+        """
+        if stop is None:
+            stop = start + 1
+        self._dirty_faces.update(range(start, stop))
+
+    def changed_face_ranges(self):
+        """
+        Return the faces which changed since the last call as a sorted
+        list of ``(start, stop)`` ranges and reset the change tracking.
+        Pending changes are packed first.
+        """
+        self.PackedFaces
+        ranges = []
+        for index in sorted(self._changed_faces):
+            if ranges and ranges[-1][1] == index:
+                ranges[-1][1] = index + 1
+            else:
+                ranges.append([index, index + 1])
+        self._changed_faces = set()
+        return [tuple(r) for r in ranges]
+
+    def upload(self, view):
+        """
+        Write the packed data of all faces which changed since the last
+        upload into the :class:`GeometryBufferView` *view*, which must
+        cover one vertex per face corner. Each changed range is written
+        with one slice assignment per attribute, so the buffer only
+        marks these vertices dirty and transfers them on the next flush.
+
+        Only supported with :data:`PACK_ARRAYS` packing.
+        """
+        if self._packing != PACK_ARRAYS:
+            raise ValueError("Upload requires packing mode {0}.".format(
+                PACK_ARRAYS))
+        packed = self.PackedFaces
+        cpf = packed.CornersPerFace
+        targets = [(view.Vertex, packed.Vertices),
+                   (view.TexCoord(0), packed.TexCoords),
+                   (view.Normal, packed.Normals)]
+        targets = [(attrib, source) for attrib, source in targets
+                   if attrib is not None and source is not None]
+        for start, stop in self.changed_face_ranges():
+            for attrib, source in targets:
+                attrib[start*cpf:stop*cpf].set(
+                    numpy.ascontiguousarray(source[start*cpf:stop*cpf]))
+
     def clear(self):
         """
         Clear all model data.
@@ -124,6 +727,8 @@ class Model(Geometry):
             self.__setattr__(dtype, None)
         self._packed_faces = []
         self._faces_need_packing = False
+        self._dirty_faces = set()
+        self._changed_faces = set()
 
     def set_data(self, **args):
         arguments = dict((x[0].upper()+x[1:], y) for (x,y) in dict(**args).iteritems())
@@ -137,7 +742,7 @@ class Model(Geometry):
 
     @TexCoords.setter
     def TexCoords(self, value):
-        self._tex_coords = value
+        self._tex_coords = self._coerce_floats(value)
         self._faces_need_packing = True
  
     @property
@@ -179,15 +784,248 @@ class Model(Geometry):
         texture coordinates (2 per vertex).
         """
         if value is None: value = []
+        if self._packing == PACK_ARRAYS:
+            value = self._coerce_faces(value)
         self._faces = value
         self._faces_need_packing = True
 
+    @property
+    def Packing(self):
+        """
+        The packing mode this model was created with.
+        """
+        return self._packing
+
     @property
     def PackedFaces(self):
         """
-        Return a list of packed face data.
+        Return a list of packed face data. Each entry is a tuple of
+        float arrays ``(vertices, normals, texcoords)`` for one face.
+
+        In :data:`PACK_ARRAYS` mode, a :class:`PackedFaceArrays`
+        instance is returned instead.
         """
         if self._faces_need_packing:
             self._pack_faces()
+        elif self._dirty_faces:
+            self._repack_dirty_faces()
         return self._packed_faces
 
+    def simplified(self, ratio):
+        """
+        Return a new :class:`Model` with about *ratio* times as many
+        faces as this one, reduced with :func:`Simplify.collapse_edges`.
+        The faces must be triangles. Texture coordinates and normals are
+        taken over from the surviving face corners.
+        """
+        if self._corners_per_face() not in (0, 3):
+            raise ValueError("Simplification requires triangles.")
+        faces = self.Faces
+        if self._packing == PACK_ARRAYS:
+            faces = faces.tolist()
+        vertices = self.Vertices if self.Vertices is not None else []
+        if self._packing == PACK_ARRAYS:
+            vertices = vertices.tolist()
+        new_vertices, kept = Simplify.collapse_edges(
+            vertices,
+            [[corner[0] for corner in face] for face in faces],
+            max(1, int(len(faces) * ratio)))
+
+        new_faces = []
+        for face, indices in kept:
+            new_faces.append([(v,) + tuple(corner[1:])
+                              for v, corner in zip(indices, faces[face])])
+        originals = [face for face, _ in kept]
+        # a material starts at the first surviving face at or after its
+        # original start
+        materials = [[name, bisect.bisect_left(originals, face)]
+                     for name, face in self.Materials]
+        return Model(packing=self._packing,
+                     vertices=new_vertices,
+                     normals=self.Normals,
+                     texCoords=self.TexCoords,
+                     faces=new_faces,
+                     materials=materials)
+
+    def lod_chain(self, ratios=(0.5, 0.25, 0.125)):
+        """
+        Return a list of simplified models, one per entry of *ratios*,
+        which give the face count relative to this model. Each level is
+        derived from the previous one, so the ratios must be decreasing.
+        """
+        chain = []
+        source, source_ratio = self, 1.0
+        for ratio in ratios:
+            if ratio > source_ratio:
+                raise ValueError("LOD ratios must be decreasing.")
+            source = source.simplified(ratio / source_ratio)
+            source_ratio = ratio
+            chain.append(source)
+        return chain
+
+    def material_ranges(self, corners_per_face):
+        """
+        Convert :attr:`Materials` into a list of ``(name, first, count)``
+        tuples, where *first* and *count* are given in face corners.
+        """
+        total = len(self.Faces) * corners_per_face
+        materials = sorted(self.Materials, key=lambda material: material[1])
+        ranges = []
+        for i, (name, face) in enumerate(materials):
+            first = face * corners_per_face
+            if i + 1 < len(materials):
+                stop = materials[i+1][1] * corners_per_face
+            else:
+                stop = total
+            ranges.append((name, first, stop - first))
+        return ranges
+
+    def save_binary(self, f, optimize=False):
+        """
+        Write the faces of this model to the file object *f* in the
+        binary model format (see :class:`BinaryModel`), using the vertex
+        table and indices of :meth:`pack_indexed`, which is passed
+        *optimize*. The model must use :data:`PACK_ARRAYS` packing.
+        """
+        if self._packing != PACK_ARRAYS:
+            raise ValueError("Binary export requires packing mode {0}.".format(
+                PACK_ARRAYS))
+        indexed = self.pack_indexed(optimize)
+        write_binary(f,
+                     indexed.VertexFormat,
+                     indexed.Data,
+                     indexed.Indices,
+                     self.material_ranges(indexed.CornersPerFace))
+
+BINARY_MAGIC = b"PYUM"
+BINARY_VERSION = 1
+
+# magic, version, header size, vertex count, vertex size, index count,
+# material count, vertex format length, flags, vertex data offset,
+# index data offset, material table offset
+_BINARY_HEADER = struct.Struct(b"<4sHHIIIIIIQQQ")
+# material name, first index, index count
+_BINARY_MATERIAL = struct.Struct(b"<64sII")
+_BINARY_ALIGNMENT = 16
+
+def _align(offset):
+    return (offset + _BINARY_ALIGNMENT - 1) // _BINARY_ALIGNMENT * _BINARY_ALIGNMENT
+
+def write_binary(f, vertex_format, vertices, indices, materials):
+    """
+    Write a binary model to the file object *f*.
+
+    *vertex_format* is a format specifier as accepted by
+    :func:`Engine.CEngine.GL.VertexFormat`, *vertices* a two-dimensional
+    float32 array with one interleaved vertex per row, *indices* a
+    sequence of vertex indices and *materials* a list of
+    ``(name, first, count)`` tuples giving the index range for each
+    material.
+    """
+    vertices = numpy.ascontiguousarray(vertices, dtype=numpy.float32)
+    indices = numpy.ascontiguousarray(indices, dtype=numpy.uint32)
+    vertex_format = vertex_format.encode("ascii")
+
+    vertex_offset = _align(_BINARY_HEADER.size + len(vertex_format))
+    index_offset = _align(vertex_offset + vertices.nbytes)
+    material_offset = _align(index_offset + indices.nbytes)
+
+    chunks = [
+        (0, _BINARY_HEADER.pack(
+            BINARY_MAGIC, BINARY_VERSION, _BINARY_HEADER.size,
+            len(vertices), vertices.itemsize * vertices.shape[1],
+            len(indices), len(materials), len(vertex_format), 0,
+            vertex_offset, index_offset, material_offset)),
+        (_BINARY_HEADER.size, vertex_format),
+        (vertex_offset, vertices.tobytes()),
+        (index_offset, indices.tobytes()),
+        (material_offset, b"".join(
+            _BINARY_MATERIAL.pack(name.encode("utf-8"), first, count)
+            for name, first, count in materials)),
+    ]
+    position = 0
+    for offset, data in chunks:
+        f.write(b"\0" * (offset - position))
+        f.write(data)
+        position = offset + len(data)
+
+class BinaryModel(object):
+    """
+    Memory-mapped view on a binary model file at *path*.
+
+    The file starts with a fixed header, followed by the vertex format
+    specifier, the interleaved vertex data, the index block and the
+    material table. Each block starts at a 16 byte aligned offset which
+    is stored in the header, so opening a file does not parse any of the
+    data: :attr:`Vertices` and :attr:`Indices` are read-only numpy views
+    on the mapped file.
+
+    Files are written by :func:`write_binary`, :meth:`Model.save_binary`
+    and the Blender exporter.
+    """
+
+    def __init__(self, path):
+        if numpy is None:
+            raise ValueError("Reading binary models requires numpy.")
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except:
+            self._file.close()
+            raise
+        try:
+            self._read_header()
+        except:
+            self.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < _BINARY_HEADER.size:
+            raise ValueError("File too short for a binary model.")
+        (magic, version, header_size, vertex_count, vertex_size,
+         index_count, material_count, format_length, flags,
+         vertex_offset, index_offset, material_offset) = \
+            _BINARY_HEADER.unpack_from(self._map, 0)
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a binary model file.")
+        if version != BINARY_VERSION:
+            raise ValueError("Unsupported binary model version: {0}".format(
+                version))
+        if material_offset + material_count * _BINARY_MATERIAL.size > len(self._map):
+            raise ValueError("Binary model file is truncated.")
+
+        self.VertexFormat = self._map[header_size:header_size+format_length].decode("ascii")
+        self.VertexSize = vertex_size
+        floats = vertex_size // numpy.dtype(numpy.float32).itemsize
+        self.Vertices = numpy.frombuffer(
+            self._map, dtype=numpy.float32,
+            count=vertex_count * floats,
+            offset=vertex_offset).reshape(vertex_count, floats)
+        self.Indices = numpy.frombuffer(
+            self._map, dtype=numpy.uint32,
+            count=index_count,
+            offset=index_offset)
+        self.Materials = []
+        for i in range(material_count):
+            name, first, count = _BINARY_MATERIAL.unpack_from(
+                self._map, material_offset + i * _BINARY_MATERIAL.size)
+            self.Materials.append(
+                (name.rstrip(b"\0").decode("utf-8"), first, count))
+
+    def close(self):
+        """
+        Release the mapping. Views handed out before must not be used
+        afterwards.
+        """
+        self.Vertices = None
+        self.Indices = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
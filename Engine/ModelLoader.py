@@ -0,0 +1,152 @@
+# File name: ModelLoader.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Loading of many models in parallel using a :mod:`multiprocessing` pool.
+
+The worker processes parse and pack each model and write it into a
+binary model file (see :class:`Model.BinaryModel`). Only the file name
+travels back to the main process, which maps the file instead of
+unpickling the packed arrays.
+"""
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from Model import BinaryModel
+
+def _load_worker(args):
+    parser, path, target, optimize = args
+    model = parser(path)
+    with open(target, "wb") as f:
+        model.save_binary(f, optimize)
+    return target
+
+class LoadJob(object):
+    """
+    A set of models being loaded by a :class:`ModelLoader`. Call
+    :meth:`poll` regularly (e.g. once per frame) to collect the models
+    which are done; they are stored in :attr:`Models` by path.
+    """
+
+    def __init__(self, pending, progress):
+        self._pending = pending
+        self._progress = progress
+        self.Total = len(pending)
+        self.Models = {}
+
+    @property
+    def Done(self):
+        return not self._pending
+
+    def _collect(self, path, result):
+        target = result.get()
+        try:
+            self.Models[path] = BinaryModel(target)
+        finally:
+            # the mapping stays valid after the name is gone
+            os.unlink(target)
+        if self._progress is not None:
+            self._progress(len(self.Models), self.Total, path)
+
+    def poll(self):
+        """
+        Collect all models which finished loading, calling the progress
+        callback for each, and return :attr:`Done`. This never blocks.
+        Errors raised by the parser are re-raised here.
+        """
+        still_pending = []
+        for i, (path, result) in enumerate(self._pending):
+            if not result.ready():
+                still_pending.append((path, result))
+                continue
+            try:
+                self._collect(path, result)
+            except:
+                self._pending = still_pending + self._pending[i+1:]
+                raise
+        self._pending = still_pending
+        return self.Done
+
+    def wait(self):
+        """
+        Block until all models are loaded and return :attr:`Models`.
+        """
+        while self._pending:
+            path, result = self._pending.pop(0)
+            self._collect(path, result)
+        return self.Models
+
+class ModelLoader(object):
+    """
+    Load models on a pool of *processes* worker processes (defaults to
+    the number of CPUs).
+
+    *parser* is called in the workers with a path and must return a
+    :class:`Model.Model` using :data:`Model.PACK_ARRAYS` packing. It has
+    to be picklable, i.e. a module level function. If *optimize* is
+    true, the triangle order is optimized for the vertex cache (see
+    :meth:`Model.Model.pack_indexed`).
+    """
+
+    def __init__(self, parser, processes=None, optimize=False):
+        self._parser = parser
+        self._optimize = optimize
+        self._pool = multiprocessing.Pool(processes)
+        self._directory = tempfile.mkdtemp(prefix="pyengine-models-")
+        self._counter = 0
+
+    def load(self, paths, progress=None):
+        """
+        Start loading the models at *paths* and return a
+        :class:`LoadJob`. *progress* is called from :meth:`LoadJob.poll`
+        as ``progress(done, total, path)`` whenever a model was loaded.
+        """
+        pending = []
+        for path in paths:
+            self._counter += 1
+            target = os.path.join(self._directory,
+                                  "{0}.pyum".format(self._counter))
+            pending.append((path, self._pool.apply_async(
+                _load_worker,
+                ((self._parser, path, target, self._optimize),))))
+        return LoadJob(pending, progress)
+
+    def close(self):
+        """
+        Stop the worker processes and remove left over files.
+        """
+        self._pool.terminate()
+        self._pool.join()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
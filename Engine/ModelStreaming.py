@@ -0,0 +1,146 @@
+# File name: ModelStreaming.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Upload of large models into a :class:`GeometryBuffer` spread over
+several frames.
+"""
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import time
+
+from Model import PACK_ARRAYS, numpy
+
+class StreamingUpload(object):
+    """
+    Pack the faces of *model* in chunks of *faces_per_chunk* faces (see
+    :meth:`Model.Model.iter_packed`) and write them into the
+    :class:`GeometryBufferView` *view*, which must cover one vertex per
+    face corner.
+
+    Call :meth:`step` once per frame. It uploads chunks until *budget*
+    seconds are used up, so the frame time stays bounded no matter how
+    large the model is.
+    """
+
+    def __init__(self, model, view, faces_per_chunk=1024, budget=0.004):
+        self._model = model
+        self._view = view
+        self._chunks = model.iter_packed(faces_per_chunk)
+        self._budget = budget
+        self._chunk_time = 0.0
+        self._corner = 0
+        self.FacesUploaded = 0
+        self.Done = len(model.Faces) == 0
+
+    @classmethod
+    def for_buffer(cls, model, buffer, **kwargs):
+        """
+        Allocate the vertices for *model* in the :class:`GeometryBuffer`
+        *buffer* and return an upload into them. The view is available
+        as :attr:`View`.
+        """
+        from Engine.CEngine.GL import GeometryBufferView
+        handle = buffer.allocateVertices(corner_count(model))
+        return cls(model, GeometryBufferView(buffer, handle), **kwargs)
+
+    @property
+    def View(self):
+        return self._view
+
+    @property
+    def Progress(self):
+        """
+        Fraction of the faces uploaded so far.
+        """
+        if len(self._model.Faces) == 0:
+            return 1.0
+        return self.FacesUploaded / len(self._model.Faces)
+
+    def _targets(self):
+        view = self._view
+        return [(view.Vertex, 0, 3), (view.TexCoord(0), 2, 2),
+                (view.Normal, 1, 3)]
+
+    def _upload(self, chunk):
+        """
+        Write *chunk* behind the previously uploaded corners and return
+        its number of faces.
+        """
+        first = self._corner
+        if self._model.Packing == PACK_ARRAYS:
+            count = len(chunk.Data)
+            sources = (chunk.Vertices, chunk.Normals, chunk.TexCoords)
+            for attrib, index, _ in self._targets():
+                if attrib is not None and sources[index] is not None:
+                    attrib[first:first+count].set(
+                        numpy.ascontiguousarray(sources[index]))
+        else:
+            count = sum(len(face[0]) // 3 for face in chunk)
+            for attrib, index, components in self._targets():
+                if attrib is None:
+                    continue
+                values = [value for face in chunk for value in face[index]]
+                # faces without this attribute leave it unset
+                if len(values) == count * components:
+                    attrib[first:first+count].set(values)
+        self._corner = first + count
+        return len(chunk)
+
+    def step(self, budget=None):
+        """
+        Upload chunks until *budget* (defaults to the budget given to
+        the constructor) seconds have passed or the next chunk is not
+        expected to fit anymore. At least one chunk is uploaded per
+        call. Return :attr:`Done`.
+        """
+        if budget is None:
+            budget = self._budget
+        start = time.time()
+        while not self.Done:
+            chunk_start = time.time()
+            try:
+                _, chunk = next(self._chunks)
+            except StopIteration:
+                self.Done = True
+                break
+            self.FacesUploaded += self._upload(chunk)
+            now = time.time()
+            # smoothed time per chunk, to predict whether another one fits
+            self._chunk_time = 0.75 * self._chunk_time + 0.25 * (now - chunk_start)
+            if self.FacesUploaded == len(self._model.Faces):
+                self.Done = True
+            elif now - start + self._chunk_time > budget:
+                break
+        return self.Done
+
+def corner_count(model):
+    """
+    Return the number of face corners, i.e. vertices needed to upload
+    *model* without an index buffer.
+    """
+    if model.Packing == PACK_ARRAYS:
+        return model.Faces.shape[0] * model.Faces.shape[1]
+    return sum(len(face) for face in model.Faces)
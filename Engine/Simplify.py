@@ -0,0 +1,202 @@
+# File name: Simplify.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Mesh simplification by edge collapse, guided by quadric error metrics
+(Garland and Heckbert, "Surface Simplification Using Quadric Error
+Metrics").
+"""
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import heapq
+
+BOUNDARY_WEIGHT = 1000.0
+"""
+Weight of the planes which keep open mesh borders in place, relative to
+the planes of the faces.
+"""
+
+def _sub(a, b):
+    return (a[0]-b[0], a[1]-b[1], a[2]-b[2])
+
+def _cross(a, b):
+    return (a[1]*b[2] - a[2]*b[1],
+            a[2]*b[0] - a[0]*b[2],
+            a[0]*b[1] - a[1]*b[0])
+
+def _dot(a, b):
+    return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+
+def _plane_quadric(normal, point, weight):
+    """
+    Return the quadric of the plane through *point* with unit *normal*
+    as the ten coefficients of the symmetric 4x4 matrix.
+    """
+    a, b, c = normal
+    d = -_dot(normal, point)
+    return [weight * v for v in (a*a, a*b, a*c, a*d,
+                                 b*b, b*c, b*d,
+                                 c*c, c*d,
+                                 d*d)]
+
+def _add_quadric(q, other):
+    for i in range(10):
+        q[i] += other[i]
+
+def _error(q, p):
+    x, y, z = p
+    return (q[0]*x*x + 2*q[1]*x*y + 2*q[2]*x*z + 2*q[3]*x
+            + q[4]*y*y + 2*q[5]*y*z + 2*q[6]*y
+            + q[7]*z*z + 2*q[8]*z
+            + q[9])
+
+def _face_normal(p0, p1, p2):
+    return _cross(_sub(p1, p0), _sub(p2, p0))
+
+def collapse_edges(vertices, triangles, target):
+    """
+    Simplify a triangle mesh by collapsing edges until at most *target*
+    triangles are left or no edge can be collapsed any more.
+
+    *vertices* is a flat sequence of positions (three values each) and
+    *triangles* a sequence of position index triples. Return a flat list
+    of the remaining positions and a list of ``(triangle, indices)``
+    tuples, where *triangle* is the index of a surviving input triangle
+    and *indices* its new position indices.
+
+    Collapses which would flip a face are skipped, and open borders get
+    heavily weighted planes so the outline of the mesh is kept.
+    """
+    count = len(vertices) // 3
+    positions = [tuple(vertices[i*3:i*3+3]) for i in range(count)]
+    tris = [list(triangle) for triangle in triangles]
+    alive = [True] * len(tris)
+    vertex_tris = [set() for i in range(count)]
+    quadrics = [[0.0] * 10 for i in range(count)]
+    edge_use = {}
+
+    for t, (a, b, c) in enumerate(tris):
+        for v in (a, b, c):
+            vertex_tris[v].add(t)
+        normal = _face_normal(positions[a], positions[b], positions[c])
+        length = _dot(normal, normal) ** 0.5
+        for edge in ((a, b), (b, c), (c, a)):
+            key = (min(edge), max(edge))
+            edge_use[key] = edge_use.get(key, 0) + 1
+        if length == 0:
+            continue
+        unit = tuple(n / length for n in normal)
+        # weight by area, so large faces dominate the error
+        q = _plane_quadric(unit, positions[a], length / 2)
+        for v in (a, b, c):
+            _add_quadric(quadrics[v], q)
+
+    for t, (a, b, c) in enumerate(tris):
+        normal = _face_normal(positions[a], positions[b], positions[c])
+        for u, v in ((a, b), (b, c), (c, a)):
+            if edge_use[(min(u, v), max(u, v))] != 1:
+                continue
+            edge = _sub(positions[v], positions[u])
+            border = _cross(edge, normal)
+            length = _dot(border, border) ** 0.5
+            if length == 0:
+                continue
+            border = tuple(n / length for n in border)
+            q = _plane_quadric(border, positions[u],
+                               BOUNDARY_WEIGHT * _dot(edge, edge))
+            _add_quadric(quadrics[u], q)
+            _add_quadric(quadrics[v], q)
+
+    stamps = [0] * count
+    heap = []
+
+    def push(a, b):
+        q = list(quadrics[a])
+        _add_quadric(q, quadrics[b])
+        pa, pb = positions[a], positions[b]
+        midpoint = tuple((x + y) / 2 for x, y in zip(pa, pb))
+        cost, target_pos = min((_error(q, p), p) for p in (pa, pb, midpoint))
+        heapq.heappush(heap, (cost, a, b, target_pos, stamps[a], stamps[b]))
+
+    for a, b in edge_use:
+        push(a, b)
+
+    def flips(v, removed, target_pos):
+        for t in vertex_tris[v]:
+            if t in removed:
+                continue
+            corners = [positions[i] for i in tris[t]]
+            before = _face_normal(*corners)
+            if _dot(before, before) == 0:
+                continue
+            corners[tris[t].index(v)] = target_pos
+            if _dot(before, _face_normal(*corners)) <= 0:
+                return True
+        return False
+
+    live = sum(alive)
+    while live > target and heap:
+        cost, a, b, target_pos, stamp_a, stamp_b = heapq.heappop(heap)
+        if stamps[a] != stamp_a or stamps[b] != stamp_b:
+            continue
+        shared = vertex_tris[a] & vertex_tris[b]
+        if not shared:
+            continue
+        if flips(a, shared, target_pos) or flips(b, shared, target_pos):
+            continue
+
+        for t in shared:
+            alive[t] = False
+            live -= 1
+            for v in tris[t]:
+                vertex_tris[v].discard(t)
+        for t in vertex_tris[b]:
+            tris[t][tris[t].index(b)] = a
+            vertex_tris[a].add(t)
+        vertex_tris[b] = set()
+        positions[a] = target_pos
+        _add_quadric(quadrics[a], quadrics[b])
+        stamps[a] += 1
+        stamps[b] += 1
+
+        neighbours = set(v for t in vertex_tris[a] for v in tris[t])
+        neighbours.discard(a)
+        for v in neighbours:
+            push(min(a, v), max(a, v))
+
+    remap = {}
+    result_vertices = []
+    result_tris = []
+    for t, triangle in enumerate(tris):
+        if not alive[t]:
+            continue
+        indices = []
+        for v in triangle:
+            if v not in remap:
+                remap[v] = len(remap)
+                result_vertices.extend(positions[v])
+            indices.append(remap[v])
+        result_tris.append((t, tuple(indices)))
+    return result_vertices, result_tris
@@ -0,0 +1,156 @@
+# File name: VertexCache.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Reordering of triangle index lists for the post-transform vertex cache
+of the graphics card, using Tom Forsyth's "Linear-Speed Vertex Cache
+Optimisation" heuristic.
+"""
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import collections
+
+DEFAULT_CACHE_SIZE = 32
+"""
+Number of vertices the optimizer assumes to fit into the vertex cache.
+"""
+
+_CACHE_DECAY_POWER = 1.5
+_LAST_TRIANGLE_SCORE = 0.75
+_VALENCE_BOOST_SCALE = 2.0
+_VALENCE_BOOST_POWER = 0.5
+
+def acmr(indices, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Return the average cache miss ratio of the triangle list *indices*,
+    i.e. the number of vertices transformed per triangle, for a FIFO
+    vertex cache holding *cache_size* vertices. The result lies between
+    0.5 (ideal for large regular meshes) and 3.
+    """
+    triangles = len(indices) // 3
+    if triangles == 0:
+        return 0.0
+    fifo = collections.deque()
+    cached = set()
+    misses = 0
+    for index in indices[:triangles*3]:
+        if index in cached:
+            continue
+        misses += 1
+        fifo.append(index)
+        cached.add(index)
+        if len(fifo) > cache_size:
+            cached.discard(fifo.popleft())
+    return misses / triangles
+
+def _vertex_score(cache_position, remaining, cache_size):
+    if remaining == 0:
+        return -1.0
+    score = 0.0
+    if cache_position >= 0:
+        if cache_position < 3:
+            # the vertices of the last triangle get a fixed score, so the
+            # next triangle is not forced to reuse all of them
+            score = _LAST_TRIANGLE_SCORE
+        else:
+            scaler = 1.0 / (cache_size - 3)
+            score = (1.0 - (cache_position - 3) * scaler) ** _CACHE_DECAY_POWER
+    # prefer vertices with few triangles left, so that they are
+    # finished off instead of being left as isolated triangles
+    return score + _VALENCE_BOOST_SCALE * remaining ** -_VALENCE_BOOST_POWER
+
+def optimize(indices, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Reorder the triangles of the triangle list *indices* for a vertex
+    cache of *cache_size* vertices and return the new index list.
+
+    Each triangle keeps its vertices in the original order, so the
+    winding is preserved. Trailing indices which do not form a full
+    triangle are dropped.
+    """
+    triangles = [tuple(indices[i:i+3]) for i in range(0, len(indices) // 3 * 3, 3)]
+    if not triangles:
+        return []
+
+    vertex_triangles = collections.defaultdict(list)
+    for t, triangle in enumerate(triangles):
+        for vertex in triangle:
+            vertex_triangles[vertex].append(t)
+    remaining = dict((vertex, len(tris))
+                     for vertex, tris in vertex_triangles.items())
+    position = dict.fromkeys(vertex_triangles, -1)
+    score = dict((vertex, _vertex_score(-1, count, cache_size))
+                 for vertex, count in remaining.items())
+    triangle_score = [sum(score[vertex] for vertex in triangle)
+                      for triangle in triangles]
+    added = [False] * len(triangles)
+
+    result = []
+    cache = []
+    best = max(range(len(triangles)), key=triangle_score.__getitem__)
+    scan_start = 0
+    while True:
+        triangle = triangles[best]
+        result.extend(triangle)
+        added[best] = True
+        for vertex in triangle:
+            vertex_triangles[vertex].remove(best)
+            remaining[vertex] -= 1
+
+        # move the triangle's vertices to the front of the cache, the
+        # entries falling off the end are evicted
+        new_cache = list(triangle)
+        new_cache.extend(vertex for vertex in cache if vertex not in triangle)
+        for vertex in new_cache[cache_size:]:
+            position[vertex] = -1
+            score[vertex] = _vertex_score(-1, remaining[vertex], cache_size)
+        cache = new_cache[:cache_size]
+
+        touched = set()
+        for i, vertex in enumerate(cache):
+            position[vertex] = i
+            score[vertex] = _vertex_score(i, remaining[vertex], cache_size)
+            touched.update(vertex_triangles[vertex])
+        for vertex in new_cache[cache_size:]:
+            touched.update(vertex_triangles[vertex])
+
+        best = None
+        best_score = -1.0
+        for t in touched:
+            triangle_score[t] = sum(score[vertex] for vertex in triangles[t])
+            if triangle_score[t] > best_score:
+                best, best_score = t, triangle_score[t]
+
+        if best is None:
+            # nothing in the cache has triangles left, continue with the
+            # next triangle in input order; searching the whole mesh for
+            # the best one would make meshes with many disconnected
+            # pieces quadratic
+            while scan_start < len(triangles) and added[scan_start]:
+                scan_start += 1
+            if scan_start == len(triangles):
+                break
+            best = scan_start
+    return result
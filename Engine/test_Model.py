@@ -0,0 +1,377 @@
+# File name: test_Model.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import os
+import tempfile
+import unittest
+
+from Model import Model, BinaryModel, BoundingVolume, \
+    PACK_LISTS, PACK_ARRAYS, numpy
+
+def quad_model(**kwargs):
+    """
+    Two triangles forming the unit square, with texture coordinates
+    and one shared normal.
+    """
+    return Model(
+        vertices=[0.0, 0.0, 0.0,
+                  1.0, 0.0, 0.0,
+                  1.0, 1.0, 0.0,
+                  0.0, 1.0, 0.0],
+        texCoords=[0.0, 0.0,
+                   1.0, 0.0,
+                   1.0, 1.0,
+                   0.0, 1.0],
+        normals=[0.0, 0.0, 1.0],
+        faces=[[(0, 0, 0), (1, 1, 0), (2, 2, 0)],
+               [(0, 0, 0), (2, 2, 0), (3, 3, 0)]],
+        **kwargs)
+
+class ListPacking(unittest.TestCase):
+    def test_pack(self):
+        model = quad_model()
+        self.assertEqual(model.Packing, PACK_LISTS)
+        packed = model.PackedFaces
+        self.assertEqual(len(packed), 2)
+        vertices, normals, texcoords = packed[1]
+        self.assertSequenceEqual(vertices, [0.0, 0.0, 0.0,
+                                            1.0, 1.0, 0.0,
+                                            0.0, 1.0, 0.0])
+        self.assertSequenceEqual(normals, [0.0, 0.0, 1.0]*3)
+        self.assertSequenceEqual(texcoords, [0.0, 0.0, 1.0, 1.0, 0.0, 1.0])
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, Model, packing="foo")
+
+    def test_slots(self):
+        model = quad_model()
+        self.assertFalse(hasattr(model, "__dict__"))
+        self.assertRaises(AttributeError, setattr, model, "Foo", 1)
+
+@unittest.skipIf(numpy is None, "numpy is not available")
+class ArrayPacking(unittest.TestCase):
+    def test_matches_lists(self):
+        reference = quad_model().PackedFaces
+        packed = quad_model(packing=PACK_ARRAYS).PackedFaces
+        self.assertEqual(len(packed), len(reference))
+        for (v, n, t), (rv, rn, rt) in zip(packed, reference):
+            self.assertSequenceEqual(v.ravel().tolist(), rv)
+            self.assertSequenceEqual(n.ravel().tolist(), rn)
+            self.assertSequenceEqual(t.ravel().tolist(), rt)
+
+    def test_layout(self):
+        packed = quad_model(packing=PACK_ARRAYS).PackedFaces
+        self.assertEqual(packed.VertexFormat, "v:3;t0:2;n:3")
+        self.assertEqual(packed.Data.dtype, numpy.float32)
+        self.assertEqual(packed.Data.shape, (6, 8))
+        self.assertTrue(packed.Data.flags.c_contiguous)
+        # attribute views must share memory with the interleaved data
+        for view in (packed.Vertices, packed.TexCoords, packed.Normals):
+            self.assertIs(view.base, packed.Data)
+
+    def test_missing_attributes(self):
+        model = Model(packing=PACK_ARRAYS,
+                      vertices=[0.0, 0.0, 0.0,
+                                1.0, 0.0, 0.0,
+                                0.0, 1.0, 0.0],
+                      faces=[[(0, None, None), (1, None, None),
+                              (2, None, None)]])
+        packed = model.PackedFaces
+        self.assertEqual(packed.VertexFormat, "v:3")
+        self.assertIsNone(packed.Normals)
+        self.assertIsNone(packed.TexCoords)
+        self.assertEqual(packed[0][0].ravel().tolist(),
+                         [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0])
+
+    def test_mixed_corner_counts(self):
+        model = Model(packing=PACK_ARRAYS)
+        self.assertRaises(ValueError, setattr, model, "Faces",
+                          [[(0, None, None)] * 3, [(0, None, None)] * 4])
+
+    def test_repack_on_change(self):
+        model = quad_model(packing=PACK_ARRAYS)
+        model.PackedFaces
+        model.TexCoords = [0.5, 0.5] * 4
+        self.assertEqual(model.PackedFaces.TexCoords.ravel().tolist(),
+                         [0.5] * 12)
+
+class IncrementalListPacking(unittest.TestCase):
+    def test_set_face(self):
+        model = quad_model()
+        model.PackedFaces
+        self.assertSequenceEqual(model.changed_face_ranges(), [(0, 2)])
+        # modify vertex data in place; only faces set explicitly pick
+        # up the change
+        model.Vertices[0:3] = [5.0, 5.0, 5.0]
+        model.set_face(1, [(0, 0, 0), (2, 2, 0), (3, 3, 0)])
+        packed = model.PackedFaces
+        self.assertSequenceEqual(packed[0][0][0:3], [0.0, 0.0, 0.0])
+        self.assertSequenceEqual(packed[1][0][0:3], [5.0, 5.0, 5.0])
+        self.assertSequenceEqual(model.changed_face_ranges(), [(1, 2)])
+        self.assertSequenceEqual(model.changed_face_ranges(), [])
+
+class FakeAttribute(object):
+    def __init__(self, writes):
+        self.writes = writes
+
+    def __getitem__(self, key):
+        return FakeSlice(self.writes, key)
+
+class FakeSlice(object):
+    def __init__(self, writes, key):
+        self.writes = writes
+        self.key = key
+
+    def set(self, data):
+        if not isinstance(data, list):
+            # float32 arrays are passed through the buffer protocol
+            data = data.ravel().tolist()
+        self.writes.append((self.key.start, self.key.stop, data))
+
+class FakeView(object):
+    def __init__(self):
+        self.writes = []
+        self.Vertex = FakeAttribute(self.writes)
+        self.Normal = None
+
+    def TexCoord(self, index):
+        return None
+
+@unittest.skipIf(numpy is None, "numpy is not available")
+class IncrementalArrayPacking(unittest.TestCase):
+    def test_set_face(self):
+        model = quad_model(packing=PACK_ARRAYS)
+        model.PackedFaces
+        model.Vertices[0:3] = [5.0, 5.0, 5.0]
+        model.set_face(1, [(0, 0, 0), (2, 2, 0), (3, 3, 0)])
+        packed = model.PackedFaces
+        self.assertEqual(packed.Vertices[0].tolist(), [0.0, 0.0, 0.0])
+        self.assertEqual(packed.Vertices[3].tolist(), [5.0, 5.0, 5.0])
+
+    def test_set_face_new_attribute(self):
+        model = Model(packing=PACK_ARRAYS,
+                      vertices=[0.0, 0.0, 0.0,
+                                1.0, 0.0, 0.0,
+                                1.0, 1.0, 0.0,
+                                0.0, 1.0, 0.0],
+                      normals=[0.0, 0.0, 1.0],
+                      faces=[[(0, None, None), (1, None, None),
+                              (2, None, None)],
+                             [(0, None, None), (2, None, None),
+                              (3, None, None)]])
+        packed = model.PackedFaces
+        self.assertEqual(packed.Data.shape, (6, 3))
+        self.assertIsNone(packed.Normals)
+        model.set_face(1, [(0, None, 0), (2, None, 0), (3, None, 0)])
+        packed = model.PackedFaces
+        self.assertEqual(packed.Data.shape, (6, 6))
+        self.assertEqual(packed.Normals[3:].ravel().tolist(),
+                         [0.0, 0.0, 1.0] * 3)
+        self.assertSequenceEqual(model.changed_face_ranges(), [(0, 2)])
+
+    def test_invalidate(self):
+        model = quad_model(packing=PACK_ARRAYS)
+        model.changed_face_ranges()
+        model.Normals[:] = [0.0, 1.0, 0.0]
+        model.invalidate_faces(0, 2)
+        self.assertEqual(model.PackedFaces.Normals.ravel().tolist(),
+                         [0.0, 1.0, 0.0] * 6)
+        self.assertSequenceEqual(model.changed_face_ranges(), [(0, 2)])
+
+    def test_corner_count(self):
+        model = quad_model(packing=PACK_ARRAYS)
+        self.assertRaises(ValueError, model.set_face, 0, [(0, 0, 0)] * 4)
+
+    def test_upload(self):
+        model = quad_model(packing=PACK_ARRAYS)
+        view = FakeView()
+        model.upload(view)
+        self.assertEqual([(start, stop) for start, stop, _ in view.writes],
+                         [(0, 6)])
+        del view.writes[:]
+        model.set_face(1, [(3, 3, 0), (2, 2, 0), (0, 0, 0)])
+        model.upload(view)
+        self.assertEqual(view.writes, [(3, 6, [0.0, 1.0, 0.0,
+                                               1.0, 1.0, 0.0,
+                                               0.0, 0.0, 0.0])])
+
+@unittest.skipIf(numpy is None, "numpy is not available")
+class IndexedPacking(unittest.TestCase):
+    def check(self, model):
+        indexed = model.pack_indexed()
+        self.assertEqual(indexed.VertexFormat, "v:3;t0:2;n:3")
+        self.assertEqual(indexed.VertexCount, 4)
+        self.assertEqual(len(indexed), 2)
+        self.assertSequenceEqual(list(indexed.Indices), [0, 1, 2, 0, 2, 3])
+        self.assertSequenceEqual(indexed.attribute("v"),
+                                 list(model.Vertices))
+        self.assertSequenceEqual(indexed.attribute("n"), [0.0, 0.0, 1.0]*4)
+        self.assertIsNone(indexed.attribute("c"))
+
+    def test_lists(self):
+        self.check(quad_model())
+
+    @unittest.skipIf(numpy is None, "numpy is not available")
+    def test_arrays(self):
+        self.check(quad_model(packing=PACK_ARRAYS))
+
+    def test_equal_values(self):
+        # a second index pointing at an equal position still shares
+        model = Model(vertices=[0.0, 0.0, 0.0,
+                                1.0, 0.0, 0.0,
+                                0.0, 1.0, 0.0,
+                                0.0, 0.0, 0.0],
+                      faces=[[(0, None, None), (1, None, None),
+                              (2, None, None)],
+                             [(3, None, None), (2, None, None),
+                              (1, None, None)]])
+        indexed = model.pack_indexed()
+        self.assertEqual(indexed.VertexFormat, "v:3")
+        self.assertSequenceEqual(list(indexed.Indices), [0, 1, 2, 0, 2, 1])
+
+    def test_optimize(self):
+        model = quad_model(materials=[["first", 0], ["second", 1]])
+        indexed = model.pack_indexed(optimize=True)
+        # each face stays within its material
+        self.assertSequenceEqual(list(indexed.Indices), [0, 1, 2, 0, 2, 3])
+        self.assertEqual(indexed.acmr(), 2.0)
+
+    def test_optimize_requires_triangles(self):
+        model = Model(vertices=[0.0] * 12,
+                      faces=[[(0, None, None), (1, None, None),
+                              (2, None, None), (3, None, None)]])
+        self.assertRaises(ValueError, model.pack_indexed, optimize=True)
+
+    def test_ragged(self):
+        model = Model(vertices=[0.0] * 12,
+                      faces=[[(0, None, None), (1, None, None),
+                              (2, None, None)],
+                             [(0, None, None), (1, None, None),
+                              (2, None, None), (3, None, None)]])
+        self.assertRaises(ValueError, model.pack_indexed)
+
+def grid_model(size, **kwargs):
+    vertices = []
+    for y in range(size + 1):
+        for x in range(size + 1):
+            vertices.extend((x / size, y / size, 0.0))
+    faces = []
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            faces.append([(a, 0, 0), (b, 0, 0), (d, 0, 0)])
+            faces.append([(a, 0, 0), (d, 0, 0), (c, 0, 0)])
+    return Model(vertices=vertices, texCoords=[0.5, 0.5],
+                 normals=[0.0, 0.0, 1.0], faces=faces, **kwargs)
+
+class LevelOfDetail(unittest.TestCase):
+    def check(self, model):
+        chain = model.lod_chain((0.5, 0.25))
+        self.assertEqual(len(chain), 2)
+        self.assertLessEqual(len(chain[0].Faces), 64)
+        self.assertLessEqual(len(chain[1].Faces), 32)
+        self.assertLess(len(chain[1].Faces), len(chain[0].Faces))
+        for lod in chain:
+            self.assertEqual(lod.Packing, model.Packing)
+            self.assertEqual(lod.BoundingVolume.Min, (0.0, 0.0, 0.0))
+            self.assertEqual(lod.BoundingVolume.Max, (1.0, 1.0, 0.0))
+            self.assertSequenceEqual(list(lod.Faces[0][0][1:]), [0, 0])
+        return chain
+
+    def test_lists(self):
+        chain = self.check(grid_model(8, materials=[["a", 0], ["b", 64]]))
+        self.assertEqual(chain[0].Materials[0], ["a", 0])
+        self.assertTrue(0 < chain[0].Materials[1][1] < len(chain[0].Faces))
+
+    @unittest.skipIf(numpy is None, "numpy is not available")
+    def test_arrays(self):
+        self.check(grid_model(8, packing=PACK_ARRAYS))
+
+    def test_increasing_ratios(self):
+        self.assertRaises(ValueError, grid_model(2).lod_chain, (0.25, 0.5))
+
+@unittest.skipIf(numpy is None, "numpy is not available")
+class Binary(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".pyum")
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_roundtrip(self):
+        model = quad_model(packing=PACK_ARRAYS,
+                           materials=[["first", 0], ["second", 1]])
+        with open(self.path, "wb") as f:
+            model.save_binary(f)
+        with BinaryModel(self.path) as binary:
+            self.assertEqual(binary.VertexFormat, "v:3;t0:2;n:3")
+            self.assertEqual(binary.VertexSize, 32)
+            self.assertFalse(binary.Vertices.flags.writeable)
+            packed = model.PackedFaces.Data
+            self.assertEqual(len(binary.Vertices), 4)
+            self.assertTrue(numpy.array_equal(
+                binary.Vertices[binary.Indices], packed))
+            self.assertSequenceEqual(binary.Indices.tolist(),
+                                     [0, 1, 2, 0, 2, 3])
+            self.assertSequenceEqual(binary.Materials,
+                                     [("first", 0, 3), ("second", 3, 3)])
+
+    def test_bad_magic(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * 128)
+        self.assertRaises(ValueError, BinaryModel, self.path)
+
+class Bounds(unittest.TestCase):
+    vertices = [0.0, 0.0, 0.0,
+                2.0, 0.0, 0.0,
+                0.0, 4.0, -2.0]
+
+    def check(self, bound):
+        self.assertEqual(bound.Min, (0.0, 0.0, -2.0))
+        self.assertEqual(bound.Max, (2.0, 4.0, 0.0))
+        self.assertEqual(bound.Center, (1.0, 2.0, -1.0))
+        self.assertAlmostEqual(bound.Radius, 6 ** 0.5)
+
+    def test_python(self):
+        self.check(BoundingVolume._from_vertices_python(self.vertices))
+
+    @unittest.skipIf(numpy is None, "numpy is not available")
+    def test_numpy(self):
+        self.check(BoundingVolume.from_vertices(
+            numpy.array(self.vertices, dtype=numpy.float32)))
+
+    def test_cache(self):
+        model = Model(vertices=self.vertices)
+        self.assertIsNone(Model().BoundingVolume)
+        bound = model.BoundingVolume
+        self.check(bound)
+        self.assertIs(model.BoundingVolume, bound)
+        model.Vertices = [1.0, 1.0, 1.0]
+        self.assertEqual(model.BoundingVolume.Min, (1.0, 1.0, 1.0))
+        self.assertEqual(model.BoundingVolume.Radius, 0.0)
@@ -0,0 +1,70 @@
+# File name: test_ModelLoader.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import time
+import unittest
+
+from Model import Model, PACK_ARRAYS, numpy
+from ModelLoader import ModelLoader
+
+def parse_triangle(path):
+    """
+    Stand-in parser which makes a triangle scaled by the number in
+    *path*.
+    """
+    if path == "broken":
+        raise ValueError("cannot parse")
+    scale = float(path)
+    return Model(packing=PACK_ARRAYS,
+                 vertices=[0.0, 0.0, 0.0, scale, 0.0, 0.0, 0.0, scale, 0.0],
+                 faces=[[(0, None, None), (1, None, None), (2, None, None)]])
+
+@unittest.skipIf(numpy is None, "numpy is not available")
+class Loading(unittest.TestCase):
+    def setUp(self):
+        self.loader = ModelLoader(parse_triangle, processes=2)
+
+    def tearDown(self):
+        self.loader.close()
+
+    def test_poll(self):
+        calls = []
+        job = self.loader.load(["1", "2", "3"],
+                               lambda *args: calls.append(args))
+        while not job.poll():
+            time.sleep(0.01)
+        self.assertEqual(sorted(job.Models), ["1", "2", "3"])
+        self.assertEqual([call[:2] for call in calls],
+                         [(1, 3), (2, 3), (3, 3)])
+        model = job.Models["2"]
+        self.assertEqual(model.VertexFormat, "v:3")
+        self.assertEqual(model.Vertices[1].tolist(), [2.0, 0.0, 0.0])
+        self.assertEqual(model.Indices.tolist(), [0, 1, 2])
+
+    def test_error(self):
+        job = self.loader.load(["broken"])
+        self.assertRaises(ValueError, job.wait)
@@ -0,0 +1,113 @@
+# File name: test_ModelStreaming.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import unittest
+
+from Model import Model, PACK_ARRAYS, numpy
+from ModelStreaming import StreamingUpload, corner_count
+
+class RecordingAttribute(object):
+    """
+    Stand-in for an attribute view, which stores the written values.
+    """
+    def __init__(self, length, components):
+        self.values = [None] * (length * components)
+        self.components = components
+
+    def __getitem__(self, key):
+        return RecordingSlice(self, key)
+
+class RecordingSlice(object):
+    def __init__(self, attrib, key):
+        self.attrib = attrib
+        self.key = key
+
+    def set(self, data):
+        if not isinstance(data, list):
+            # float32 arrays are passed through the buffer protocol
+            data = data.ravel().tolist()
+        components = self.attrib.components
+        start, stop = self.key.start * components, self.key.stop * components
+        assert len(data) == stop - start
+        self.attrib.values[start:stop] = data
+
+class RecordingView(object):
+    def __init__(self, length):
+        self.Vertex = RecordingAttribute(length, 3)
+        self.Normal = RecordingAttribute(length, 3)
+        self.texcoords = RecordingAttribute(length, 2)
+
+    def TexCoord(self, index):
+        return self.texcoords
+
+def strip_model(faces, **kwargs):
+    vertices = []
+    for i in range(faces + 2):
+        vertices.extend((float(i), float(i % 2), 0.0))
+    return Model(vertices=vertices, normals=[0.0, 0.0, 1.0],
+                 texCoords=[0.0, 1.0],
+                 faces=[[(i, 0, 0), (i + 1, 0, 0), (i + 2, 0, 0)]
+                        for i in range(faces)],
+                 **kwargs)
+
+class Streaming(unittest.TestCase):
+    def check(self, model):
+        view = RecordingView(corner_count(model))
+        upload = StreamingUpload(model, view, faces_per_chunk=4, budget=0)
+        steps = 0
+        while not upload.step():
+            steps += 1
+            self.assertEqual(upload.FacesUploaded, steps * 4)
+        self.assertEqual(upload.Progress, 1.0)
+        # one chunk per step with no budget
+        self.assertEqual(steps, 2)
+
+        expected = []
+        for vertices, normals, texcoords in model.PackedFaces:
+            expected.extend(vertices.ravel().tolist()
+                            if numpy is not None and model.Packing == PACK_ARRAYS
+                            else vertices)
+        self.assertSequenceEqual(view.Vertex.values, expected)
+        self.assertSequenceEqual(view.Normal.values, [0.0, 0.0, 1.0] * 30)
+        self.assertSequenceEqual(view.texcoords.values, [0.0, 1.0] * 30)
+
+    def test_lists(self):
+        self.check(strip_model(10))
+
+    @unittest.skipIf(numpy is None, "numpy is not available")
+    def test_arrays(self):
+        self.check(strip_model(10, packing=PACK_ARRAYS))
+
+    def test_budget(self):
+        model = strip_model(10)
+        upload = StreamingUpload(model, RecordingView(30), faces_per_chunk=4)
+        self.assertTrue(upload.step(budget=10))
+
+    def test_empty(self):
+        upload = StreamingUpload(Model(), RecordingView(0))
+        self.assertTrue(upload.Done)
+        self.assertTrue(upload.step())
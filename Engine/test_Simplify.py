@@ -0,0 +1,79 @@
+# File name: test_Simplify.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import unittest
+
+from Simplify import collapse_edges
+
+def grid(size):
+    """
+    Flat *size* x *size* quad grid in the XY plane, spanning [0, 1].
+    """
+    vertices = []
+    for y in range(size + 1):
+        for x in range(size + 1):
+            vertices.extend((x / size, y / size, 0.0))
+    triangles = []
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            triangles.append((a, b, d))
+            triangles.append((a, d, c))
+    return vertices, triangles
+
+class CollapseEdges(unittest.TestCase):
+    def test_target(self):
+        vertices, triangles = grid(8)
+        new_vertices, kept = collapse_edges(vertices, triangles, 32)
+        self.assertLessEqual(len(kept), 32)
+        self.assertLess(len(new_vertices), len(vertices))
+        for _, indices in kept:
+            self.assertEqual(len(set(indices)), 3)
+            self.assertTrue(all(i < len(new_vertices) // 3 for i in indices))
+
+    def test_shape(self):
+        vertices, triangles = grid(8)
+        new_vertices, kept = collapse_edges(vertices, triangles, 16)
+        points = [new_vertices[i:i+3] for i in range(0, len(new_vertices), 3)]
+        # the plane and its outline survive
+        self.assertTrue(all(p[2] == 0 for p in points))
+        for axis in range(2):
+            self.assertEqual(min(p[axis] for p in points), 0.0)
+            self.assertEqual(max(p[axis] for p in points), 1.0)
+        # no face is flipped
+        for _, (a, b, c) in kept:
+            pa, pb, pc = points[a], points[b], points[c]
+            normal_z = ((pb[0]-pa[0]) * (pc[1]-pa[1])
+                        - (pb[1]-pa[1]) * (pc[0]-pa[0]))
+            self.assertGreater(normal_z, 0)
+
+    def test_keeps_order(self):
+        vertices, triangles = grid(4)
+        _, kept = collapse_edges(vertices, triangles, 8)
+        originals = [t for t, _ in kept]
+        self.assertEqual(originals, sorted(originals))
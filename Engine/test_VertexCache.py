@@ -0,0 +1,96 @@
+# File name: test_VertexCache.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+from __future__ import unicode_literals, print_function, division
+from our_future import *
+
+import random
+import timeit
+import unittest
+
+import VertexCache
+
+def grid(size):
+    """
+    Triangle list of a *size* x *size* quad grid, in shuffled order.
+    """
+    indices = []
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            indices.append((a, b, d))
+            indices.append((a, d, c))
+    random.Random(1).shuffle(indices)
+    return [index for triangle in indices for index in triangle]
+
+def disconnected(count):
+    """
+    Triangle list of *count* triangles which share no vertices, in
+    shuffled order.
+    """
+    indices = list(range(count * 3))
+    order = list(range(count))
+    random.Random(1).shuffle(order)
+    return [index for t in order for index in indices[t*3:t*3+3]]
+
+def triangles(indices):
+    return sorted(tuple(indices[i:i+3]) for i in range(0, len(indices), 3))
+
+class ACMR(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(VertexCache.acmr([]), 0.0)
+
+    def test_shared(self):
+        self.assertEqual(VertexCache.acmr([0, 1, 2, 0, 2, 3]), 2.0)
+
+    def test_eviction(self):
+        self.assertEqual(VertexCache.acmr([0, 1, 2, 3, 4, 5, 0, 1, 2],
+                                          cache_size=3), 3.0)
+
+class Optimize(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(VertexCache.optimize([]), [])
+
+    def test_permutation(self):
+        indices = grid(8)
+        optimized = VertexCache.optimize(indices)
+        self.assertEqual(triangles(optimized), triangles(indices))
+
+    def test_improves(self):
+        indices = grid(16)
+        before = VertexCache.acmr(indices, 16)
+        after = VertexCache.acmr(VertexCache.optimize(indices, 16), 16)
+        self.assertLess(after, before)
+        self.assertLess(after, 1.0)
+
+    def test_disconnected_scaling(self):
+        # the cache runs dry after every triangle here; the time has to
+        # grow linearly, not quadratically with the triangle count
+        def run(count):
+            indices = disconnected(count)
+            return min(timeit.repeat(
+                lambda: VertexCache.optimize(indices), number=1, repeat=3))
+        small, large = run(2000), run(8000)
+        self.assertLess(large, small * 8)
@@ -0,0 +1,90 @@
+/**********************************************************************
+File name: ExtentAllocator.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <CEngine/GL/ExtentAllocator.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+TEST_CASE("GL/ExtentAllocator/contiguous",
+          "Allocate contiguous ranges first-fit")
+{
+    ExtentAllocator allocator;
+    allocator.release(0, 100);
+    CHECK(allocator.getFreeCount() == 100);
+    CHECK(allocator.getExtentCount() == 1);
+
+    IndexRangeList ranges;
+    REQUIRE(allocator.allocate(30, ranges));
+    REQUIRE(ranges.size() == 1);
+    CHECK(ranges[0] == IndexRange(0, 30));
+    CHECK(allocator.getFreeCount() == 70);
+
+    CHECK(!allocator.allocate(71, ranges));
+    CHECK(ranges.size() == 1);
+    CHECK(allocator.getFreeCount() == 70);
+
+    // releasing merges with the neighbouring extent
+    allocator.release(10, 20);
+    CHECK(allocator.getExtentCount() == 1);
+    CHECK(allocator.getLargestExtent() == 90);
+    CHECK(allocator.getFragmentation() == 0);
+}
+
+TEST_CASE("GL/ExtentAllocator/fragmented",
+          "Fall back to several extents")
+{
+    ExtentAllocator allocator;
+    allocator.release(0, 10);
+    allocator.release(20, 10);
+    allocator.release(40, 30);
+    CHECK(allocator.getExtentCount() == 3);
+    CHECK(allocator.getLargestExtent() == 30);
+    CHECK(allocator.getFragmentation() == Approx(0.4));
+
+    IndexRangeList ranges;
+    REQUIRE(allocator.allocate(20, ranges));
+    REQUIRE(ranges.size() == 1);
+    CHECK(ranges[0] == IndexRange(40, 20));
+
+    ranges.clear();
+    REQUIRE(allocator.allocate(25, ranges));
+    REQUIRE(ranges.size() == 3);
+    CHECK(ranges[0] == IndexRange(0, 10));
+    CHECK(ranges[1] == IndexRange(20, 10));
+    CHECK(ranges[2] == IndexRange(60, 5));
+    CHECK(allocator.getFreeCount() == 5);
+    CHECK(allocator.getExtentCount() == 1);
+
+    // fill the holes again, everything merges into one extent
+    allocator.release(0, 10);
+    allocator.release(20, 10);
+    allocator.release(10, 10);
+    allocator.release(30, 35);
+    CHECK(allocator.getExtentCount() == 1);
+    CHECK(allocator.getLargestExtent() == 70);
+}
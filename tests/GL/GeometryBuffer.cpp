@@ -0,0 +1,184 @@
+/**********************************************************************
+File name: GeometryBuffer.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <algorithm>
+#include <chrono>
+#include <iostream>
+
+#include <CEngine/GL/IndexBuffer.hpp>
+#include <CEngine/WindowInterface/Window.hpp>
+#include <CEngine/WindowInterface/X11/X11Display.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+TEST_CASE("GL/GeometryBuffer/requireIndices",
+          "Index lists are copied to the server side buffer once")
+{
+    GeometryBuffer buffer(
+        VertexFormatHandle(new VertexFormat(3)), GL_DYNAMIC_DRAW);
+    VertexIndexListHandle a = buffer.allocateVertices(6);
+    VertexIndexListHandle b = buffer.allocateVertices(3);
+
+    const IndexEntryHandle entryA = buffer.requireIndices(a);
+    const IndexEntryHandle entryB = buffer.requireIndices(b);
+    CHECK(buffer.requireIndices(a) == entryA);
+    CHECK(entryA->count == 6);
+    CHECK(entryB->start == 6);
+
+    StaticIndexBufferHandle indices = buffer.getDrawIndices();
+    REQUIRE(indices);
+    CHECK(indices->getCount() == 9);
+    CHECK(indices->getIndex(entryB->start) == (GLsizei)(*b)[0]);
+
+    // a changed length is noticed, changed contents need to be reported
+    a->push_back((*a)[0]);
+    const IndexEntryHandle grown = buffer.requireIndices(a);
+    CHECK(grown != entryA);
+    CHECK(grown->count == 7);
+    CHECK_FALSE(entryA->attached);
+
+    (*b)[0] = (*b)[2];
+    CHECK(buffer.requireIndices(b) == entryB);
+    buffer.invalidateIndices(b);
+    const IndexEntryHandle updated = buffer.requireIndices(b);
+    CHECK(updated != entryB);
+    CHECK(indices->getIndex(updated->start) == (GLsizei)(*b)[2]);
+}
+
+TEST_CASE("GL/GeometryBuffer/requireIndices/edit",
+          "Same length edits of an index list are reported explicitly")
+{
+    GeometryBuffer buffer(
+        VertexFormatHandle(new VertexFormat(3)), GL_DYNAMIC_DRAW);
+    // client side arrays always see the current contents
+    CHECK_FALSE(buffer.getUseServerIndices());
+
+    VertexIndexListHandle a = buffer.allocateVertices(3);
+    const IndexEntryHandle entry = buffer.requireIndices(a);
+    StaticIndexBufferHandle indices = buffer.getDrawIndices();
+
+    std::swap((*a)[1], (*a)[2]);
+    buffer.invalidateIndices(a);
+    CHECK_FALSE(entry->attached);
+    const IndexEntryHandle swapped = buffer.requireIndices(a);
+    CHECK(swapped != entry);
+    CHECK(swapped->count == 3);
+    CHECK(indices->getIndex(swapped->start + 1) == (GLsizei)(*a)[1]);
+    CHECK(indices->getIndex(swapped->start + 2) == (GLsizei)(*a)[2]);
+    CHECK(buffer.requireIndices(a) == swapped);
+}
+
+TEST_CASE("GL/GeometryBuffer/requireIndices/gc",
+          "Server side copies do not keep vertices alive")
+{
+    GeometryBuffer buffer(
+        VertexFormatHandle(new VertexFormat(3)), GL_DYNAMIC_DRAW);
+    VertexIndexListHandle a = buffer.allocateVertices(64);
+    buffer.requireIndices(a);
+    const GLsizei freeBefore = buffer.getFreeVertices().getFreeCount();
+
+    a.reset();
+    buffer.gc();
+    CHECK(buffer.getFreeVertices().getFreeCount() == freeBefore + 64);
+    CHECK(buffer.getDrawIndices()->getLiveCount() == 0);
+
+    // lists which are not owned by the buffer are dropped once unused
+    VertexIndexListHandle b(new VertexIndexList(10, 0));
+    buffer.requireIndices(b);
+    CHECK(buffer.getDrawIndices()->getLiveCount() == 10);
+    b.reset();
+    buffer.gc();
+    CHECK(buffer.getDrawIndices()->getLiveCount() == 0);
+    CHECK(buffer.getDrawIndices()->getCount() == 0);
+}
+
+static double drawObjects(
+    GeometryBuffer &buffer,
+    const VertexIndexListHandleList &objects,
+    const int frames)
+{
+    buffer.bind();
+    for (auto &object: objects) {
+        buffer.draw(object, GL_TRIANGLES);
+    }
+    buffer.unbind();
+    glFinish();
+
+    auto start = std::chrono::steady_clock::now();
+    for (int frame = 0; frame < frames; frame++) {
+        buffer.bind();
+        for (auto &object: objects) {
+            buffer.draw(object, GL_TRIANGLES);
+        }
+        buffer.unbind();
+    }
+    glFinish();
+    auto end = std::chrono::steady_clock::now();
+    return std::chrono::duration<double, std::milli>(end - start).count()
+        / frames;
+}
+
+TEST_CASE("GL/GeometryBuffer/draw/benchmark",
+          "[.][benchmark] Client side versus server side indices")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+
+    GeometryBuffer buffer(
+        VertexFormatHandle(new VertexFormat(3)), GL_STATIC_DRAW);
+    const int counts[] = {100, 1000, 5000};
+    VertexIndexListHandleList vertexLists;
+    for (const int count: counts) {
+        VertexIndexListHandleList objects;
+        for (int i = 0; i < count; i++) {
+            // 12 triangles on 8 vertices, like a cube
+            VertexIndexListHandle vertices = buffer.allocateVertices(8);
+            vertexLists.push_back(vertices);
+            VertexIndexListHandle object(new VertexIndexList());
+            for (int j = 0; j < 36; j++) {
+                object->push_back((*vertices)[(j * 5) % 8]);
+            }
+            objects.push_back(object);
+        }
+
+        buffer.setUseServerIndices(false);
+        const double client = drawObjects(buffer, objects, 100);
+        buffer.setUseServerIndices(true);
+        const double server = drawObjects(buffer, objects, 100);
+        std::cout << count << " draws/frame: client side "
+                  << client << " ms/frame ("
+                  << count * 36 * sizeof(VertexIndex)
+                  << " index bytes/frame), server side "
+                  << server << " ms/frame ("
+                  << buffer.getDrawIndices()->getBytesUploaded()
+                  << " index bytes in total)" << std::endl;
+    }
+}
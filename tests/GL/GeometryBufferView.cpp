@@ -0,0 +1,82 @@
+/**********************************************************************
+File name: GeometryBufferView.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <CEngine/GL/GeometryBufferView.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+TEST_CASE("GL/GeometryBufferView/AttributeSlice/getLayout",
+          "Evenly spaced vertices are exposed as a strided pointer")
+{
+    GeometryBufferHandle buffer(new GeometryBuffer(
+        VertexFormatHandle(new VertexFormat(3, 0, 2)), GL_DYNAMIC_DRAW));
+    const GLsizei vertexLength = buffer->getFormat()->vertexLength;
+    VertexIndexListHandle indices = buffer->allocateVertices(8);
+    GeometryBufferView view(buffer, indices);
+
+    GeometryBufferView::AttributeView *positions = view.getPositionView();
+    const GLsizei first = (*indices)[0];
+
+    GLVertexFloat *ptr = 0;
+    GLsizei stride = -1;
+    REQUIRE(positions->getLayout(&ptr, &stride));
+    CHECK(ptr == buffer->getData() + first * vertexLength);
+    CHECK(stride == vertexLength);
+
+    GeometryBufferView::AttributeView *texCoords = view.getTexCoordView(0);
+    REQUIRE(texCoords->slice(2, 8, 2)->getLayout(&ptr, &stride));
+    CHECK(ptr == buffer->getData() + (first + 2) * vertexLength + 3);
+    CHECK(stride == 2 * vertexLength);
+
+    // writes through the pointer end up in get()
+    ptr[0] = 1.5;
+    ptr[stride + 1] = 2.5;
+    GLVertexFloat values[6];
+    texCoords->slice(2, 8, 2)->get(values);
+    CHECK(values[0] == 1.5);
+    CHECK(values[3] == 2.5);
+}
+
+TEST_CASE("GL/GeometryBufferView/AttributeSlice/getLayout/scattered",
+          "Unevenly spaced vertices have no strided layout")
+{
+    GeometryBufferHandle buffer(new GeometryBuffer(
+        VertexFormatHandle(new VertexFormat(3)), GL_DYNAMIC_DRAW));
+    VertexIndexListHandle all = buffer->allocateVertices(4);
+
+    VertexIndexListHandle scattered(new VertexIndexList());
+    scattered->push_back((*all)[0]);
+    scattered->push_back((*all)[1]);
+    scattered->push_back((*all)[3]);
+    GeometryBufferView view(buffer, scattered);
+
+    GLVertexFloat *ptr = 0;
+    GLsizei stride = 0;
+    CHECK_FALSE(view.getPositionView()->getLayout(&ptr, &stride));
+    CHECK(view.getPositionView()->slice(0, 2)->getLayout(&ptr, &stride));
+}
@@ -0,0 +1,366 @@
+/**********************************************************************
+File name: IndexBuffer.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <chrono>
+#include <deque>
+#include <iostream>
+#include <vector>
+
+#include <CEngine/GL/IndexBuffer.hpp>
+#include <CEngine/GL/StateManagement.hpp>
+#include <CEngine/WindowInterface/Window.hpp>
+#include <CEngine/WindowInterface/X11/X11Display.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+static VertexIndexListHandle makeIndices(const GLsizei count)
+{
+    VertexIndexListHandle result(new VertexIndexList());
+    for (GLsizei i = 0; i < count; i++) {
+        result->push_back(i);
+    }
+    return result;
+}
+
+TEST_CASE("GL/StaticIndexBuffer/batchRanges",
+          "Batched entries are sorted and adjacent ones merged")
+{
+    StaticIndexBuffer buffer;
+    IndexEntryHandle a = buffer.add(makeIndices(3));
+    IndexEntryHandle b = buffer.add(makeIndices(6));
+    IndexEntryHandle c = buffer.add(makeIndices(3));
+    IndexEntryHandle d = buffer.add(makeIndices(9));
+
+    IndexEntryHandleList entries;
+    entries.push_back(d);
+    entries.push_back(b);
+    entries.push_back(a);
+
+    IndexRangeList ranges = buffer.batchRanges(entries);
+    REQUIRE(ranges.size() == 2);
+    CHECK(ranges[0] == IndexRange(0, 9));
+    CHECK(ranges[1] == IndexRange(12, 9));
+
+    entries.push_back(c);
+    entries.push_back(c);
+    ranges = buffer.batchRanges(entries);
+    REQUIRE(ranges.size() == 1);
+    CHECK(ranges[0] == IndexRange(0, 21));
+}
+
+TEST_CASE("GL/StaticIndexBuffer/batchRanges/detached",
+          "Removed entries are skipped by batchRanges")
+{
+    StaticIndexBuffer buffer;
+    IndexEntryHandle a = buffer.add(makeIndices(3));
+    IndexEntryHandle b = buffer.add(makeIndices(3));
+
+    buffer.remove(a, false);
+
+    IndexEntryHandleList entries;
+    entries.push_back(a);
+    entries.push_back(b);
+    IndexRangeList ranges = buffer.batchRanges(entries);
+    REQUIRE(ranges.size() == 1);
+    CHECK(ranges[0] == IndexRange(3, 3));
+
+    buffer.clear();
+    CHECK(buffer.batchRanges(entries).empty());
+}
+
+TEST_CASE("GL/StaticIndexBuffer/compactStep",
+          "Incremental compaction moves a bounded number of entries")
+{
+    StaticIndexBuffer buffer;
+    std::vector<IndexEntryHandle> entries;
+    for (int i = 0; i < 8; i++) {
+        entries.push_back(buffer.add(makeIndices(4)));
+    }
+    CHECK(buffer.getCount() == 32);
+
+    // a single removal stays below the default threshold
+    buffer.remove(entries[0]);
+    CHECK_FALSE(buffer.isCompacting());
+    CHECK(buffer.getLiveCount() == 28);
+    CHECK(buffer.getFragmentation() == Approx(4./32.));
+
+    buffer.remove(entries[2]);
+    buffer.remove(entries[4]);
+    CHECK(buffer.isCompacting());
+    CHECK(buffer.getCount() == 32);
+
+    buffer.setCompactBudget(2);
+    CHECK(buffer.compactFrame());
+    CHECK(entries[1]->start == 0);
+    CHECK(entries[3]->start == 4);
+    CHECK(buffer.getBytesMoved() == 8 * sizeof(GLuint));
+
+    CHECK(buffer.compactFrame());
+    CHECK(entries[5]->start == 8);
+    CHECK(entries[6]->start == 12);
+
+    CHECK_FALSE(buffer.compactFrame());
+    CHECK(entries[7]->start == 16);
+    CHECK(buffer.getCount() == 20);
+    CHECK_FALSE(buffer.isCompacting());
+    CHECK(buffer.getFragmentation() == Approx(0.));
+    CHECK(buffer.getBytesMoved() == 20 * sizeof(GLuint));
+
+    for (GLsizei i = 0; i < 20; i++) {
+        CHECK(buffer.getIndex(i) == (GLsizei)(i % 4));
+    }
+}
+
+TEST_CASE("GL/StaticIndexBuffer/compactStep/interleaved",
+          "Removing and adding entries during compaction keeps it consistent")
+{
+    StaticIndexBuffer buffer;
+    IndexEntryHandle a = buffer.add(makeIndices(2));
+    IndexEntryHandle b = buffer.add(makeIndices(3));
+    IndexEntryHandle c = buffer.add(makeIndices(4));
+    IndexEntryHandle d = buffer.add(makeIndices(5));
+
+    buffer.remove(b, false);
+    CHECK(buffer.compactStep(1));
+    CHECK(c->start == 2);
+
+    // a gap before the cursor restarts compaction from the gap
+    buffer.remove(a, false);
+    IndexEntryHandle e = buffer.add(makeIndices(1));
+    CHECK(e->start == 14);
+
+    buffer.compress();
+    CHECK(c->start == 0);
+    CHECK(d->start == 4);
+    CHECK(e->start == 9);
+    CHECK(buffer.getCount() == 10);
+    CHECK(buffer.getIndex(3) == 3);
+    CHECK(buffer.getIndex(8) == 4);
+    CHECK(buffer.getIndex(9) == 0);
+}
+
+TEST_CASE("GL/StaticIndexBuffer/add/churn",
+          "Gaps are reclaimed before growing, even without compactFrame")
+{
+    StaticIndexBuffer buffer;
+    std::deque<IndexEntryHandle> live;
+    for (int i = 0; i < 100; i++) {
+        live.push_back(buffer.add(makeIndices(36)));
+    }
+    const GLsizei initialCapacity = buffer.getCapacity();
+
+    for (int i = 0; i < 2000; i++) {
+        buffer.remove(live.front());
+        live.pop_front();
+        live.push_back(buffer.add(makeIndices(36)));
+    }
+    CHECK(buffer.getLiveCount() == 3600);
+    CHECK(buffer.getCapacity() == initialCapacity);
+    CHECK(buffer.getCount() <= buffer.getCapacity());
+    CHECK(live.back()->start + 36 == buffer.getCount());
+    CHECK(buffer.getIndex(live.front()->start + 35) == 35);
+}
+
+static double churnIndexBuffer(
+    const IndexUploadMode mode,
+    const bool verify,
+    const int frames,
+    const int entriesPerFrame)
+{
+    StaticIndexBuffer buffer;
+    buffer.setUploadMode(mode);
+    buffer.setVerifyUploads(verify);
+
+    std::deque<IndexEntryHandle> live;
+    for (int i = 0; i < 1000; i++) {
+        live.push_back(buffer.add(makeIndices(36)));
+    }
+    buffer.bind();
+    buffer.unbind();
+    glFinish();
+
+    auto start = std::chrono::steady_clock::now();
+    for (int frame = 0; frame < frames; frame++) {
+        for (int i = 0; i < entriesPerFrame; i++) {
+            buffer.remove(live.front());
+            live.pop_front();
+            live.push_back(buffer.add(makeIndices(36)));
+        }
+        buffer.compactFrame();
+        buffer.bind();
+        buffer.unbind();
+    }
+    glFinish();
+    auto end = std::chrono::steady_clock::now();
+
+    CHECK(buffer.verify() == -1);
+    return std::chrono::duration<double, std::milli>(end - start).count()
+        / frames;
+}
+
+TEST_CASE("GL/StaticIndexBuffer/upload",
+          "[.][gl] Write-through and deferred uploads reach the GPU intact")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+
+    churnIndexBuffer(UploadWriteThrough, true, 50, 16);
+    churnIndexBuffer(UploadDeferred, true, 50, 16);
+}
+
+TEST_CASE("GL/StreamIndexBuffer/streaming",
+          "[.][gl] Streamed regions are fenced after the draws reading them")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+
+    const StreamingMode modes[] = {
+        StreamPersistent, StreamUnsynchronized, StreamSubData};
+    for (const StreamingMode mode: modes) {
+        StreamIndexBuffer buffer;
+        buffer.enableStreaming(64, 2, mode);
+        StreamingBufferHandle stream = buffer.getStreamingBuffer();
+        GLsizei mismatches = 0;
+        for (GLuint frame = 0; frame < 8; frame++) {
+            buffer.clear();
+            VertexIndexListHandle indices(new VertexIndexList());
+            for (GLuint i = 0; i < 16; i++) {
+                indices->push_back(frame * 100 + i);
+            }
+            buffer.add(indices);
+            buffer.bind();
+            // the region must stay unfenced until it has been drawn from
+            CHECK(stream->isFencePending());
+            buffer.draw(GL_POINTS);
+
+            GLuint gpu[16];
+            glGetBufferSubData(GL_ELEMENT_ARRAY_BUFFER,
+                               stream->getRegionOffset(), sizeof(gpu), gpu);
+            for (GLuint i = 0; i < 16; i++) {
+                mismatches += (gpu[i] != frame * 100 + i);
+            }
+            buffer.unbind();
+        }
+        CHECK(mismatches == 0);
+        buffer.clear();
+        CHECK_FALSE(stream->isFencePending());
+    }
+    raiseLastGLError();
+}
+
+TEST_CASE("GL/StaticIndexBuffer/drawHandles",
+          "[.][gl] Batched draws read the indices from the buffer object")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+    stateCache->invalidate();
+
+    // one point per pixel of a 4x4 viewport, vertex i at (i % 4, i / 4)
+    GLfloat positions[32];
+    for (int i = 0; i < 16; i++) {
+        positions[i*2] = ((i % 4) + 0.5f) / 2.0f - 1.0f;
+        positions[i*2+1] = ((i / 4) + 0.5f) / 2.0f - 1.0f;
+    }
+    GLuint vertexBuffer;
+    glGenBuffers(1, &vertexBuffer);
+    stateCache->bindBuffer(GL_ARRAY_BUFFER, vertexBuffer);
+    glBufferData(GL_ARRAY_BUFFER, sizeof(positions), positions,
+                 GL_STATIC_DRAW);
+    glVertexPointer(2, GL_FLOAT, 0, 0);
+    glEnableClientState(GL_VERTEX_ARRAY);
+    glViewport(0, 0, 4, 4);
+
+    StaticIndexBuffer buffer(GL_STATIC_DRAW);
+    IndexEntryHandleList entries, skipped;
+    const GLuint drawn[][2] = {{0, 5}, {3, 6}, {10, 15}};
+    for (auto &pair: drawn) {
+        VertexIndexListHandle indices(new VertexIndexList(pair, pair + 2));
+        entries.push_back(buffer.add(indices));
+        // entries which are not drawn, so that the ranges are disjoint
+        skipped.push_back(buffer.add(makeIndices(2)));
+    }
+    // leave another index buffer bound, as other draws do
+    StaticIndexBuffer other(GL_STATIC_DRAW);
+    other.add(makeIndices(64));
+    other.bind();
+
+    for (size_t count: {(size_t)1, entries.size()}) {
+        const IndexEntryHandleList batch(
+            entries.begin(), entries.begin() + count);
+        glClearColor(0, 0, 0, 0);
+        glClear(GL_COLOR_BUFFER_BIT);
+        CHECK(buffer.drawHandles(batch, GL_POINTS) == (GLsizei)count);
+        other.bind();
+
+        GLubyte pixels[16*4];
+        glReadPixels(0, 0, 4, 4, GL_RGBA, GL_UNSIGNED_BYTE, pixels);
+        std::vector<bool> expected(16, false);
+        for (size_t i = 0; i < count; i++) {
+            expected[drawn[i][0]] = expected[drawn[i][1]] = true;
+        }
+        for (int i = 0; i < 16; i++) {
+            CHECK((pixels[i*4] != 0) == expected[i]);
+        }
+    }
+
+    other.unbind();
+    glDisableClientState(GL_VERTEX_ARRAY);
+    stateCache->bindBuffer(GL_ARRAY_BUFFER, 0);
+    stateCache->deleteBuffers(1, &vertexBuffer);
+    raiseLastGLError();
+}
+
+TEST_CASE("GL/StaticIndexBuffer/upload/benchmark",
+          "[.][benchmark] Write-through versus deferred index uploads")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+
+    const int rates[] = {4, 32, 256};
+    for (const int rate: rates) {
+        const double writeThrough = churnIndexBuffer(
+            UploadWriteThrough, false, 200, rate);
+        const double deferred = churnIndexBuffer(
+            UploadDeferred, false, 200, rate);
+        std::cout << rate << " entries/frame: write-through "
+                  << writeThrough << " ms/frame, deferred "
+                  << deferred << " ms/frame" << std::endl;
+    }
+}
@@ -0,0 +1,177 @@
+/**********************************************************************
+File name: IndexRanges.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <chrono>
+#include <iostream>
+#include <set>
+
+#include <CEngine/GL/IndexRanges.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+static IndexRangeList makeRuns(const GLsizei *indices, const size_t count)
+{
+    IndexRangeList runs;
+    for (size_t i = 0; i < count; i++)
+    {
+        appendIndex(runs, indices[i]);
+    }
+    return runs;
+}
+
+TEST_CASE("GL/IndexRanges/appendIndex",
+          "Build runs of consecutive indices")
+{
+    const GLsizei indices[] = {0, 1, 2, 2, 5, 7, 8};
+    IndexRangeList runs = makeRuns(indices, 7);
+    REQUIRE(runs.size() == 3);
+    CHECK(runs[0] == IndexRange(0, 3));
+    CHECK(runs[1] == IndexRange(5, 1));
+    CHECK(runs[2] == IndexRange(7, 2));
+}
+
+TEST_CASE("GL/IndexRanges/coalesceRanges/gap",
+          "Close gaps up to the threshold")
+{
+    const GLsizei indices[] = {0, 1, 4, 10, 1000000};
+    IndexRangeList runs = makeRuns(indices, 5);
+
+    IndexRangeList ranges = coalesceRanges(runs, 2, 16);
+    REQUIRE(ranges.size() == 3);
+    CHECK(ranges[0] == IndexRange(0, 5));
+    CHECK(ranges[1] == IndexRange(10, 1));
+    CHECK(ranges[2] == IndexRange(1000000, 1));
+
+    ranges = coalesceRanges(runs, 0, 16);
+    CHECK(ranges.size() == 4);
+
+    CHECK(coalesceRanges(IndexRangeList(), 2, 16).empty());
+}
+
+TEST_CASE("GL/IndexRanges/coalesceRanges/max",
+          "Close the smallest gaps to stay within the range limit")
+{
+    const GLsizei indices[] = {0, 10, 12, 100, 1000000};
+    IndexRangeList runs = makeRuns(indices, 5);
+
+    IndexRangeList ranges = coalesceRanges(runs, 0, 2);
+    REQUIRE(ranges.size() == 2);
+    CHECK(ranges[0] == IndexRange(0, 101));
+    CHECK(ranges[1] == IndexRange(1000000, 1));
+
+    ranges = coalesceRanges(runs, 0, 1);
+    REQUIRE(ranges.size() == 1);
+    CHECK(ranges[0] == IndexRange(0, 1000001));
+}
+
+TEST_CASE("GL/IndexRanges/IndexBitmap",
+          "Mark indices and extract them as ranges")
+{
+    IndexBitmap bitmap;
+    bitmap.resize(1000);
+    CHECK(bitmap.empty());
+
+    bitmap.mark(3);
+    bitmap.mark(4);
+    bitmap.markRange(60, 70);
+    bitmap.mark(999);
+    CHECK(!bitmap.empty());
+
+    IndexRangeList ranges;
+    bitmap.appendRanges(ranges);
+    REQUIRE(ranges.size() == 3);
+    CHECK(ranges[0] == IndexRange(3, 2));
+    CHECK(ranges[1] == IndexRange(60, 70));
+    CHECK(ranges[2] == IndexRange(999, 1));
+
+    bitmap.clear();
+    CHECK(bitmap.empty());
+    ranges.clear();
+    bitmap.appendRanges(ranges);
+    CHECK(ranges.empty());
+
+    bitmap.markRange(0, 128);
+    bitmap.appendRanges(ranges);
+    REQUIRE(ranges.size() == 1);
+    CHECK(ranges[0] == IndexRange(0, 128));
+}
+
+template <class Marker>
+static double timeFrames(Marker marker, const int frames)
+{
+    auto start = std::chrono::high_resolution_clock::now();
+    for (int frame = 0; frame < frames; frame++)
+    {
+        marker();
+    }
+    auto end = std::chrono::high_resolution_clock::now();
+    return std::chrono::duration<double, std::milli>(end - start).count()
+        / frames;
+}
+
+TEST_CASE("GL/IndexRanges/benchmark",
+          "[.][benchmark] Compare dirty tracking with std::set and IndexBitmap")
+{
+    // every third vertex of a large UI buffer changes each frame
+    const GLsizei capacity = 1 << 17;
+    const GLsizei stride = 3;
+    const int frames = 20;
+
+    std::set<GLsizei> set;
+    IndexRangeList setRanges;
+    const double setTime = timeFrames([&]() {
+        for (GLsizei i = 0; i < capacity; i += stride)
+        {
+            set.insert(i);
+        }
+        setRanges.clear();
+        for (auto it = set.begin(); it != set.end(); it++)
+        {
+            appendIndex(setRanges, *it);
+        }
+        set.clear();
+    }, frames);
+
+    IndexBitmap bitmap;
+    bitmap.resize(capacity);
+    IndexRangeList bitmapRanges;
+    const double bitmapTime = timeFrames([&]() {
+        for (GLsizei i = 0; i < capacity; i += stride)
+        {
+            bitmap.mark(i);
+        }
+        bitmapRanges.clear();
+        bitmap.appendRanges(bitmapRanges);
+        bitmap.clear();
+    }, frames);
+
+    CHECK(setRanges == bitmapRanges);
+    std::cout << "dirty tracking of " << capacity / stride
+              << " vertices per frame: std::set " << setTime
+              << " ms, IndexBitmap " << bitmapTime << " ms" << std::endl;
+}
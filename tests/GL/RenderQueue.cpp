@@ -0,0 +1,178 @@
+/**********************************************************************
+File name: RenderQueue.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <algorithm>
+#include <string>
+#include <vector>
+
+#include <CEngine/GL/RenderQueue.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+typedef std::vector<std::string> CallLog;
+
+class LoggingState: public Struct {
+public:
+    LoggingState(CallLog *log, const std::string &name):
+        _log(log), _name(name) {};
+private:
+    CallLog *_log;
+    std::string _name;
+public:
+    virtual void bind() { _log->push_back("+" + _name); };
+    virtual void unbind() { _log->push_back("-" + _name); };
+};
+
+class LoggingGroup: public Group {
+public:
+    LoggingGroup(CallLog *log, const std::string &name, int order = 0):
+        Group(order), _log(log), _name(name) {};
+private:
+    CallLog *_log;
+    std::string _name;
+public:
+    virtual void execute() { _log->push_back(_name); };
+};
+
+TEST_CASE("GL/RenderQueue/makeKey",
+          "Keys sort by order first, negative orders before positive ones")
+{
+    CHECK(RenderQueue::makeKey(-1, 9, 9, 9) < RenderQueue::makeKey(0, 0, 0, 0));
+    CHECK(RenderQueue::makeKey(0, 1, 9, 9) < RenderQueue::makeKey(0, 2, 0, 0));
+    CHECK(RenderQueue::makeKey(0, 1, 1, 9) < RenderQueue::makeKey(0, 1, 2, 0));
+    CHECK(RenderQueue::makeKey(0, 1, 1, 1) < RenderQueue::makeKey(0, 1, 1, 2));
+    CHECK(RenderQueue::makeKey(-100000, 0, 0, 0)
+          == RenderQueue::makeKey(-0x8000, 0, 0, 0));
+}
+
+TEST_CASE("GL/RenderQueue/sort",
+          "The radix sort orders keys and keeps equal keys stable")
+{
+    CallLog log;
+    RenderQueue queue;
+    StructHandle shaders[3];
+    for (int i = 0; i < 3; i++) {
+        shaders[i] = StructHandle(new LoggingState(&log, "s"));
+    }
+
+    const int orders[] = {3, -2, 3, 0, 700, -2, 0, 3};
+    for (unsigned int i = 0; i < 8; i++) {
+        queue.add(GroupHandle(new LoggingGroup(&log, std::to_string(i), orders[i])),
+                  shaders[i % 3], StructHandle(), StructHandle());
+    }
+    queue.sort();
+    REQUIRE(queue.getCount() == 8);
+    for (unsigned int i = 1; i < 8; i++) {
+        CHECK(queue.getKey(i - 1) <= queue.getKey(i));
+    }
+
+    queue.resetCounters();
+    log.clear();
+    queue.execute();
+    // within an order, items go by shader, neighbours with the same
+    // shader share its setUp and tearDown
+    const CallLog expected = {
+        "+s", "1", "-s", "+s", "5", "-s",
+        "+s", "3", "6", "0", "-s",
+        "+s", "7", "-s", "+s", "2", "-s",
+        "+s", "4", "-s"
+    };
+    CHECK(log == expected);
+}
+
+TEST_CASE("GL/RenderQueue/sort/many",
+          "The radix sort agrees with std::sort over all key bytes")
+{
+    CallLog log;
+    RenderQueue queue;
+    std::vector<StructHandle> textures;
+    for (int i = 0; i < 300; i++) {
+        textures.push_back(StructHandle(new LoggingState(&log, "t")));
+    }
+
+    std::vector<RenderSortKey> keys;
+    unsigned int seed = 1;
+    for (int i = 0; i < 2000; i++) {
+        seed = seed * 1103515245 + 12345;
+        const int order = (int)((seed >> 8) % 1000) - 500;
+        queue.add(GroupHandle(new LoggingGroup(&log, "g", order)),
+                  StructHandle(), textures[(seed >> 4) % textures.size()],
+                  StructHandle());
+        keys.push_back(queue.getKey(i));
+    }
+    queue.sort();
+    std::sort(keys.begin(), keys.end());
+    unsigned int mismatches = 0;
+    for (unsigned int i = 0; i < keys.size(); i++) {
+        mismatches += (queue.getKey(i) != keys[i]);
+    }
+    CHECK(mismatches == 0);
+}
+
+TEST_CASE("GL/RenderQueue/execute",
+          "Only states which differ from the previous item are changed")
+{
+    CallLog log;
+    StructHandle shaderA(new LoggingState(&log, "A"));
+    StructHandle shaderB(new LoggingState(&log, "B"));
+    StructHandle tex1(new LoggingState(&log, "t1"));
+    StructHandle tex2(new LoggingState(&log, "t2"));
+    StructHandle buffer(new LoggingState(&log, "b"));
+
+    RenderQueue queue;
+    queue.add(GroupHandle(new LoggingGroup(&log, "a1")), shaderA, tex1, buffer);
+    queue.add(GroupHandle(new LoggingGroup(&log, "b1")), shaderB, tex1, buffer);
+    queue.add(GroupHandle(new LoggingGroup(&log, "a2")), shaderA, tex2, buffer);
+    queue.add(GroupHandle(new LoggingGroup(&log, "a1'")), shaderA, tex1, buffer);
+    queue.add(GroupHandle(new LoggingGroup(&log, "a0")), shaderA, StructHandle(), StructHandle());
+
+    queue.execute();
+    const CallLog expected = {
+        // the texture-less item sorts first, its id is 0
+        "+A", "a0",
+        "+t1", "+b", "a1", "a1'",
+        "-b", "-t1", "+t2", "+b", "a2",
+        "-b", "-t2", "-A", "+B", "+t1", "+b", "b1",
+        "-b", "-t1", "-B"
+    };
+    CHECK(log == expected);
+    CHECK(queue.getStateChanges() == 16);
+    // 4 items with 3 states and one with 1 state, 26 calls without
+    // sorting and skipping
+    CHECK(queue.getStateChangesSkipped() == 10);
+
+    // sorted once, executed again as is
+    log.clear();
+    queue.execute();
+    CHECK(log == expected);
+
+    queue.clear();
+    log.clear();
+    queue.execute();
+    CHECK(log.empty());
+}
@@ -0,0 +1,296 @@
+/**********************************************************************
+File name: StateManagement.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <algorithm>
+#include <string>
+#include <vector>
+
+#include <CEngine/GL/StateManagement.hpp>
+#include <CEngine/WindowInterface/Window.hpp>
+#include <CEngine/WindowInterface/X11/X11Display.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+static GLint getInteger(const GLenum pname)
+{
+    GLint value = 0;
+    glGetIntegerv(pname, &value);
+    return value;
+}
+
+typedef std::vector<std::string> CallLog;
+
+class TracingState: public Struct {
+public:
+    TracingState(CallLog *log, const std::string &name):
+        _log(log), _name(name) {};
+private:
+    CallLog *_log;
+    std::string _name;
+public:
+    virtual void bind() { _log->push_back("bind " + _name); };
+    virtual void unbind() { _log->push_back("unbind " + _name); };
+};
+
+class TracingGroup: public Group {
+public:
+    TracingGroup(CallLog *log, const std::string &name):
+        Group(), _log(log), _name(name) {};
+private:
+    CallLog *_log;
+    std::string _name;
+public:
+    virtual void compile(GroupCommandList &commands)
+    {
+        commands.execute(this);
+    };
+    virtual void execute() { _log->push_back("draw " + _name); };
+};
+
+class TracingParentGroup: public ParentGroup {
+public:
+    TracingParentGroup(CallLog *log):
+        ParentGroup(), _log(log) {};
+private:
+    CallLog *_log;
+public:
+    virtual void setUp() { _log->push_back("setUp"); };
+    virtual void tearDown() { _log->push_back("tearDown"); };
+};
+
+TEST_CASE("GL/ParentGroup/compile",
+          "A group tree is flattened into a command list")
+{
+    CallLog log;
+    ParentGroup root;
+    StateGroupHandle outer(new StateGroup(
+        StructHandle(new TracingState(&log, "a"))));
+    StateGroupHandle inner(new StateGroup(
+        StructHandle(new TracingState(&log, "b"))));
+    GroupHandle custom(new TracingParentGroup(&log));
+    root.add(outer);
+    outer->add(GroupHandle(new TracingGroup(&log, "1")));
+    outer->add(inner);
+    inner->add(GroupHandle(new TracingGroup(&log, "2")));
+    root.add(custom);
+
+    root.execute();
+    const GroupCommandKind expectedKinds[] = {
+        CommandSetUp, CommandDraw,
+        CommandBind, CommandDraw, CommandExecute,
+        CommandBind, CommandDraw, CommandExecute, CommandUnbind,
+        CommandUnbind,
+        CommandSetUp, CommandDraw, CommandTearDown,
+        CommandTearDown
+    };
+    GroupCommandList commands;
+    root.compile(commands);
+    REQUIRE(commands.getCount() == 14);
+    CHECK(root.getCommandCount() == 14);
+    for (unsigned int i = 0; i < 14; i++) {
+        CHECK(commands.getKind(i) == expectedKinds[i]);
+    }
+
+    const CallLog expected = {
+        "bind a", "draw 1", "bind b", "draw 2", "unbind b", "unbind a",
+        "setUp", "tearDown"
+    };
+    CHECK(log == expected);
+
+    log.clear();
+    root.execute();
+    CHECK(log == expected);
+    CHECK(root.getCompileCount() == 1);
+
+    // changes anywhere in the tree cause a recompile
+    GroupHandle extra(new TracingGroup(&log, "3"));
+    inner->add(extra);
+    log.clear();
+    root.execute();
+    CHECK(root.getCompileCount() == 2);
+    CHECK(log[4] == "draw 3");
+
+    inner->remove(extra);
+    log.clear();
+    root.execute();
+    CHECK(root.getCompileCount() == 3);
+    CHECK(log == expected);
+}
+
+TEST_CASE("GL/StateCache/popMatrix",
+          "Popping more matrices than pushed is an error")
+{
+    StateCache cache;
+    CHECK_THROWS_AS(cache.popMatrix(), GL::Error);
+    CHECK(cache.getIssued() == 0);
+}
+
+TEST_CASE("GL/StateCache/bindings",
+          "[.][gl] Redundant binds are dropped")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+
+    StateCache cache;
+    GLuint buffers[2];
+    glGenBuffers(2, buffers);
+
+    cache.bindBuffer(GL_ARRAY_BUFFER, buffers[0]);
+    cache.bindBuffer(GL_ARRAY_BUFFER, buffers[0]);
+    cache.bindBuffer(GL_ELEMENT_ARRAY_BUFFER, buffers[1]);
+    CHECK(getInteger(GL_ARRAY_BUFFER_BINDING) == (GLint)buffers[0]);
+    CHECK(getInteger(GL_ELEMENT_ARRAY_BUFFER_BINDING) == (GLint)buffers[1]);
+    CHECK(cache.getIssued() == 2);
+    CHECK(cache.getElided() == 1);
+
+    // the element array binding belongs to the vertex array
+    GLuint array;
+    glGenVertexArrays(1, &array);
+    cache.bindVertexArray(array);
+    cache.bindBuffer(GL_ELEMENT_ARRAY_BUFFER, buffers[1]);
+    CHECK(getInteger(GL_ELEMENT_ARRAY_BUFFER_BINDING) == (GLint)buffers[1]);
+    cache.bindVertexArray(0);
+    CHECK(getInteger(GL_ELEMENT_ARRAY_BUFFER_BINDING) == (GLint)buffers[1]);
+    cache.deleteVertexArrays(1, &array);
+    CHECK(cache.getIssued() == 5);
+
+    // deleting a bound buffer unbinds it
+    cache.deleteBuffers(1, &buffers[0]);
+    cache.bindBuffer(GL_ARRAY_BUFFER, 0);
+    CHECK(cache.getElided() == 2);
+    cache.bindBuffer(GL_ARRAY_BUFFER, buffers[1]);
+    CHECK(getInteger(GL_ARRAY_BUFFER_BINDING) == (GLint)buffers[1]);
+
+    // foreign changes are picked up after invalidate
+    glBindBuffer(GL_ARRAY_BUFFER, 0);
+    cache.invalidate();
+    cache.bindBuffer(GL_ARRAY_BUFFER, buffers[1]);
+    CHECK(getInteger(GL_ARRAY_BUFFER_BINDING) == (GLint)buffers[1]);
+
+    cache.enable(GL_BLEND);
+    cache.enable(GL_BLEND);
+    cache.blendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA);
+    cache.blendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA);
+    cache.disable(GL_BLEND);
+    CHECK(glIsEnabled(GL_BLEND) == GL_FALSE);
+    CHECK(getInteger(GL_BLEND_DST) == GL_ONE_MINUS_SRC_ALPHA);
+
+    cache.endFrame();
+    CHECK(cache.getLastFrameIssued() == 10);
+    CHECK(cache.getLastFrameElided() == 4);
+    CHECK(cache.getIssued() == 0);
+    CHECK(cache.getElided() == 0);
+
+    cache.bindBuffer(GL_ARRAY_BUFFER, 0);
+    cache.deleteBuffers(1, &buffers[1]);
+    raiseLastGLError();
+}
+
+TEST_CASE("GL/StateCache/textures",
+          "[.][gl] Redundant texture binds are dropped per unit")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+
+    StateCache cache;
+    GLuint textures[2];
+    glGenTextures(2, textures);
+
+    cache.bindTexture(GL_TEXTURE_2D, textures[0]);
+    cache.bindTexture(GL_TEXTURE_2D, textures[0]);
+    CHECK(cache.getIssued() == 1);
+    CHECK(cache.getElided() == 1);
+    CHECK(getInteger(GL_TEXTURE_BINDING_2D) == (GLint)textures[0]);
+
+    cache.activeTexture(GL_TEXTURE1);
+    cache.bindTexture(GL_TEXTURE_2D, textures[1]);
+    cache.activeTexture(GL_TEXTURE0);
+    cache.bindTexture(GL_TEXTURE_2D, textures[0]);
+    CHECK(cache.getIssued() == 4);
+    CHECK(cache.getElided() == 2);
+    CHECK(getInteger(GL_TEXTURE_BINDING_2D) == (GLint)textures[0]);
+
+    // the unit is reset and known again after invalidate
+    cache.activeTexture(GL_TEXTURE1);
+    cache.invalidate();
+    CHECK(getInteger(GL_ACTIVE_TEXTURE) == GL_TEXTURE0);
+    cache.bindTexture(GL_TEXTURE_2D, textures[1]);
+    cache.bindTexture(GL_TEXTURE_2D, textures[1]);
+    CHECK(cache.getIssued() == 6);
+    CHECK(cache.getElided() == 3);
+    CHECK(getInteger(GL_TEXTURE_BINDING_2D) == (GLint)textures[1]);
+
+    cache.bindTexture(GL_TEXTURE_2D, 0);
+    cache.deleteTextures(2, textures);
+    raiseLastGLError();
+}
+
+TEST_CASE("GL/StateCache/matrix",
+          "[.][gl] Matrices are saved in the cache once known")
+{
+    X11Display display;
+    WindowHandle window = display.createWindow(
+        DisplayMode(8, 8, 8, 0, 0, 0, 0, true), 64, 64);
+    window->switchTo();
+    window->initializeGLEW();
+
+    StateCache cache;
+    glMatrixMode(GL_MODELVIEW);
+    const Matrix4 translation = translation4(Vector3(1, 2, 3));
+    GLfloat current[16];
+
+    // unknown matrices go to the GL stack
+    cache.pushMatrix();
+    cache.loadMatrix(translation);
+    cache.popMatrix();
+    CHECK(cache.getIssued() == 3);
+
+    cache.loadIdentity();
+    cache.pushMatrix();
+    cache.loadMatrix(translation);
+    cache.loadMatrix(translation);
+    glGetFloatv(GL_MODELVIEW_MATRIX, current);
+    CHECK(std::equal(current, current + 16, translation.coeff));
+
+    // nested pushes of the same matrix do not reach GL
+    cache.pushMatrix();
+    cache.loadMatrix(translation);
+    cache.popMatrix();
+    cache.popMatrix();
+    glGetFloatv(GL_MODELVIEW_MATRIX, current);
+    CHECK(std::equal(current, current + 16, Matrix4(Identity).coeff));
+    CHECK(cache.getIssued() == 6);
+    CHECK(cache.getElided() == 5);
+    raiseLastGLError();
+}
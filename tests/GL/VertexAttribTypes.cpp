@@ -0,0 +1,167 @@
+/**********************************************************************
+File name: VertexAttribTypes.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <cmath>
+
+#include <CEngine/GL/GeometryBufferView.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::GL;
+
+TEST_CASE("GL/VertexAttribTypes/half",
+          "Every finite half survives a round trip through float")
+{
+    unsigned int mismatches = 0;
+    for (uint32_t i = 0; i < 0x10000; i++) {
+        const uint16_t half = i;
+        if ((half & 0x7c00) == 0x7c00) {
+            continue;
+        }
+        mismatches += (floatToHalf(halfToFloat(half)) != half);
+    }
+    CHECK(mismatches == 0);
+    CHECK(halfToFloat(floatToHalf(1.0)) == 1.0);
+    CHECK(halfToFloat(floatToHalf(-0.5)) == -0.5);
+    CHECK(halfToFloat(floatToHalf(65504.)) == 65504.);
+    CHECK(std::isinf(halfToFloat(floatToHalf(1e6))));
+    // rounds to the nearest half
+    CHECK(halfToFloat(floatToHalf(1.0 + 1./4096.)) == 1.0);
+    CHECK(halfToFloat(floatToHalf(1.0 + 3./2048.)) == 1.0 + 2./1024.);
+}
+
+TEST_CASE("GL/VertexAttribTypes/pack",
+          "Normalized types clamp and round")
+{
+    const GLfloat colour[4] = {0.0, 1.0, 0.5, 2.0};
+    uint8_t bytes[4];
+    packAttrib(AttribUNorm8, colour, 4, bytes);
+    CHECK(bytes[0] == 0);
+    CHECK(bytes[1] == 255);
+    CHECK(bytes[2] == 128);
+    CHECK(bytes[3] == 255);
+
+    const GLfloat normal[4] = {1.0, -1.0, 0.0, -1.0};
+    uint32_t word;
+    packAttrib(AttribSNorm10_10_10_2, normal, 4, &word);
+    CHECK((word & 0x3ff) == 511);
+    CHECK(((word >> 10) & 0x3ff) == 0x201);
+    CHECK(((word >> 20) & 0x3ff) == 0);
+    CHECK((word >> 30) == 3);
+
+    GLfloat unpacked[4];
+    unpackAttrib(AttribSNorm10_10_10_2, &word, 4, unpacked);
+    for (unsigned int i = 0; i < 4; i++) {
+        CHECK(unpacked[i] == normal[i]);
+    }
+}
+
+TEST_CASE("GL/VertexAttribTypes/VertexFormat",
+          "Compact types shrink the vertex and keep attributes aligned")
+{
+    VertexAttribType types[VERTEX_ATTRIB_SLOT_COUNT] = {
+        AttribFloat32, AttribUNorm8, AttribFloat16, AttribFloat32,
+        AttribFloat32, AttribFloat32, AttribFloat16,
+        AttribSNorm10_10_10_2, AttribFloat32, AttribFloat32, AttribFloat32
+    };
+    const VertexFormat plain(3, 4, 2, 0, 0, 0, true, 4);
+    const VertexFormat compact(3, 4, 2, 0, 0, 0, true, 4, 0, 0, 0, types);
+    CHECK(plain.vertexSize == 64);
+    CHECK(compact.vertexSize == 32);
+    CHECK(compact.colourOffset == 12);
+    CHECK(compact.texCoord0Offset == 16);
+    CHECK(compact.normalOffset == 20);
+    CHECK(compact.vertexAttrib0Offset == 28);
+
+    CHECK_FALSE(plain.isCompatible(compact));
+    CHECK(compact.isCompatible(compact));
+
+    VertexFormat *copy = VertexFormat::copy(&compact);
+    CHECK(copy->vertexSize == compact.vertexSize);
+    CHECK(copy->types[SlotVertexAttrib0] == AttribSNorm10_10_10_2);
+    delete copy;
+}
+
+TEST_CASE("GL/VertexAttribTypes/GeometryBufferView",
+          "Views convert between floats and the storage type")
+{
+    VertexAttribType types[VERTEX_ATTRIB_SLOT_COUNT] = {
+        AttribFloat32, AttribUNorm8, AttribFloat16, AttribFloat32,
+        AttribFloat32, AttribFloat32, AttribFloat16,
+        AttribSNorm10_10_10_2, AttribFloat32, AttribFloat32, AttribFloat32
+    };
+    GeometryBufferHandle buffer(new GeometryBuffer(
+        VertexFormatHandle(new VertexFormat(3, 4, 2, 0, 0, 0, true,
+                                            4, 0, 0, 0, types)),
+        GL_DYNAMIC_DRAW));
+    VertexIndexListHandle indices = buffer->allocateVertices(2);
+    GeometryBufferView view(buffer, indices);
+
+    const GLVertexFloat colours[8] = {
+        1.0, 0.0, 0.0, 1.0,
+        0.0, 0.0, 1.0, 0.5
+    };
+    view.getColourView()->set(colours);
+    const uint8_t *colour = (const uint8_t*)buffer->getData()
+        + (*indices)[1] * 32 + 12;
+    CHECK(colour[2] == 255);
+    CHECK(colour[3] == 128);
+
+    const GLVertexFloat normals[8] = {
+        0.0, 0.0, 1.0, 0.0,
+        0.0, -1.0, 0.0, 1.0
+    };
+    view.getVertexAttribView(0)->set(normals);
+    GLVertexFloat values[8];
+    view.getVertexAttribView(0)->get(values);
+    for (unsigned int i = 0; i < 8; i++) {
+        CHECK(values[i] == normals[i]);
+    }
+
+    const GLVertexFloat texCoords[4] = {0.25, 0.75, 0.5, 1.0};
+    view.getTexCoordView(0)->set(texCoords);
+
+    // partial writes keep the other components
+    const GLVertexFloat v[2] = {0.125, 0.0};
+    view.getTexCoordView(0)->slice(0, 2, 1, 1, 1)->set(v);
+    view.getTexCoordView(0)->get(values);
+    CHECK(values[0] == 0.25);
+    CHECK(values[1] == 0.125);
+    CHECK(values[2] == 0.5);
+    CHECK(values[3] == 0.0);
+
+    const GLVertexFloat alpha = 0.0;
+    view.getColourView()->slice(0, 1, 1, 3, 1)->set(&alpha);
+    view.getColourView()->get(values);
+    CHECK(values[0] == 1.0);
+    CHECK(values[3] == 0.0);
+
+    GLVertexFloat *ptr;
+    GLsizei stride;
+    CHECK_FALSE(view.getColourView()->getLayout(&ptr, &stride));
+    REQUIRE(view.getPositionView()->getLayout(&ptr, &stride));
+    CHECK(stride == 8);
+}
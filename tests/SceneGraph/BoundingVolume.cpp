@@ -0,0 +1,86 @@
+/**********************************************************************
+File name: BoundingVolume.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <CEngine/SceneGraph/BoundingVolume.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::SceneGraph;
+
+#define EPSILON 10e-16
+
+#define CHECK_APPROX_ZERO(expr) CHECK((expr).abssum() < EPSILON)
+
+TEST_CASE("SceneGraph/BoundingVolume/merge",
+          "Merge bounding volumes")
+{
+    BoundingVolume a(Vector3(-1, -1, -1), Vector3(1, 1, 1),
+                     Vector3(0, 0, 0), 1);
+    BoundingVolume b(Vector3(3, -1, -1), Vector3(5, 1, 1),
+                     Vector3(4, 0, 0), 1);
+
+    BoundingVolume empty;
+    empty.merge(a);
+    CHECK(!empty.empty);
+    CHECK_APPROX_ZERO(empty.center - a.center);
+
+    a.merge(BoundingVolume());
+    CHECK(a.radius == 1);
+
+    a.merge(b);
+    CHECK_APPROX_ZERO(a.min - Vector3(-1, -1, -1));
+    CHECK_APPROX_ZERO(a.max - Vector3(5, 1, 1));
+    CHECK_APPROX_ZERO(a.center - Vector3(2, 0, 0));
+    CHECK(a.radius == 3);
+
+    BoundingVolume inner(Vector3(1, 0, 0), Vector3(1, 0, 0),
+                         Vector3(1, 0, 0), 0.5);
+    a.merge(inner);
+    CHECK_APPROX_ZERO(a.center - Vector3(2, 0, 0));
+    CHECK(a.radius == 3);
+}
+
+TEST_CASE("SceneGraph/BoundingVolume/transformed",
+          "Transform bounding volumes")
+{
+    BoundingVolume a(Vector3(-1, -2, -3), Vector3(1, 2, 3),
+                     Vector3(0, 0, 0), 4);
+
+    BoundingVolume moved = a.transformed(translation4(Vector3(10, 0, 0)));
+    CHECK_APPROX_ZERO(moved.min - Vector3(9, -2, -3));
+    CHECK_APPROX_ZERO(moved.max - Vector3(11, 2, 3));
+    CHECK_APPROX_ZERO(moved.center - Vector3(10, 0, 0));
+    CHECK(moved.radius == 4);
+
+    Matrix4 scale(Identity);
+    scale.component(1, 1) = 2;
+    BoundingVolume scaled = a.transformed(scale);
+    CHECK_APPROX_ZERO(scaled.min - Vector3(-1, -4, -3));
+    CHECK_APPROX_ZERO(scaled.max - Vector3(1, 4, 3));
+    CHECK(scaled.radius == 8);
+
+    CHECK(BoundingVolume().transformed(scale).empty);
+}
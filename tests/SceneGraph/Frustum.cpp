@@ -0,0 +1,88 @@
+/**********************************************************************
+File name: Frustum.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <CEngine/SceneGraph/Frustum.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::SceneGraph;
+
+static BoundingVolume box(const Vector3 &center, const VectorFloat size)
+{
+    const Vector3 half(size / 2, size / 2, size / 2);
+    return BoundingVolume(center - half, center + half, center,
+                          half.length());
+}
+
+TEST_CASE("SceneGraph/Frustum/planes",
+          "Extract the frustum planes from a matrix")
+{
+    // the identity maps the cube [-1, 1]^3 to the clip volume
+    Frustum frustum = Frustum(Matrix4(Identity));
+    CHECK((frustum.normals[0] - Vector3(1, 0, 0)).abssum() == 0);
+    CHECK(frustum.distances[0] == 1);
+    CHECK((frustum.normals[5] - Vector3(0, 0, -1)).abssum() == 0);
+    CHECK(frustum.distances[5] == 1);
+}
+
+TEST_CASE("SceneGraph/Frustum/test",
+          "Test bounding volumes against a frustum")
+{
+    Frustum frustum = Frustum(Matrix4(Identity));
+    unsigned int mask = FRUSTUM_ALL_PLANES;
+    CHECK(frustum.test(box(Vector3(0, 0, 0), 0.5), mask));
+    CHECK(mask == 0);
+
+    mask = FRUSTUM_ALL_PLANES;
+    CHECK(!frustum.test(box(Vector3(5, 0, 0), 1), mask));
+
+    // only the right plane needs to be tested further
+    mask = FRUSTUM_ALL_PLANES;
+    CHECK(frustum.test(box(Vector3(1, 0, 0), 1), mask));
+    CHECK(mask == 2);
+
+    // a box whose sphere crosses a plane it is entirely outside of
+    mask = FRUSTUM_ALL_PLANES;
+    CHECK(!frustum.test(box(Vector3(1.8, 1.8, 0), 1), mask));
+
+    // planes not in the mask are not tested
+    mask = 0;
+    CHECK(frustum.test(box(Vector3(5, 0, 0), 1), mask));
+
+    mask = FRUSTUM_ALL_PLANES;
+    CHECK(frustum.test(BoundingVolume(), mask));
+
+    Frustum moved = Frustum(translation4(Vector3(-10, 0, 0)));
+    mask = FRUSTUM_ALL_PLANES;
+    CHECK(moved.test(box(Vector3(10, 0, 0), 0.5), mask));
+    mask = FRUSTUM_ALL_PLANES;
+    CHECK(!moved.test(box(Vector3(0, 0, 0), 0.5), mask));
+
+    Frustum everything;
+    mask = FRUSTUM_ALL_PLANES;
+    CHECK(everything.test(box(Vector3(1000, 0, 0), 10), mask));
+    CHECK(mask == 0);
+}
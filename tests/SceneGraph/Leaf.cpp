@@ -0,0 +1,94 @@
+/**********************************************************************
+File name: Leaf.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <stdexcept>
+
+#include <CEngine/SceneGraph/Leaf.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::SceneGraph;
+
+class TestLeaf: public Leaf
+{
+    public:
+        TestLeaf():
+            Leaf()
+        {
+            worldBound = BoundingVolume(Vector3(-1, -1, -1), Vector3(1, 1, 1),
+                                        Vector3(0, 0, 0), 1);
+        };
+};
+
+TEST_CASE("SceneGraph/Leaf/selectLOD",
+          "Select detail levels by screen size")
+{
+    TestLeaf leaf;
+    VertexMapHandle coarse = leaf.addLOD(10);
+    VertexMapHandle medium = leaf.addLOD(100);
+    CHECK(leaf.getLODCount() == 3);
+    CHECK(leaf.getLODVertexMap(1) == medium);
+    CHECK(leaf.getLODVertexMap(2) == coarse);
+    CHECK_THROWS_AS(leaf.getLODVertexMap(3), std::out_of_range);
+
+    // screen size is 2 * radius * scale / distance = 200 / distance
+    leaf.selectLOD(Vector3(0, 0, 1), 100);
+    CHECK(leaf.getCurrentLOD() == 0);
+    CHECK(leaf.getCurrentVertexMap() == leaf.getVertexMap());
+
+    leaf.selectLOD(Vector3(0, 0, 4), 100);
+    CHECK(leaf.getCurrentLOD() == 1);
+
+    leaf.selectLOD(Vector3(0, 0, 100), 100);
+    CHECK(leaf.getCurrentLOD() == 2);
+    CHECK(leaf.getCurrentVertexMap() == coarse);
+}
+
+TEST_CASE("SceneGraph/Leaf/hysteresis",
+          "Detail levels do not flip around a threshold")
+{
+    TestLeaf leaf;
+    leaf.addLOD(100);
+    CHECK_THROWS_AS(leaf.setLODHysteresis(1), std::invalid_argument);
+    CHECK_THROWS_AS(leaf.setLODHysteresis(-0.1), std::invalid_argument);
+    leaf.setLODHysteresis(0.1);
+
+    // 95 pixels: inside the margin, stay at full detail
+    leaf.selectLOD(Vector3(200.0 / 95, 0, 0), 100);
+    CHECK(leaf.getCurrentLOD() == 0);
+
+    // 80 pixels: switch
+    leaf.selectLOD(Vector3(2.5, 0, 0), 100);
+    CHECK(leaf.getCurrentLOD() == 1);
+
+    // 105 pixels: inside the margin, stay at reduced detail
+    leaf.selectLOD(Vector3(200.0 / 105, 0, 0), 100);
+    CHECK(leaf.getCurrentLOD() == 1);
+
+    // 125 pixels: switch back
+    leaf.selectLOD(Vector3(1.6, 0, 0), 100);
+    CHECK(leaf.getCurrentLOD() == 0);
+}
@@ -0,0 +1,119 @@
+/**********************************************************************
+File name: SceneGraph.cpp
+This file is part of: Pythonic Engine
+
+LICENSE
+
+The contents of this file are subject to the Mozilla Public License
+Version 1.1 (the "License"); you may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+http://www.mozilla.org/MPL/
+
+Software distributed under the License is distributed on an "AS IS"
+basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See the
+License for the specific language governing rights and limitations under
+the License.
+
+Alternatively, the contents of this file may be used under the terms of
+the GNU General Public license (the  "GPL License"), in which case  the
+provisions of GPL License are applicable instead of those above.
+
+FEEDBACK & QUESTIONS
+
+For feedback and questions about pyengine please e-mail one of the
+authors named in the AUTHORS file.
+**********************************************************************/
+#include <catch.hpp>
+
+#include <CEngine/SceneGraph/SceneGraph.hpp>
+
+using namespace PyEngine;
+using namespace PyEngine::SceneGraph;
+
+class CountingSpatial: public Spatial
+{
+    public:
+        CountingSpatial(unsigned int *draws, bool bounded = true):
+            Spatial(),
+            _draws(draws)
+        {
+            if (bounded) {
+                setModelBound(BoundingVolume(
+                    Vector3(-0.5, -0.5, -0.5), Vector3(0.5, 0.5, 0.5),
+                    Vector3(0, 0, 0), 0.5));
+            }
+        };
+    private:
+        unsigned int *_draws;
+    public:
+        virtual void draw() { (*_draws)++; };
+};
+
+TEST_CASE("SceneGraph/SceneGraph/draw",
+          "Skip subtrees outside of the frustum")
+{
+    unsigned int draws = 0;
+    SceneGraphHandle graph = SceneGraph::SceneGraph::create();
+    NodeHandle near = Node::create();
+    NodeHandle far = Node::create();
+    SpatialHandle inside(new CountingSpatial(&draws));
+    SpatialHandle above(new CountingSpatial(&draws));
+    SpatialHandle farA(new CountingSpatial(&draws));
+    SpatialHandle farB(new CountingSpatial(&draws));
+    graph->getRootNode()->addChild(near);
+    graph->getRootNode()->addChild(far);
+    near->addChild(inside);
+    near->addChild(above);
+    far->addChild(farA);
+    far->addChild(farB);
+    above->setTranslation(0, 5, 0);
+    far->setTranslation(10, 0, 0);
+    graph->update();
+
+    const BoundingVolume &rootBound = graph->getRootNode()->getWorldBound();
+    CHECK(rootBound.min[0] == -0.5);
+    CHECK(rootBound.max[0] == 10.5);
+    CHECK(rootBound.max[1] == 5.5);
+
+    const Frustum frustum = Frustum(Matrix4(Identity));
+    graph->draw(frustum);
+    CHECK(draws == 1);
+    CHECK(graph->getDrawnCount() == 1);
+    // above and the whole far node
+    CHECK(graph->getCulledCount() == 2);
+
+    // moving a child grows the bounds of its parents
+    farA->setTranslation(-10, 0, 0);
+    farA->updateGeometry();
+    CHECK(far->getWorldBound().min[0] == -0.5);
+    CHECK(rootBound.min[0] == -0.5);
+
+    draws = 0;
+    graph->draw(frustum);
+    CHECK(draws == 2);
+    CHECK(graph->getCulledCount() == 2);
+
+    draws = 0;
+    graph->draw();
+    CHECK(draws == 4);
+    CHECK(graph->getCulledCount() == 0);
+}
+
+TEST_CASE("SceneGraph/SceneGraph/unbounded",
+          "Spatials without bounds are never culled")
+{
+    unsigned int draws = 0;
+    SceneGraphHandle graph = SceneGraph::SceneGraph::create();
+    NodeHandle far = Node::create();
+    graph->getRootNode()->addChild(far);
+    far->addChild(SpatialHandle(new CountingSpatial(&draws)));
+    far->addChild(SpatialHandle(new CountingSpatial(&draws, false)));
+    far->setTranslation(10, 0, 0);
+    graph->update();
+    CHECK(!far->isCullable());
+    CHECK(!graph->getRootNode()->isCullable());
+
+    graph->draw(Frustum(Matrix4(Identity)));
+    CHECK(draws == 1);
+    CHECK(graph->getCulledCount() == 1);
+}
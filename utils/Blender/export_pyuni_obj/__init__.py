@@ -32,6 +32,8 @@ bl_info = {
 
 if "bpy" in locals():
     import imp
+    if "export_pyuni_bin" in locals():
+        imp.reload(export_pyuni_bin)
     if "export_pyuni_obj" in locals():
         imp.reload(export_pyuni_obj)
 
@@ -127,6 +129,12 @@ class ExportOBJ(bpy.types.Operator, ExportHelper):
             description="",
             default=False,
             )
+    use_binary = BoolProperty(
+            name="Binary Model",
+            description="Also write a memory-mappable .pyum file "
+                        "for fast loading",
+            default=False,
+            )
 
     # grouping group
     use_blen_objects = BoolProperty(
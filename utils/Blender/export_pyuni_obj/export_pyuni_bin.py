@@ -0,0 +1,134 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+"""
+Writer for the binary model format read by Engine.Model.BinaryModel.
+
+The exporter runs inside blender and can not import the engine, so the
+layout is repeated here. Keep both in sync when changing the format.
+"""
+
+import array
+import struct
+import sys
+
+MAGIC = b"PYUM"
+VERSION = 1
+
+# magic, version, header size, vertex count, vertex size, index count,
+# material count, vertex format length, flags, vertex data offset,
+# index data offset, material table offset
+HEADER = struct.Struct("<4sHHIIIIIIQQQ")
+# material name, first index, index count
+MATERIAL = struct.Struct("<64sII")
+ALIGNMENT = 16
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def little_endian(data):
+    if sys.byteorder != 'little':
+        data = array.array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+class BinaryModelWriter:
+    '''
+    Collect triangle corners into a deduplicated, interleaved vertex
+    table with an index list and write them as a binary model.
+    '''
+
+    def __init__(self, use_uv, use_normals):
+        self.use_uv = use_uv
+        self.use_normals = use_normals
+        self.vertex_format = "v:3"
+        if use_uv:
+            self.vertex_format += ";t0:2"
+        if use_normals:
+            self.vertex_format += ";n:3"
+        self.vertex_length = 3 + (2 if use_uv else 0) + (3 if use_normals else 0)
+
+        self.vertices = array.array('f')
+        self.indices = array.array('I')
+        assert self.indices.itemsize == 4
+        self.vertex_map = {}
+        self.materials = []
+
+    def set_material(self, name):
+        if self.materials and self.materials[-1][0] == name:
+            return
+        self.materials.append((name, len(self.indices)))
+
+    def add_corner(self, co, uv, normal):
+        key = (co, uv, normal)
+        index = self.vertex_map.get(key)
+        if index is None:
+            index = self.vertex_map[key] = len(self.vertex_map)
+            self.vertices.extend(co)
+            if self.use_uv:
+                self.vertices.extend(uv or (0.0, 0.0))
+            if self.use_normals:
+                self.vertices.extend(normal or (0.0, 0.0, 0.0))
+        self.indices.append(index)
+
+    def material_ranges(self):
+        ranges = []
+        for i, (name, first) in enumerate(self.materials):
+            if i + 1 < len(self.materials):
+                stop = self.materials[i + 1][1]
+            else:
+                stop = len(self.indices)
+            if stop > first:
+                ranges.append((name, first, stop - first))
+        return ranges
+
+    def write(self, filepath):
+        vertex_format = self.vertex_format.encode("ascii")
+        vertex_data = little_endian(self.vertices)
+        index_data = little_endian(self.indices)
+        materials = self.material_ranges()
+
+        vertex_offset = align(HEADER.size + len(vertex_format))
+        index_offset = align(vertex_offset + len(vertex_data))
+        material_offset = align(index_offset + len(index_data))
+
+        chunks = [
+            (0, HEADER.pack(
+                MAGIC, VERSION, HEADER.size,
+                len(self.vertex_map), self.vertex_length * 4,
+                len(self.indices), len(materials), len(vertex_format), 0,
+                vertex_offset, index_offset, material_offset)),
+            (HEADER.size, vertex_format),
+            (vertex_offset, vertex_data),
+            (index_offset, index_data),
+            (material_offset, b"".join(
+                MATERIAL.pack(name.encode("utf8"), first, count)
+                for name, first, count in materials)),
+        ]
+
+        file = open(filepath, "wb")
+        position = 0
+        for offset, data in chunks:
+            file.write(b"\0" * (offset - position))
+            file.write(data)
+            position = offset + len(data)
+        file.close()
@@ -25,6 +25,8 @@ import bpy
 import mathutils
 import bpy_extras.io_utils
 
+from .export_pyuni_bin import BinaryModelWriter
+
 
 def name_compat(name):
     if name is None:
@@ -229,6 +231,7 @@ def write_file(filepath, objects, scene,
                EXPORT_CURVE_AS_NURBS=True,
                EXPORT_GLOBAL_MATRIX=None,
                EXPORT_PATH_MODE='AUTO',
+               EXPORT_BINARY=False,
                ):
     '''
     Basic write function. The context and options must be already set
@@ -301,6 +304,10 @@ def write_file(filepath, objects, scene,
 
     copy_set = set()
 
+    # Triangles for the binary model, written next to the obj file
+    if EXPORT_BINARY:
+        binary = BinaryModelWriter(EXPORT_UV, EXPORT_NORMALS)
+
     # Get all meshes
     for ob_main in objects:
 
@@ -545,6 +552,12 @@ def write_file(filepath, objects, scene,
                         file.write("usemtl %s\n" % mat_data[0])  # can be mat_image or (null)
 
                 contextMat = key
+                if EXPORT_BINARY:
+                    if key in mtl_dict:
+                        binary.set_material(mtl_dict[key][0])
+                    else:
+                        binary.set_material("(null)")
+
                 if f_smooth != contextSmooth:
                     if f_smooth:  # on now off
                         file.write('s 1\n')
@@ -560,6 +573,26 @@ def write_file(filepath, objects, scene,
                 else:
                     f_v_iter = (f_v_orig[0], f_v_orig[1], f_v_orig[2]), (f_v_orig[0], f_v_orig[2], f_v_orig[3])
 
+                if EXPORT_BINARY:
+                    # the binary format only knows triangles
+                    if len(f_v_orig) == 3:
+                        f_v_tris = (f_v_orig, )
+                    else:
+                        f_v_tris = (f_v_orig[0], f_v_orig[1], f_v_orig[2]), (f_v_orig[0], f_v_orig[2], f_v_orig[3])
+                    for f_v in f_v_tris:
+                        for vi, v in f_v:
+                            if faceuv:
+                                uv = veckey2d(uv_layer[f_index].uv[vi])
+                            else:
+                                uv = None
+                            if not EXPORT_NORMALS:
+                                no = None
+                            elif f_smooth:
+                                no = veckey3d(v.normal)
+                            else:
+                                no = veckey3d(f.normal)
+                            binary.add_corner(veckey3d(v.co), uv, no)
+
                 # support for triangulation
                 for f_v in f_v_iter:
                     file.write('f')
@@ -628,6 +661,9 @@ def write_file(filepath, objects, scene,
 
     file.close()
 
+    if EXPORT_BINARY:
+        binary.write(os.path.splitext(filepath)[0] + ".pyum")
+
     # Now we have all our materials, save them
     if EXPORT_MTL:
         write_mtl(scene, mtlfilepath, EXPORT_PATH_MODE, copy_set, mtl_dict)
@@ -657,6 +693,7 @@ def _write(context, filepath,
               EXPORT_ANIMATION,
               EXPORT_GLOBAL_MATRIX,
               EXPORT_PATH_MODE,
+              EXPORT_BINARY,
               ):  # Not used
 
     base_name, ext = os.path.splitext(filepath)
@@ -723,6 +760,7 @@ def _write(context, filepath,
                        EXPORT_CURVE_AS_NURBS,
                        EXPORT_GLOBAL_MATRIX,
                        EXPORT_PATH_MODE,
+                       EXPORT_BINARY,
                        )
 
         scene.frame_set(orig_frame, 0.0)
@@ -757,7 +795,8 @@ def save(operator, context, filepath="",
          use_all_scenes=False,
          use_animation=False,
          global_matrix=None,
-         path_mode='AUTO'
+         path_mode='AUTO',
+         use_binary=False,
          ):
 
     _write(context, filepath,
@@ -779,6 +818,7 @@ def save(operator, context, filepath="",
            EXPORT_ANIMATION=use_animation,
            EXPORT_GLOBAL_MATRIX=global_matrix,
            EXPORT_PATH_MODE=path_mode,
+           EXPORT_BINARY=use_binary,
            )
 
     return {'FINISHED'}
@@ -0,0 +1,109 @@
+# File name: model_memory.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Measure the memory needed per triangle by the packed representations of
+Engine.Model. Run from the repository root:
+
+    python utils/benchmarks/model_memory.py [triangles]
+"""
+from __future__ import unicode_literals, print_function, division
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from our_future import *
+
+import array
+import random
+
+from Engine.Model import Model, PACK_LISTS, PACK_ARRAYS, numpy
+
+def deep_sizeof(obj, seen=None):
+    """
+    Return the size of *obj* and everything reachable from it through
+    containers, arrays and slots, counting shared objects once.
+    """
+    if seen is None:
+        seen = set()
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if numpy is not None and isinstance(obj, numpy.ndarray):
+        if obj.base is not None:
+            size += deep_sizeof(obj.base, seen)
+        return size
+    if isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    elif isinstance(obj, dict):
+        for key, value in obj.iteritems():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif not isinstance(obj, (array.array, int, float, unicode, bytes)):
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                size += deep_sizeof(getattr(obj, name, None), seen)
+        size += deep_sizeof(getattr(obj, "__dict__", None), seen)
+    return size
+
+def random_model(triangles, packing):
+    vertex_count = triangles // 2 + 3
+    rnd = random.Random(1)
+    vertices = [rnd.random() for i in range(vertex_count * 3)]
+    normals = [rnd.random() for i in range(vertex_count * 3)]
+    texcoords = [rnd.random() for i in range(vertex_count * 2)]
+    faces = []
+    for i in range(triangles):
+        face = []
+        for j in range(3):
+            index = rnd.randrange(vertex_count)
+            face.append((index, index, index))
+        faces.append(face)
+    return Model(packing=packing, vertices=vertices, normals=normals,
+                 texCoords=texcoords, faces=faces)
+
+def main(triangles):
+    print("{0} triangles".format(triangles))
+    model = random_model(triangles, PACK_LISTS)
+    packed = model.PackedFaces
+    # the representation used before faces were packed into arrays
+    legacy = [tuple(list(attrib) for attrib in face) for face in packed]
+    results = [
+        ("tuples of lists", deep_sizeof(legacy)),
+        ("tuples of arrays", deep_sizeof(packed)),
+    ]
+    if numpy is not None:
+        model = random_model(triangles, PACK_ARRAYS)
+        results.append(("interleaved array", deep_sizeof(model.PackedFaces)))
+    for name, size in results:
+        print("  {0:20s} {1:8.1f} bytes per triangle".format(
+            name, size / triangles))
+    print("  model instance       {0:8d} bytes (without data)".format(
+        sys.getsizeof(model)))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
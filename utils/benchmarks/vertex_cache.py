@@ -0,0 +1,89 @@
+# File name: vertex_cache.py
+# This file is part of: pyengine
+#
+# LICENSE
+#
+# The contents of this file are subject to the Mozilla Public License
+# Version 1.1 (the "License"); you may not use this file except in
+# compliance with the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS"
+# basis, WITHOUT WARRANTY OF ANY KIND, either express or implied. See
+# the License for the specific language governing rights and limitations
+# under the License.
+#
+# Alternatively, the contents of this file may be used under the terms
+# of the GNU General Public license (the  "GPL License"), in which case
+# the provisions of GPL License are applicable instead of those above.
+#
+# FEEDBACK & QUESTIONS
+#
+# For feedback and questions about pyengine please e-mail one of the
+# authors named in the AUTHORS file.
+########################################################################
+"""
+Measure the vertex cache miss ratio (ACMR) of triangle index lists
+before and after Engine.VertexCache.optimize. Run from the repository
+root with binary model files (see Engine.Model.BinaryModel) as corpus:
+
+    python utils/benchmarks/vertex_cache.py [model.pyum ...]
+
+Without arguments, a shuffled 100x100 quad grid is measured.
+"""
+from __future__ import unicode_literals, print_function, division
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "Engine"))
+
+from our_future import *
+
+import random
+import time
+
+import VertexCache
+from Engine.Model import BinaryModel
+
+CACHE_SIZES = (16, 32)
+
+def shuffled_grid(size):
+    triangles = []
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            triangles.append((a, b, d))
+            triangles.append((a, d, c))
+    random.Random(1).shuffle(triangles)
+    return [index for triangle in triangles for index in triangle]
+
+def corpus(paths):
+    if not paths:
+        yield "shuffled grid", shuffled_grid(100)
+        return
+    for path in paths:
+        with BinaryModel(path) as model:
+            # materials are optimized separately, like Model does
+            for name, first, count in model.Materials or [("", 0, len(model.Indices))]:
+                yield "{0}:{1}".format(os.path.basename(path), name), \
+                    model.Indices[first:first+count].tolist()
+
+def main(paths):
+    print("{0:30s} {1:>9s} {2:>5s} {3:>7s} {4:>7s} {5:>8s}".format(
+        "mesh", "triangles", "cache", "before", "after", "time"))
+    for name, indices in corpus(paths):
+        for cache_size in CACHE_SIZES:
+            before = VertexCache.acmr(indices, cache_size)
+            start = time.time()
+            optimized = VertexCache.optimize(indices, cache_size)
+            elapsed = time.time() - start
+            after = VertexCache.acmr(optimized, cache_size)
+            print("{0:30s} {1:9d} {2:5d} {3:7.3f} {4:7.3f} {5:7.2f}s".format(
+                name[:30], len(indices) // 3, cache_size,
+                before, after, elapsed))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])